@@ -1,1280 +1,5572 @@
 #!/usr/bin/env python3
 
+from __future__ import annotations
+
 import os
-import re
-import subprocess
 import sys
-from functools import wraps
-from typing import Any, Callable, Optional, TypedDict
 
+# `sssh <host>` runs before every ssh session, so module import stays
+# down to os/sys: typing, functools, re, subprocess, random, getpass and
+# urllib are only imported by the code paths that need them.
+TYPE_CHECKING = False
+if TYPE_CHECKING:
+    from typing import (
+        Any,
+        Callable,
+        Iterable,
+        Iterator,
+        Optional,
+        TypedDict,
+    )
+
+    class HostCfg(TypedDict, total=False):
+        hostname: str
+        user: str
+        port: str
+        identityfile: str
+        localforward: list[str]
+
+else:
+    HostCfg = dict
+
+
+class Screen:
+    """In-process renderer for the interactive menus.
+
+    While a frame is open the screen stands in for ``sys.stdout``, so
+    menus keep using ``print`` and ``input``. Everything printed up to
+    the next flush (``input`` flushes before reading) goes out as one
+    write. With ANSI support only the rows that differ from the previous
+    frame are rewritten; dumb terminals and pipes get the whole frame.
+    """
+
+    HOME = "\x1b[H"
+    CLEAR = "\x1b[H\x1b[2J"
+    ERASE_LINE = "\x1b[K"
+    ERASE_BELOW = "\x1b[J"
+
+    def __init__(self, stream: Any) -> None:
+        self.stream = stream
+        self.ansi = self._detect_ansi()
+        self.encoding = getattr(stream, "encoding", "utf-8")
+        self.errors = getattr(stream, "errors", "strict")
+        self.buf: list[str] = []
+        self.rendered = False
+        # rows of the last frame still known to be on screen
+        self.shown: list[str] | None = None
+        self.extra_rows = 0
+        self.frames = 0
+
+        import atexit
+
+        atexit.register(self.close)
+
+    def _detect_ansi(self) -> bool:
+        try:
+            if not self.stream.isatty():
+                return False
+        except (AttributeError, ValueError):
+            return False
 
-def clear_console() -> None:
-    os.system("cls" if os.name == "nt" else "clear")
+        if os.name != "nt":
+            return os.environ.get("TERM", "") not in ("", "dumb")
 
+        # Windows 10+ consoles understand ANSI once VT processing is on
+        try:
+            import ctypes
 
-class HostCfg(TypedDict, total=False):
-    hostname: str
-    user: str
-    port: str
-    identityfile: str
-    localforward: list[str]
+            kernel32 = ctypes.windll.kernel32  # type: ignore[attr-defined]
+            handle = kernel32.GetStdHandle(-11)
+            mode = ctypes.c_uint32()
+            if not kernel32.GetConsoleMode(handle, ctypes.byref(mode)):
+                return False
+            return bool(kernel32.SetConsoleMode(handle, mode.value | 0x4))
+        except (AttributeError, OSError, ImportError):
+            return False
 
+    def size(self) -> tuple[int, int]:
+        try:
+            size = os.get_terminal_size(self.stream.fileno())
+            return size.lines, size.columns
+        except (AttributeError, OSError, ValueError):
+            return 0, 0
+
+    def clear(self) -> None:
+        # a frame that was never flushed would only flash on screen
+        if sys.stdout is self and self.rendered:
+            self.flush()
+        if not self.ansi and os.name == "nt" and self.stream.isatty():
+            # legacy console without VT support: keep the old behaviour
+            os.system("cls")
+        sys.stdout = self
+        self.buf = []
+        self.rendered = False
+        self.frames += 1
+
+    def write(self, text: str) -> int:
+        self.buf.append(text)
+        return len(text)
+
+    def writelines(self, lines: list[str]) -> None:
+        self.buf.extend(lines)
+
+    def isatty(self) -> bool:
+        return self.stream.isatty()
+
+    def writable(self) -> bool:
+        return True
 
-class Cancelled(Exception):
-    """User cancelled current action (e.g., pressed 'q')."""
+    def flush(self) -> None:
+        with span("render"):
+            self._flush()
+
+    def _flush(self) -> None:
+        text = "".join(self.buf)
+        self.buf = []
+
+        if self.rendered:
+            out = text
+            # the Enter that ended the prompt moved the cursor down a row
+            self.extra_rows += text.count("\n") + 1
+            rows, _ = self.size()
+            if self.shown is not None and (
+                not rows or len(self.shown) + self.extra_rows >= rows
+            ):
+                self.shown = None
+        else:
+            out = self._render(text)
+            self.rendered = True
+
+        if out:
+            self.stream.write(out)
+        self.stream.flush()
+
+    def _render(self, text: str) -> str:
+        if not self.ansi:
+            if os.name == "nt" or self.frames == 1:
+                return text
+            return "\n" + text
+
+        lines = text.split("\n")
+        prev = self.shown
+        rows, cols = self.size()
+        fits = (
+            rows
+            and len(lines) < rows
+            and all(len(line) < cols for line in lines)
+        )
 
-    pass
+        # the last row holds the prompt (and whatever the user types), so
+        # it is never trusted on the next frame
+        self.shown = lines[:-1] if fits else None
+        self.extra_rows = 0
 
+        if prev is None or not fits:
+            return self.CLEAR + text
 
-def require_ssh_private_key(
-    func: Callable[..., Any],
-) -> Callable[..., Optional[Any]]:
-    @wraps(func)
-    def wrapper(self: "ShortSSH", *args: Any, **kwargs: Any) -> Optional[Any]:
-        ssh_dir = os.path.dirname(self.path_ssh_config)
+        parts: list[str] = []
+        last = len(lines) - 1
+        for idx, line in enumerate(lines):
+            if idx < last and idx < len(prev) and prev[idx] == line:
+                continue
+            parts.append(f"\x1b[{idx + 1};1H{line}{self.ERASE_LINE}")
+        parts.append(self.ERASE_BELOW)
+        return "".join(parts)
 
-        if not os.path.isdir(ssh_dir):
-            os.makedirs(ssh_dir, exist_ok=True)
-            if not self.is_windows():
-                os.chmod(ssh_dir, 0o700)
+    def release(self) -> None:
+        """Flush the frame before a child process writes to the terminal;
+        the next frame is redrawn from scratch."""
+        if sys.stdout is self:
+            self.flush()
+        self.shown = None
 
-        private_keys: list[str] = []
+    def close(self) -> None:
+        if sys.stdout is self:
+            self.flush()
+            sys.stdout = self.stream
 
-        for name in os.listdir(ssh_dir):
-            path = os.path.join(ssh_dir, name)
-            if not os.path.isfile(path):
-                continue
 
-            low = name.lower()
+_screen: Screen | None = None
 
-            if low == "config":
-                continue
-            if low.startswith("known_hosts"):
-                continue
-            if low.endswith(".pub"):
-                continue
 
-            private_keys.append(name)
+def get_screen() -> Screen:
+    global _screen
+    if _screen is None:
+        _screen = Screen(sys.stdout)
+    return _screen
 
-        if not private_keys:
-            clear_console()
-            print(self.logo())
-            print("[!] No SSH private keys found")
-            print("\n[!] Create SSH key? (y/n)")
-            ch = input("\n[>]: ").strip().lower()
-            if ch == "y":
-                os.system("ssh-keygen -t ed25519")
-            input("\nPress Enter...")
-            return None
 
-        return func(self, *args, **kwargs)
+def clear_console() -> None:
+    get_screen().clear()
 
-    return wrapper
 
+def release_console() -> None:
+    if _screen is not None:
+        _screen.release()
 
-def require_ssh_config(
-    func: Callable[..., Any],
-) -> Callable[..., Optional[Any]]:
-    @wraps(func)
-    def wrapper(self: "ShortSSH", *args: Any, **kwargs: Any) -> Optional[Any]:
-        if not os.path.exists(self.path_ssh_config):
-            clear_console()
-            print(self.logo())
-            print(f"[!] SSH config file not found: {self.path_ssh_config}")
-            print("\n[!] Create SSH config file? (y/n)")
-            ch = input("\n" "[>]: ").strip().lower()
 
-            if ch == "y":
-                ssh_dir = os.path.dirname(self.path_ssh_config)
-                os.makedirs(ssh_dir, exist_ok=True)
-                if not self.is_windows():
-                    os.chmod(ssh_dir, 0o700)
-                with open(self.path_ssh_config, "w") as f:
-                    print("\n[+] Creating SSH config file...")
-                    f.write(
-                        """#-----------------#
-# ShortSSH Config #
-#-----------------#
-"""
-                    )
-                if not self.is_windows():
-                    os.chmod(self.path_ssh_config, 0o600)
-            return None
-        return func(self, *args, **kwargs)
+class Timings:
+    """Wall-clock spans for ``--timings``, reported on stderr.
 
-    return wrapper
+    Spans with the same name are summed; the report lists them in the
+    order they first started, indented by nesting depth.
+    """
 
+    def __init__(self) -> None:
+        from time import perf_counter
 
-class ShortSSH:
-    def __init__(self):
-        # General
-        self.name_app = "ShortSSH"
-        self.github_url = "github.com/CrudelisDeus"
-        self.version_app = ".dev"
+        self.clock = perf_counter
+        self.start = perf_counter()
+        self.depth = 0
+        # name -> [depth, calls, seconds]
+        self.spans: dict[str, list[Any]] = {}
 
-        # ShortSSH
-        self.port_host: int | None = None
-        self.user_host: str | None = None
-        self.ip_host: str | None = None
-        self.short_name_host: str | None = None
-        self.key_host: str | None = None
-        self.notes_host: str | None = None
-        self.client_port_forward: int | None = None
-        self.local_port_forward: int | None = None
-        self.host_group: str | None = None
+    def report(self) -> str:
+        total = self.clock() - self.start
+        w = max([len(n) + 2 * d for n, (d, _, _) in self.spans.items()] + [5])
+        lines = ["[*] Timings:"]
+        for name, (depth, calls, secs) in self.spans.items():
+            label = ("  " * depth + name).ljust(w)
+            count = f"  x{calls}" if calls > 1 else ""
+            lines.append(f"  {label}  {secs * 1000:9.1f} ms{count}")
+        lines.append(f"  {'total'.ljust(w)}  {total * 1000:9.1f} ms")
+        return "\n".join(lines)
 
-        # ---- FIX 1: robust HOME on Windows (prefer USERPROFILE) ----
-        if os.name == "nt":
-            home = os.environ.get("USERPROFILE") or os.path.expanduser("~")
-        else:
-            home = os.path.expanduser("~")
-        self.path_ssh_config = os.path.join(home, ".ssh", "config")
-        # -----------------------------------------------------------
 
-        self.program_dir = os.path.dirname(os.path.abspath(__file__))
-        self.backup_dir = os.path.join(self.program_dir, "backups")
+class _Span:
+    __slots__ = ("timings", "name", "t0")
 
-        self.add_forward: bool = False
+    def __init__(self, timings: Timings, name: str) -> None:
+        self.timings = timings
+        self.name = name
 
-        # logo
-        self.colors = [
-            "\033[38;5;20m",
-            "\033[38;5;52m",
-            "\033[38;5;57m",
-            "\033[38;5;63m",
-            "\033[38;5;88m",
-            "\033[38;5;93m",
-        ]
-        self.end_color = "\033[0m"
+    def __enter__(self) -> None:
+        t = self.timings
+        if self.name not in t.spans:
+            t.spans[self.name] = [t.depth, 0, 0.0]
+        t.depth += 1
+        self.t0 = t.clock()
 
-    def logo(self) -> str:
-        import random
+    def __exit__(self, *exc: object) -> None:
+        t = self.timings
+        entry = t.spans[self.name]
+        entry[1] += 1
+        entry[2] += t.clock() - self.t0
+        t.depth -= 1
 
-        selected_color = random.choice(self.colors)
 
-        logo = rf"""{selected_color}
-  / _ \
-\_\(_)/_/ {self.name_app}{self.end_color} v{self.version_app}
-{selected_color} _//o\\_{self.end_color}  {self.github_url}
-{selected_color}  /   \{self.end_color}
-"""
-        return logo
+class _NoSpan:
+    __slots__ = ()
 
-    # ------------------------------------------------------------------------
-    # check
-    # ------------------------------------------------------------------------
-    def check_updates(self) -> bool:
-        if self.version_app == ".dev":
-            return False
+    def __enter__(self) -> None:
+        return None
 
-        from urllib.request import Request, urlopen
+    def __exit__(self, *exc: object) -> None:
+        return None
 
-        req = Request(
-            "https://shortssh.deus-soft.org/actual_version",
-            headers={"User-Agent": "ShortSSH"},
-        )
 
-        try:
-            remote = urlopen(req, timeout=3).read().decode().strip()
-        except Exception:
-            return False
+_NO_SPAN = _NoSpan()
+_timings: Timings | None = None
+# set while SSSH_PROFILE is collecting a cProfile run
+_profiling = False
 
-        remote_internal = "." + remote.lstrip("v")
-        remote_display = "v." + remote.lstrip("v")
 
-        test_version = self.version_app
+def span(name: str) -> _Span | _NoSpan:
+    """``with span("phase"):`` times a phase when --timings is on; off,
+    it hands back one shared no-op object, so the calls can stay in."""
+    if _timings is None:
+        return _NO_SPAN
+    return _Span(_timings, name)
 
-        print(test_version)
-        print(remote_internal)
 
-        if tuple(map(int, remote_internal.lstrip(".").split("."))) > tuple(
-            map(int, test_version.lstrip(".").split("."))
-        ):
-            clear_console()
-            print(self.logo())
-            print(f"[!] New version available {remote_display}")
-            print("[*] Do you want to update? (y/n)")
-            ch = input("\n[>]: ").strip().lower()
-            if ch == "y":
-                return True
-            else:
-                return False
-        return False
+def instrumented() -> bool:
+    """True while timings or a profile are being collected, so the
+    process must finish instead of exec'ing into ssh."""
+    return _timings is not None or _profiling
 
-    def version(self) -> None:
-        version = self.version_app.strip()
-        if version.startswith("."):
-            version = version[1:]
-        print(f"{self.name_app} version: {version}")
 
-    def get_ssh_private_key_list(self) -> list[str]:
-        ssh_dir = os.path.dirname(self.path_ssh_config)
+def wraps(func: Callable[..., Any]) -> Callable[..., Any]:
+    """functools.wraps without importing functools at startup."""
 
-        if not os.path.isdir(ssh_dir):
-            return []
+    def decorate(wrapper: Callable[..., Any]) -> Callable[..., Any]:
+        for attr in ("__module__", "__name__", "__qualname__", "__doc__"):
+            setattr(wrapper, attr, getattr(func, attr))
+        wrapper.__dict__.update(func.__dict__)
+        wrapper.__wrapped__ = func  # type: ignore[attr-defined]
+        return wrapper
 
-        private_keys: list[str] = []
-        for name in os.listdir(ssh_dir):
-            path = os.path.join(ssh_dir, name)
-            if not os.path.isfile(path):
+    return decorate
+
+
+class Cancelled(Exception):
+    """User cancelled current action (e.g., pressed 'q')."""
+
+    pass
+
+
+UNGROUPED = "Ungrouped"
+
+# ssh_config(5): Include recursion stops at this depth (READCONF_MAX_DEPTH)
+MAX_INCLUDE_DEPTH = 16
+
+
+def parse_group_marker(line: str) -> str | None:
+    r"""Group name of a ``# G: <group>`` comment line, else None.
+
+    Same as ``^\s*#\s*G\s*:\s*(.+?)\s*$`` (case-insensitive) without
+    importing ``re`` at startup.
+    """
+    s = line.strip()
+    if not s.startswith("#"):
+        return None
+    s = s[1:].lstrip()
+    if s[:1] not in ("G", "g"):
+        return None
+    s = s[1:].lstrip()
+    if not s.startswith(":"):
+        return None
+    return s[1:].strip() or None
+
+
+class SshHost:
+    """One ``Host`` block of ~/.ssh/config.
+
+    ``start``/``end`` are the line span of the block (``end`` exclusive)
+    in ``source``, ``marker`` is the line of its ``# G:`` comment or -1.
+    """
+
+    __slots__ = (
+        "names",
+        "hostname",
+        "user",
+        "port",
+        "identityfile",
+        "localforward",
+        "notes",
+        "group",
+        "start",
+        "end",
+        "marker",
+        "source",
+    )
+
+    def __init__(
+        self,
+        names: list[str],
+        start: int,
+        group: str | None = None,
+        marker: int = -1,
+        source: str = "",
+    ) -> None:
+        self.names = names
+        self.hostname: str | None = None
+        self.user: str | None = None
+        self.port: str | None = None
+        self.identityfile: str | None = None
+        self.localforward: list[str] = []
+        self.notes: str | None = None
+        self.group = group
+        self.start = start
+        self.end = start + 1
+        self.marker = marker
+        self.source = source
+
+    @property
+    def name(self) -> str:
+        return self.names[0]
+
+    def to_row(self) -> tuple[Any, ...]:
+        # ``source`` is implied by the file the row is stored for
+        return (
+            self.names,
+            self.hostname,
+            self.user,
+            self.port,
+            self.identityfile,
+            self.localforward,
+            self.notes,
+            self.group,
+            self.start,
+            self.end,
+            self.marker,
+        )
+
+    @classmethod
+    def from_row(cls, row: tuple[Any, ...], source: str) -> "SshHost":
+        host = cls.__new__(cls)
+        (
+            host.names,
+            host.hostname,
+            host.user,
+            host.port,
+            host.identityfile,
+            host.localforward,
+            host.notes,
+            host.group,
+            host.start,
+            host.end,
+            host.marker,
+        ) = row
+        host.source = source
+        return host
+
+    # keys of to_record(), also the CSV/TSV header
+    RECORD_FIELDS = (
+        "name",
+        "aliases",
+        "hostname",
+        "user",
+        "port",
+        "identityfile",
+        "localforward",
+        "notes",
+        "group",
+        "source",
+    )
+
+    def to_record(self) -> dict[str, Any]:
+        """All parsed fields, as written by ``--format``."""
+        return {
+            "name": self.names[0],
+            "aliases": self.names[1:],
+            "hostname": self.hostname,
+            "user": self.user,
+            "port": self.port,
+            "identityfile": self.identityfile,
+            "localforward": self.localforward,
+            "notes": self.notes,
+            "group": self.group,
+            "source": self.source,
+        }
+
+    def to_cfg(self, expand_identity: bool = True) -> HostCfg:
+        cfg: HostCfg = {"localforward": list(self.localforward)}
+        if self.hostname is not None:
+            cfg["hostname"] = self.hostname
+        if self.user is not None:
+            cfg["user"] = self.user
+        if self.port is not None:
+            cfg["port"] = self.port
+        if self.identityfile is not None:
+            if expand_identity:
+                cfg["identityfile"] = os.path.expanduser(self.identityfile)
+            else:
+                cfg["identityfile"] = self.identityfile
+        return cfg
+
+
+class SshConfigFile:
+    """A single ssh config file parsed into host records.
+
+    ``includes`` keeps the ``Include`` directives as ``(line, args)`` so
+    the files they name can be resolved and loaded separately.
+    """
+
+    def __init__(self, path: str, lines: list[str] | None = None) -> None:
+        self.path = path
+        self._lines = lines
+        self.hosts: list[SshHost] = []
+        self.by_name: dict[str, SshHost] = {}
+        self.includes: list[tuple[int, str]] = []
+        self.prelude_end = 0
+
+    @classmethod
+    def load(cls, path: str) -> "SshConfigFile":
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            cfg = cls(path, f.readlines())
+        cfg._parse()
+        return cfg
+
+    @classmethod
+    def from_text(cls, path: str, text: str) -> "SshConfigFile":
+        cfg = cls(path, text.splitlines(keepends=True))
+        cfg._parse()
+        return cfg
+
+    @classmethod
+    def from_rows(
+        cls,
+        path: str,
+        prelude_end: int,
+        includes: list[tuple[int, str]],
+        rows: list[tuple[Any, ...]],
+    ) -> "SshConfigFile":
+        cfg = cls(path)
+        cfg.prelude_end = prelude_end
+        cfg.includes = [tuple(inc) for inc in includes]
+        for row in rows:
+            cfg._add(SshHost.from_row(row, path))
+        return cfg
+
+    def to_rows(self) -> list[tuple[Any, ...]]:
+        return [host.to_row() for host in self.hosts]
+
+    @property
+    def lines(self) -> list[str]:
+        # Files restored from the parse cache only read the text back
+        # when a command needs the raw blocks (sort, edit, delete).
+        if self._lines is None:
+            with open(self.path, "r", encoding="utf-8", errors="replace") as f:
+                self._lines = f.readlines()
+        return self._lines
+
+    def _parse(self) -> None:
+        cur: SshHost | None = None
+        collecting = False
+        pending_group: str | None = None
+        pending_marker = -1
+        self.prelude_end = len(self.lines)
+
+        for i, raw in enumerate(self.lines):
+            s = raw.strip()
+            if not s:
                 continue
 
-            low = name.lower()
+            if s[0] == "#":
+                group = parse_group_marker(s)
+                if group is not None:
+                    if cur is not None:
+                        cur.end = i
+                        cur = None
+                    if i < self.prelude_end:
+                        self.prelude_end = i
+                    pending_group = group
+                    pending_marker = i
+                    continue
 
-            if low == "config":
+                if collecting and cur is not None:
+                    c = s[1:].strip()
+                    c_low = c.lower()
+                    if c_low.startswith("notes:"):
+                        cur.notes = c.split(":", 1)[1].strip()
+                    elif c_low.startswith("notes "):
+                        cur.notes = c.split(None, 1)[1].strip()
                 continue
-            if low.startswith("known_hosts"):
+
+            parts = s.split(None, 1)
+            key = parts[0].lower()
+            val = parts[1].strip() if len(parts) > 1 else ""
+
+            if key == "host" and val:
+                if cur is not None:
+                    cur.end = i
+                if i < self.prelude_end:
+                    self.prelude_end = i
+                cur = SshHost(
+                    val.split(),
+                    i,
+                    pending_group,
+                    pending_marker,
+                    self.path,
+                )
+                collecting = True
+                pending_group = None
+                pending_marker = -1
+                self._add(cur)
                 continue
-            if low.endswith(".pub"):
+
+            if key == "match":
+                # Match sections stay inside the current span (they move
+                # with it when sorting) but never feed its fields.
+                collecting = False
                 continue
 
-            private_keys.append(name)
+            if key == "include" and val:
+                self.includes.append((i, val))
+                continue
 
-        return sorted(private_keys)
+            if not collecting or cur is None or not val:
+                continue
 
-    def get_backup_list(self) -> list[str]:
-        if not os.path.isdir(self.backup_dir):
-            return []
+            if key == "hostname":
+                cur.hostname = val
+            elif key == "user":
+                cur.user = val
+            elif key == "port":
+                cur.port = val
+            elif key == "identityfile":
+                cur.identityfile = val
+            elif key == "localforward":
+                cur.localforward.append(val)
+
+        if cur is not None:
+            cur.end = len(self.lines)
+
+    def _add(self, host: SshHost) -> None:
+        self.hosts.append(host)
+        for name in host.names:
+            self.by_name.setdefault(name.lower(), host)
+
+    def block(self, host: SshHost) -> str:
+        return "".join(self.lines[host.start : host.end])
+
+    def span(self, host: SshHost) -> tuple[int, int]:
+        """Lines of the block including its ``# G:`` marker."""
+        start = host.marker if 0 <= host.marker < host.start else host.start
+        return start, host.end
+
+    def block_spans(self) -> tuple[int, list[tuple[int, int]]]:
+        """End of the prelude and one ``(start, end)`` per host that
+        together cover the rest of the file, for moving whole blocks.
+
+        A block starts at its ``# G:`` marker, or earlier at comment
+        lines directly above it that follow a blank line: those describe
+        the block below rather than trail the one above.
+        """
+        lines = self.lines
+        starts: list[int] = []
+        for host in self.hosts:
+            start = self.span(host)[0]
+            i = start
+            while i > 0 and lines[i - 1].lstrip().startswith("#"):
+                i -= 1
+            if i < start and i > 0 and not lines[i - 1].strip():
+                start = i
+            starts.append(start)
+
+        ends = starts[1:] + [len(lines)]
+        prelude_end = starts[0] if starts else len(lines)
+        return prelude_end, list(zip(starts, ends))
+
+
+# fields compared by diff_config_files, in display order
+DIFF_FIELDS = (
+    "names",
+    "hostname",
+    "user",
+    "port",
+    "identityfile",
+    "localforward",
+    "notes",
+    "group",
+)
+
+
+def diff_config_files(
+    old: SshConfigFile,
+    new: SshConfigFile,
+) -> list[tuple[str, str, list[tuple[str, Any, Any]]]]:
+    """Host-by-host diff keyed by the first short name.
+
+    Returns ``(op, name, changes)`` with op ``+`` (added), ``-`` (removed)
+    or ``~`` (changed); ``changes`` lists ``(field, old, new)``. Options
+    the host model does not track show up as field ``other``.
+    """
+
+    def keyed(cfg: SshConfigFile) -> dict[str, SshHost]:
+        hosts: dict[str, SshHost] = {}
+        for host in cfg.hosts:
+            hosts.setdefault(host.name.lower(), host)
+        return hosts
+
+    modeled = ("hostname", "user", "port", "identityfile", "localforward")
+
+    def other(cfg: SshConfigFile, host: SshHost) -> list[str]:
+        out = []
+        for line in cfg.lines[host.start + 1 : host.end]:
+            words = line.split()
+            if not words or words[0].lower() in modeled:
+                continue
+            line = " ".join(words)
+            if line[0] == "#" and (
+                parse_group_marker(line) is not None
+                or line[1:].strip().lower().startswith("notes")
+            ):
+                continue
+            out.append(line)
+        return out
+
+    before = keyed(old)
+    after = keyed(new)
+    result: list[tuple[str, str, list[tuple[str, Any, Any]]]] = []
+
+    for key, host in before.items():
+        if key not in after:
+            result.append(("-", host.name, []))
+
+    for key, host in after.items():
+        prev = before.get(key)
+        if prev is None:
+            result.append(("+", host.name, []))
+            continue
+
+        changes = [
+            (field, getattr(prev, field), getattr(host, field))
+            for field in DIFF_FIELDS
+            if getattr(prev, field) != getattr(host, field)
+        ]
+        lines_old = other(old, prev)
+        lines_new = other(new, host)
+        if lines_old != lines_new:
+            changes.append(("other", lines_old, lines_new))
+        if changes:
+            result.append(("~", host.name, changes))
+
+    return result
+
+
+class ConfigEditor:
+    """Host-level edits on the text of one config file.
+
+    The lines are cut into segments: the text between hosts, and one
+    segment per host span (``# G:`` marker through the end of the
+    block). Edits touch only their own segment, so a batch of thousands
+    of operations costs one pass to build and one join to write.
+    """
+
+    INDENT = "        "
+    OPTIONS = {
+        "hostname": "HostName",
+        "user": "User",
+        "port": "Port",
+        "identityfile": "IdentityFile",
+    }
+
+    def __init__(self, cfg: SshConfigFile) -> None:
+        lines = cfg.lines
+        self.segments: list[list[str]] = []
+        self.names: dict[int, list[str]] = {}
+        self.index: dict[str, int] = {}
+
+        pos = 0
+        for host in cfg.hosts:
+            start, end = cfg.span(host)
+            if start > pos:
+                self.segments.append(lines[pos:start])
+            self._register(host.names, len(self.segments))
+            self.segments.append(lines[start:end])
+            pos = end
+        if pos < len(lines):
+            self.segments.append(lines[pos:])
+
+    def _register(self, names: list[str], seg: int) -> None:
+        self.names[seg] = names
+        for name in names:
+            self.index.setdefault(name.lower(), seg)
+
+    def has(self, name: str) -> bool:
+        return name.lower() in self.index
+
+    def text(self) -> str:
+        return "".join(line for seg in self.segments for line in seg)
+
+    @classmethod
+    def render(cls, record: dict[str, Any]) -> list[str]:
+        """Block lines in the layout the add menu writes."""
+        out: list[str] = []
+        if record.get("group"):
+            out.append(f"# G: {record['group']}\n")
+        names = [record["name"], *(record.get("aliases") or [])]
+        out.append(f"Host {' '.join(names)}\n")
+        for field, option in cls.OPTIONS.items():
+            if record.get(field):
+                out.append(f"{cls.INDENT}{option} {record[field]}\n")
+        if record.get("notes"):
+            out.append(f"{cls.INDENT}# Notes: {record['notes']}\n")
+        for forward in record.get("localforward") or []:
+            out.append(f"{cls.INDENT}LocalForward {forward}\n")
+        return out
+
+    def add(self, record: dict[str, Any]) -> None:
+        last = next((seg for seg in reversed(self.segments) if seg), [])
+        if last and not last[-1].endswith("\n"):
+            last[-1] += "\n"
+        if last and last[-1].strip():
+            # one blank line between blocks, as --sort writes them
+            self.segments.append(["\n"])
+        names = [record["name"], *(record.get("aliases") or [])]
+        self._register(names, len(self.segments))
+        self.segments.append(self.render(record))
+
+    def delete(self, name: str) -> None:
+        seg = self.index[name.lower()]
+        for alias in self.names.pop(seg):
+            if self.index.get(alias.lower()) == seg:
+                del self.index[alias.lower()]
+        self.segments[seg] = []
+
+    def update(self, name: str, changes: dict[str, Any]) -> None:
+        seg = self.index[name.lower()]
+        lines = self.segments[seg]
+
+        def key(line: str) -> str:
+            words = line.split(None, 1)
+            return words[0].lower() if words else ""
+
+        def is_notes(line: str) -> bool:
+            text = line.strip()
+            return text[:1] == "#" and text[1:].strip().lower().startswith(
+                "notes"
+            )
 
-        return sorted(
-            f
-            for f in os.listdir(self.backup_dir)
-            if os.path.isfile(os.path.join(self.backup_dir, f))
-        )
+        head = next(i for i, line in enumerate(lines) if key(line) == "host")
+        # options end at a Match section or the trailing blank lines
+        stop = len(lines)
+        for i in range(head + 1, len(lines)):
+            if key(lines[i]) == "match":
+                stop = i
+                break
+        while stop > head + 1 and not lines[stop - 1].strip():
+            stop -= 1
+        body = lines[head + 1 : stop]
+
+        if "aliases" in changes:
+            names = [self.names[seg][0], *(changes["aliases"] or [])]
+            for alias in self.names[seg]:
+                if self.index.get(alias.lower()) == seg:
+                    del self.index[alias.lower()]
+            self._register(names, seg)
+            lines[head] = f"Host {' '.join(names)}\n"
+
+        for field, option in self.OPTIONS.items():
+            if field not in changes:
+                continue
+            value = changes[field]
+            new = f"{self.INDENT}{option} {value}\n" if value else None
+            at = next((i for i, ln in enumerate(body) if key(ln) == field), -1)
+            if at >= 0:
+                body[at : at + 1] = [new] if new else []
+            elif new:
+                body.append(new)
+
+        if "notes" in changes:
+            value = changes["notes"]
+            new = f"{self.INDENT}# Notes: {value}\n" if value else None
+            at = next((i for i, ln in enumerate(body) if is_notes(ln)), -1)
+            if at >= 0:
+                body[at : at + 1] = [new] if new else []
+            elif new:
+                body.append(new)
+
+        if "localforward" in changes:
+            body = [ln for ln in body if key(ln) != "localforward"]
+            body.extend(
+                f"{self.INDENT}LocalForward {forward}\n"
+                for forward in changes["localforward"] or []
+            )
 
-    def is_windows(self) -> bool:
-        return os.name == "nt"
+        lines[head + 1 : stop] = body
 
-    def check_backup_exists(self, name: str) -> bool:
-        path = os.path.join(self.backup_dir, name)
-        return os.path.isfile(path)
+        if "group" in changes:
+            marker = [
+                ln for ln in lines[:head] if parse_group_marker(ln) is not None
+            ]
+            if marker:
+                lines.remove(marker[0])
+            if changes["group"]:
+                lines.insert(0, f"# G: {changes['group']}\n")
 
-    def check_host_ip(self, ip: str) -> bool:
-        ip = ip.strip()
-        parts = ip.split(".")
-        if len(parts) != 4:
-            return False
-        for part in parts:
-            if not part.isdigit():
-                return False
-            num = int(part)
-            if num < 0 or num > 255:
-                return False
-        return True
 
-    def check_host_port(self, port: str) -> bool:
-        port = port.strip()
-        if not port.isdigit():
-            return False
-        num = int(port)
-        if num < 1 or num > 65535:
-            return False
-        return True
+class SshConfig:
+    """~/.ssh/config and the files it includes, parsed into host records.
 
-    def check_host_short_name(self, short_name: str) -> bool:
-        short_name = short_name.strip()
-        if not short_name:
-            return False
-        if " " in short_name:
-            return False
-        return True
+    Hosts are indexed by lower-cased name (first block wins, as in ssh)
+    and by ``# G:`` group (``Ungrouped`` when the block has no marker).
+    Included files are only loaded when a query needs them: a single
+    host lookup stops opening files once the host is found.
+    """
 
-    def check_host_exists(self, short_name: str) -> bool:
-        short_name = short_name.strip()
-        if not os.path.isfile(self.path_ssh_config):
-            return False
+    def __init__(
+        self,
+        root: SshConfigFile,
+        loader: Callable[[str], SshConfigFile | None],
+    ) -> None:
+        self.root = root
+        self.path = root.path
+        self._loader = loader
+        self._files: dict[str, SshConfigFile] = {root.path: root}
+        self._hosts: list[SshHost] | None = None
+        self._by_name: dict[str, SshHost] = {}
+        self._by_group: dict[str, list[SshHost]] = {}
+
+    # root file, the only one sort/edit rewrite
+    @property
+    def lines(self) -> list[str]:
+        return self.root.lines
+
+    @property
+    def prelude_end(self) -> int:
+        return self.root.prelude_end
+
+    @property
+    def hosts(self) -> list[SshHost]:
+        if self._hosts is None:
+            with span("config walk"):
+                hosts = list(self._walk(self.root, (self.root.path,)))
+            for host in hosts:
+                for name in host.names:
+                    self._by_name.setdefault(name.lower(), host)
+                group = host.group or UNGROUPED
+                self._by_group.setdefault(group, []).append(host)
+            self._hosts = hosts
+        return self._hosts
+
+    @property
+    def by_name(self) -> dict[str, SshHost]:
+        self.hosts
+        return self._by_name
+
+    @property
+    def by_group(self) -> dict[str, list[SshHost]]:
+        self.hosts
+        return self._by_group
+
+    def iter_hosts(self) -> Iterator[SshHost]:
+        """Hosts in config order; included files are only opened when
+        the walk reaches their ``Include`` line."""
+        if self._hosts is not None:
+            return iter(self._hosts)
+        return self._walk(self.root, (self.root.path,))
+
+    def _walk(
+        self,
+        cfg: SshConfigFile,
+        chain: tuple[str, ...],
+    ) -> Iterator[SshHost]:
+        pos = 0
+        for line, args in cfg.includes:
+            while pos < len(cfg.hosts) and cfg.hosts[pos].start < line:
+                yield cfg.hosts[pos]
+                pos += 1
+            for sub in self._included(args, chain):
+                yield from self._walk(sub, chain + (sub.path,))
+        yield from cfg.hosts[pos:]
+
+    def _find(
+        self,
+        cfg: SshConfigFile,
+        name: str,
+        chain: tuple[str, ...],
+    ) -> SshHost | None:
+        host = cfg.by_name.get(name)
+        for line, args in cfg.includes:
+            if host is not None and line > host.start:
+                break
+            for sub in self._included(args, chain):
+                found = self._find(sub, name, chain + (sub.path,))
+                if found is not None:
+                    return found
+        return host
 
-        with open(
-            self.path_ssh_config,
-            "r",
-            encoding="utf-8",
-            errors="replace",
-        ) as f:
-            for line in f:
-                s = line.strip()
-                if not s:
+    def _included(
+        self,
+        args: str,
+        chain: tuple[str, ...],
+    ) -> Iterator[SshConfigFile]:
+        # ssh refuses to go deeper than MAX_INCLUDE_DEPTH; a file that
+        # includes itself is skipped instead of repeated until then
+        if len(chain) >= MAX_INCLUDE_DEPTH:
+            return
+
+        for path in self.include_paths(args):
+            if path in chain:
+                continue
+            sub = self._files.get(path)
+            if sub is None:
+                sub = self._loader(path)
+                if sub is None:
                     continue
-                if s.lower().startswith("host "):
-                    parts = s.split()
-                    if short_name in parts[1:]:
-                        return True
-        return False
+                self._files[path] = sub
+            yield sub
 
-    # ------------------------------------------------------------------------
-    # functionality
-    # ------------------------------------------------------------------------
-    def run_update(self) -> None:
-        if self.check_updates():
-            clear_console()
-            print(self.logo())
+    def include_paths(self, args: str) -> list[str]:
+        """Files named by an ``Include`` line, as ssh would open them."""
+        import glob
 
-            print("Updating ShortSSH...")
+        if '"' in args or "'" in args:
+            import shlex
 
-            if os.name == "nt":
-                ps_cmd = (
-                    "Invoke-WebRequest "
-                    '"https://raw.githubusercontent.com/CrudelisDeus/'
-                    'ShortSSH/main/install.bat" '
-                    "-OutFile "
-                    '"$env:USERPROFILE\\Downloads\\ShortSSH-install.bat"; '
-                    'cd "$env:USERPROFILE\\Downloads"; '
-                    ".\\ShortSSH-install.bat"
-                )
-
-                subprocess.run(
-                    [
-                        "powershell",
-                        "-ExecutionPolicy",
-                        "Bypass",
-                        "-Command",
-                        ps_cmd,
-                    ]
-                )
+            patterns = shlex.split(args)
+        else:
+            patterns = args.split()
+
+        base = os.path.dirname(self.root.path)
+        paths: list[str] = []
+        for pattern in patterns:
+            pattern = os.path.expanduser(pattern)
+            # relative paths are taken from ~/.ssh, not from the file
+            # containing the Include
+            if not os.path.isabs(pattern):
+                pattern = os.path.join(base, pattern)
+            if glob.has_magic(pattern):
+                paths.extend(sorted(glob.glob(pattern)))
             else:
-                unix_cmd = (
-                    "sudo curl -L https://shortssh.deus-soft.org/shortssh.py "
-                    "-o /usr/local/bin/sssh && "
-                    "sudo chmod +x /usr/local/bin/sssh && "
-                    "sudo sed -i 's/\\r$//' /usr/local/bin/sssh"
-                )
+                paths.append(pattern)
+        return [os.path.normpath(p) for p in paths if os.path.isfile(p)]
 
-                subprocess.run(["bash", "-c", unix_cmd])
+    def get(self, name: str) -> SshHost | None:
+        name = name.strip().lower()
+        if self._hosts is not None:
+            return self._by_name.get(name)
+        return self._find(self.root, name, (self.root.path,))
 
-            sys.exit(0)
+    def group_order(self) -> list[str]:
+        order: list[str] = []
+        if UNGROUPED in self.by_group:
+            order.append(UNGROUPED)
+        order.extend(sorted(g for g in self.by_group if g != UNGROUPED))
+        return order
+
+    @property
+    def files(self) -> list[str]:
+        """Paths of every file loaded so far (all of them after ``hosts``)."""
+        return list(self._files)
+
+    def file_of(self, host: SshHost) -> SshConfigFile:
+        return self._files.get(host.source, self.root)
+
+    def block(self, host: SshHost) -> str:
+        return self.file_of(host).block(host)
+
+
+class HostSearch:
+    """Fuzzy, ranked host search backed by a trigram index.
+
+    Every host is indexed as one lower-cased document of its short
+    names, HostName, User, Port, notes and group. Query terms of three
+    or more characters only look at hosts sharing at least half of the
+    term's trigrams; shorter terms fall back to a substring scan.
+    """
+
+    # field, weight: a hit on the short name ranks above one in notes
+    FIELDS = (
+        ("name", 1.0),
+        ("hostname", 0.9),
+        ("group", 0.8),
+        ("notes", 0.7),
+        ("user", 0.6),
+        ("port", 0.6),
+    )
+    MIN_SCORE = 0.3
+
+    def __init__(
+        self,
+        hosts: list[SshHost],
+        docs: list[str] | None = None,
+        postings: dict[str, bytes] | None = None,
+    ) -> None:
+        self.hosts = hosts
+        self.docs = (
+            docs if docs is not None else [self.document(h) for h in hosts]
+        )
+        self.postings = (
+            postings if postings is not None else self.build(self.docs)
+        )
 
-    @require_ssh_config
-    def output_command_for_host(self, host_name: str) -> None:
-        print(self.logo())
+    @staticmethod
+    def fields(host: SshHost) -> dict[str, str]:
+        return {
+            "name": " ".join(host.names).lower(),
+            "hostname": (host.hostname or "").lower(),
+            "group": (host.group or "").lower(),
+            "notes": (host.notes or "").lower(),
+            "user": (host.user or "").lower(),
+            "port": host.port or "",
+        }
 
-        host_name = host_name.strip()
-        if not host_name:
-            print("[!] Host name is empty. Example: sssh -c Test")
-            return
+    @classmethod
+    def document(cls, host: SshHost) -> str:
+        return " " + " ".join(cls.fields(host).values()) + " "
 
-        cfg = self._read_ssh_host_config(host_name)
-        if cfg is None:
-            print(f"[!] Host '{host_name}' not found in SSH config")
-            return
+    @staticmethod
+    def trigrams(text: str) -> set[str]:
+        return {text[i : i + 3] for i in range(len(text) - 2)}
 
-        print("[>] Full command for host:\n")
+    @classmethod
+    def build(cls, docs: list[str]) -> dict[str, bytes]:
+        from array import array
 
-        ssh_parts: list[str] = ["ssh"]
+        index: dict[str, list[int]] = {}
+        for i, doc in enumerate(docs):
+            for gram in cls.trigrams(doc):
+                ids = index.get(gram)
+                if ids is None:
+                    index[gram] = [i]
+                else:
+                    ids.append(i)
+        # postings stay packed until a query needs them
+        return {g: array("I", ids).tobytes() for g, ids in index.items()}
 
-        identity = cfg.get("identityfile")
-        if identity:
-            ssh_parts += ["-i", identity]
+    def _ids(self, gram: str) -> set[int]:
+        from array import array
 
-        port = cfg.get("port") or "22"
-        ssh_e_port = port
-        ssh_parts += ["-p", port]
+        return set(array("I", self.postings.get(gram, b"")))
 
-        forwards = cfg.get("localforward", [])
-        forward_args: list[str] = []
-        for fwd in forwards:
-            fwd = fwd.strip()
-            if not fwd:
+    def _candidates(self, term: str) -> set[int]:
+        if len(term) < 3:
+            return {i for i, doc in enumerate(self.docs) if term in doc}
+
+        # exact substring hits first: every trigram of the term must be
+        # present, so intersect the rarest postings and verify
+        inner = sorted(self.trigrams(term), key=self._ids_size)
+        ids = self._ids(inner[0])
+        for gram in inner[1:]:
+            if not ids:
+                break
+            ids &= self._ids(gram)
+        hits = {i for i in ids if term in self.docs[i]}
+        if hits:
+            return hits
+
+        # fuzzy fallback; padding lets word boundaries count, so "webb1"
+        # still finds web1
+        grams = self.trigrams(f" {term} ")
+        counts: dict[int, int] = {}
+        for gram in grams:
+            for i in self._ids(gram):
+                counts[i] = counts.get(i, 0) + 1
+
+        need = (len(grams) + 1) // 2
+        return {i for i, n in counts.items() if n >= need}
+
+    def _ids_size(self, gram: str) -> int:
+        return len(self.postings.get(gram, b""))
+
+    def _term_score(self, fields: dict[str, str], term: str) -> float:
+        grams = self.trigrams(f" {term} ") if len(term) >= 3 else set()
+        best = 0.0
+        for field, weight in self.FIELDS:
+            value = fields[field]
+            if not value:
                 continue
-            parts = fwd.split(None, 1)
-            if len(parts) == 2:
-                local, remote = parts
-                forward_args += ["-L", f"{local}:{remote}"]
+            if value == term or term in value.split():
+                score = 1.0
+            elif value.startswith(term):
+                score = 0.9
+            elif term in value:
+                score = 0.75
+            elif grams:
+                shared = len(grams & self.trigrams(f" {value} "))
+                score = 0.6 * shared / len(grams)
             else:
-                forward_args += ["-L", fwd]
+                score = 0.0
+            best = max(best, score * weight)
+        return best
 
-        user = cfg.get("user")
-        hostname = cfg.get("hostname")
-        target = host_name
+    def search(
+        self,
+        query: str,
+        limit: int | None = None,
+    ) -> list[tuple[float, SshHost]]:
+        terms = query.lower().split()
+        if not terms:
+            return []
 
-        if hostname:
-            target = f"{user}@{hostname}" if user else hostname
-        elif user:
-            target = f"{user}@{host_name}"
+        candidates: set[int] | None = None
+        for term in terms:
+            ids = self._candidates(term)
+            candidates = ids if candidates is None else candidates & ids
+            if not candidates:
+                return []
+
+        assert candidates is not None
+        results: list[tuple[float, SshHost]] = []
+        for i in candidates:
+            host = self.hosts[i]
+            fields = self.fields(host)
+            scores = [self._term_score(fields, term) for term in terms]
+            if min(scores) < self.MIN_SCORE:
+                continue
+            results.append((sum(scores) / len(scores), host))
 
-        ssh_cmd = " ".join(ssh_parts + [target])
-        print(ssh_cmd)
+        results.sort(key=lambda r: (-r[0], r[1].name.lower()))
+        return results[:limit] if limit else results
 
-        if forward_args:
-            ssh_fwd_cmd = " ".join(ssh_parts + forward_args + [target])
-            print(ssh_fwd_cmd)
 
-        ssh_e: list[str] = ["ssh"]
-        short_e: list[str] = ["ssh"]
-        if identity:
-            ssh_e += ["-i", identity]
-        short_e += ["-p", ssh_e_port]
-        ssh_e += ["-p", ssh_e_port]
-        ssh_e_str = " ".join(ssh_e)
-        short_e_str = " ".join(short_e)
+class SshConfigCache:
+    """On-disk cache of parsed config files, one marshal file each.
 
-        rsync_cmd = f'rsync -rvu --progress ./* -e "{ssh_e_str}" {target}:~/'
-        print(rsync_cmd)
+    An entry is valid while the file keeps the same path, mtime_ns,
+    size and inode; anything else is a miss and triggers a full parse.
+    Included files get entries of their own, so editing one fragment
+    only re-parses that fragment.
+    The host table is stored column by column as joined strings, which
+    loads several times faster than one marshal tuple per host.
+    """
 
-        scp_parts: list[str] = ["scp", "-r"]
-        if identity:
-            scp_parts += ["-i", identity]
-        scp_parts += ["-P", ssh_e_port]
-        scp_cmd = " ".join(scp_parts + ["./*", f"{target}:~/"])
-        print(scp_cmd)
+    VERSION = 2
 
-        print("\n[>] Short command for host:\n")
+    # columns of SshHost.to_row(): names, localforward, int spans
+    LIST_COLUMNS = (0, 5)
+    INT_COLUMNS = (8, 9, 10)
+    SEP = "\x1f"
+    LIST_SEP = "\x1e"
+    NONE = "\x00"
 
-        short_cmd = f"ssh -p {ssh_e_port} {target}"
-        print(short_cmd)
-        short_rsync_cmd = (
-            f"rsync -rvu --progress ./* " f'-e "{short_e_str}" ' f"{target}:~/"
-        )
-        print(short_rsync_cmd)
-        short_scp_cmd = f"scp -r -P {ssh_e_port} ./* {target}:~/"
-        print(short_scp_cmd)
+    def __init__(self, cache_dir: str, enabled: bool = True) -> None:
+        self.cache_dir = cache_dir
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
 
-    def _read_ssh_host_config(self, host_name: str) -> HostCfg | None:
-        host_name_l = host_name.lower()
+    def entry_path(self, path: str) -> str:
+        import zlib
 
-        current: HostCfg | None = None
-        in_target = False
+        crc = zlib.crc32(os.path.abspath(path).encode("utf-8", "replace"))
+        return os.path.join(self.cache_dir, f"config-{crc:08x}.bin")
 
-        with open(
-            self.path_ssh_config,
-            "r",
-            encoding="utf-8",
-            errors="replace",
-        ) as f:
-            for raw in f:
-                line = raw.strip()
-                if not line or line.startswith("#"):
-                    continue
+    def load(self, path: str, st: os.stat_result) -> SshConfigFile:
+        if not self.enabled:
+            return SshConfigFile.load(path)
 
-                low = line.lower()
+        import marshal
 
-                if low.startswith("host "):
-                    if in_target:
-                        return current
+        key = (
+            os.path.abspath(path),
+            st.st_mtime_ns,
+            st.st_size,
+            st.st_ino,
+        )
+        entry = self.entry_path(path)
 
-                    parts = line.split()
-                    names = [p.lower() for p in parts[1:]]
-                    in_target = host_name_l in names
-                    if in_target:
-                        current = {"localforward": []}
-                    continue
+        try:
+            with open(entry, "rb") as f:
+                payload = marshal.loads(f.read())
+            version, cached_key, prelude_end, includes, columns = payload
+            if version == self.VERSION and tuple(cached_key) == key:
+                # Rebuilding the table allocates tens of thousands of
+                # objects that all survive; collecting meanwhile only
+                # rescans them.
+                import gc
+
+                gc_was_enabled = gc.isenabled()
+                gc.disable()
+                try:
+                    rows = self.decode(columns)
+                    cfg = SshConfigFile.from_rows(
+                        path, prelude_end, includes, rows
+                    )
+                finally:
+                    if gc_was_enabled:
+                        gc.enable()
+                self.hits += 1
+                return cfg
+        except (OSError, EOFError, ValueError, TypeError):
+            pass
 
-                if not in_target or current is None:
-                    continue
+        self.misses += 1
+        cfg = SshConfigFile.load(path)
+        columns = self.encode(cfg.to_rows())
+        self.store(
+            entry,
+            (self.VERSION, key, cfg.prelude_end, cfg.includes, columns),
+        )
+        return cfg
+
+    def encode(self, rows: list[tuple[Any, ...]]) -> list[Any]:
+        columns: list[Any] = []
+        for idx, col in enumerate(zip(*rows)):
+            if idx in self.INT_COLUMNS:
+                columns.append(list(col))
+            elif idx in self.LIST_COLUMNS:
+                joined = (self.LIST_SEP.join(v) for v in col)
+                columns.append(self.SEP.join(joined))
+            else:
+                columns.append(
+                    self.SEP.join(self.NONE if v is None else v for v in col)
+                )
+        return columns
 
-                key, *rest = line.split(None, 1)
-                if not rest:
-                    continue
-                val = rest[0].strip()
-
-                k = key.lower()
-                if k == "hostname":
-                    current["hostname"] = val
-                elif k == "user":
-                    current["user"] = val
-                elif k == "port":
-                    current["port"] = val
-                elif k == "identityfile":
-                    if self.is_windows():
-                        current["identityfile"] = val
-                    else:
-                        current["identityfile"] = os.path.expanduser(val)
-                elif k == "localforward":
-                    current["localforward"].append(val)
+    def decode(self, columns: list[Any]) -> list[tuple[Any, ...]]:
+        if not columns:
+            return []
 
-        return current if in_target else None
+        none = self.NONE
+        decoded: list[Any] = []
+        for idx, col in enumerate(columns):
+            if idx in self.INT_COLUMNS:
+                decoded.append(col)
+                continue
+            values = col.split(self.SEP)
+            if idx in self.LIST_COLUMNS:
+                values = [v.split(self.LIST_SEP) if v else [] for v in values]
+            elif none in col:
+                values = [None if v == none else v for v in values]
+            decoded.append(values)
+        return list(zip(*decoded))
+
+    def store(self, entry: str, payload: tuple[Any, ...]) -> None:
+        import marshal
+
+        tmp = f"{entry}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(tmp, "wb") as f:
+                marshal.dump(payload, f)
+            os.replace(tmp, entry)
+        except OSError:
+            # A read-only install dir only costs us the cache.
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
 
-    @require_ssh_config
-    def sort_ssh_config(self) -> None:
+    def load_entry(self, name: str, key: tuple[Any, ...]) -> Any | None:
+        """Data stored under ``name`` for exactly this ``key``, else None."""
+        if not self.enabled:
+            return None
 
-        with open(
-            self.path_ssh_config,
-            "r",
-            encoding="utf-8",
-            errors="replace",
-        ) as f:
-            lines = f.readlines()
+        import marshal
 
-        re_group = re.compile(r"^\s*#\s*G\s*:\s*(.+?)\s*$", re.IGNORECASE)
+        try:
+            with open(os.path.join(self.cache_dir, name), "rb") as f:
+                version, cached_key, data = marshal.loads(f.read())
+            if version == self.VERSION and cached_key == key:
+                self.hits += 1
+                return data
+        except (OSError, EOFError, ValueError, TypeError):
+            pass
 
-        def is_host_line(s: str) -> bool:
-            return s.lstrip().lower().startswith("host ")
+        self.misses += 1
+        return None
 
-        prelude: list[str] = []
-        i = 0
-        while (
-            i < len(lines)
-            and not is_host_line(lines[i])
-            and not re_group.match(lines[i])
-        ):
-            prelude.append(lines[i])
-            i += 1
+    def store_entry(self, name: str, key: tuple[Any, ...], data: Any) -> None:
+        if self.enabled:
+            entry = os.path.join(self.cache_dir, name)
+            self.store(entry, (self.VERSION, key, data))
 
-        entries: list[tuple[str, str, list[str]]] = []
-        pending_group: str | None = None
+    def stats(self) -> str:
+        return f"[*] Config cache: hits={self.hits} misses={self.misses}"
 
-        while i < len(lines):
-            m = re_group.match(lines[i])
-            if m:
-                g = m.group(1).strip().lower()
-                pending_group = g if g else None
-                i += 1
-                continue
 
-            if not is_host_line(lines[i]):
-                i += 1
-                continue
+class ConfigTransaction:
+    """Locked, crash-safe read-modify-write of one config file.
 
-            block: list[str] = [lines[i]]
-            i += 1
-            while (
-                i < len(lines)
-                and not is_host_line(lines[i])
-                and not re_group.match(lines[i])
-            ):
-                block.append(lines[i])
-                i += 1
+    Entering takes an exclusive advisory lock and reads the current
+    text; edits made inside the ``with`` block are written on a clean
+    exit to a temp file in the same directory, fsynced and renamed over
+    the original, so readers see either the old or the new file. Lock
+    files live in ``locks/`` of the per-user cache dir, so ~/.ssh gets
+    no stray files. Several edits in one block form one transaction::
 
-            group = pending_group or "Ungrouped"
-            pending_group = None
+        with ConfigTransaction(path) as tx:
+            tx.replace(old_block, new_block)
+            tx.append(extra)
+    """
 
-            parts = block[0].strip().split()
-            host_name = parts[1] if len(parts) > 1 else ""
-            entries.append((group, host_name.lower(), block))
+    MODE = 0o600
 
-        groups = sorted({g for g, _, _ in entries if g != "Ungrouped"})
-        if any(g == "Ungrouped" for g, _, _ in entries):
-            groups.append("Ungrouped")
+    def __init__(
+        self,
+        path: str,
+        before_commit: Callable[[str], None] | None = None,
+    ) -> None:
+        # write through symlinks instead of replacing them
+        self.path = os.path.realpath(path)
+        # called with the old text, under the lock, before it is replaced
+        self.before_commit = before_commit
+        self.removed = False
+        self.text = ""
+        # set by stream(): written in place of text, never joined
+        self.chunks: Iterable[str] | None = None
+        self.original: str | None = None
+        self._lock_fd: int | None = None
+
+    def __enter__(self) -> "ConfigTransaction":
+        self._lock()
+        try:
+            with open(
+                self.path,
+                "r",
+                encoding="utf-8",
+                errors="replace",
+            ) as f:
+                self.original = f.read()
+        except FileNotFoundError:
+            self.original = None
+        except BaseException:
+            self._unlock()
+            raise
+        self.text = self.original or ""
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        try:
+            if exc_type is None and (self.removed or self.changed):
+                self._commit()
+        finally:
+            self._unlock()
+
+    @property
+    def changed(self) -> bool:
+        return self.chunks is not None or self.text != self.original
+
+    def replace(self, old: str, new: str) -> bool:
+        """Replace the first ``old``; False if it is no longer there."""
+        if not old or old not in self.text:
+            return False
+        self.text = self.text.replace(old, new, 1)
+        return True
 
-        out: list[str] = []
-        out.extend(prelude)
-        if out and out[-1].strip() != "":
-            out.append("\n")
+    def remove(self) -> None:
+        """Delete the file instead of rewriting it."""
+        self.removed = True
 
-        for g in groups:
-            blocks = [(hn, b) for (gg, hn, b) in entries if gg == g]
-            blocks.sort(key=lambda x: x[0])
+    def stream(self, chunks: Iterable[str]) -> None:
+        """Write ``chunks`` as the new content, one by one on commit, so
+        a rewrite of a large file is never built as a second string."""
+        self.chunks = chunks
 
-            for _, b in blocks:
-                if g != "Ungrouped":
-                    out.append(f"# G: {g}\n")
-                out.extend(b)
-                if out and out[-1].strip() != "":
-                    out.append("\n")
+    def append(self, chunk: str) -> None:
+        if self.text and not self.text.endswith("\n"):
+            self.text += "\n"
+        self.text += chunk
 
-        with open(self.path_ssh_config, "w", encoding="utf-8") as f:
-            f.writelines(out)
+    @property
+    def lock_path(self) -> str:
+        import zlib
 
-        if not self.is_windows():
-            os.chmod(self.path_ssh_config, 0o600)
+        crc = zlib.crc32(self.path.encode("utf-8", "replace"))
+        name = f"{os.path.basename(self.path)}-{crc:08x}.lock"
+        return os.path.join(get_user_cache_dir(), "locks", name)
 
-    def reset_add_host_data(self) -> None:
-        self.add_forward = False
+    def _lock(self) -> None:
+        lock_path = self.lock_path
+        os.makedirs(os.path.dirname(lock_path), mode=0o700, exist_ok=True)
+        fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, self.MODE)
+        try:
+            if os.name == "nt":
+                import msvcrt
 
-    def not_valid_argument(self) -> None:
-        print(self.logo())
-        print("[!] Invalid argument. Use --help or -h.\n")
+                # LK_LOCK retries for ~10 s before raising OSError
+                msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+            else:
+                import fcntl
 
-    def doc_help(self) -> None:
-        print(self.logo())
-        print("Usage:\n")
+                fcntl.flock(fd, fcntl.LOCK_EX)
+        except BaseException:
+            os.close(fd)
+            raise
+        self._lock_fd = fd
 
-        rows = [
-            ("sssh", "Run interactive menu"),
-            ("sssh --version OR sssh -v", "Show version"),
-            ("sssh --list OR sssh -l", "Print hosts as: shortname, ip, port"),
-            ("sssh --help OR sssh -h", "Show this help"),
-            (
-                "sssh --list-group OR -lg <group>",
-                "List hosts in group with IP and Port",
-            ),
-            ("sssh --command OR -c <host>", "List command for host"),
-            ("sssh <ssh args>", "Run ssh with provided arguments"),
-        ]
+    def _unlock(self) -> None:
+        fd, self._lock_fd = self._lock_fd, None
+        if fd is None:
+            return
+        try:
+            if os.name == "nt":
+                import msvcrt
 
-        w = max(len(cmd) for cmd, _ in rows)
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+            else:
+                import fcntl
 
-        for cmd, desc in rows:
-            print(f"  {cmd.ljust(w)}   {desc}")
+                fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)
 
-        print()
+    def _commit(self) -> None:
+        if self.before_commit is not None and self.original is not None:
+            self.before_commit(self.original)
 
-    def list_hosts_short_ip_group(self, group_name: str) -> None:
-        group_name = group_name.strip()
-        if not group_name:
-            print("[!] Group name is empty. Example: sssh -lg Test")
+        if self.removed:
+            if self.original is not None:
+                os.remove(self.path)
+                self._sync_dir(os.path.dirname(self.path) or ".")
             return
 
-        if not os.path.isfile(self.path_ssh_config):
-            print(f"[!] SSH config not found: {self.path_ssh_config}")
-            return
+        chunks = [self.text] if self.chunks is None else self.chunks
+        self.write_file(self.path, chunks)
+        if self.chunks is None:
+            self.original = self.text
+
+    @classmethod
+    def write_file(cls, path: str, chunks: Iterable[str]) -> None:
+        """Replace ``path`` with ``chunks`` through a fsynced temp file
+        and a rename, mode 0600. Takes no lock: callers hold one."""
+        import tempfile
+
+        directory = os.path.dirname(path) or "."
+        fd, tmp = tempfile.mkstemp(
+            prefix="." + os.path.basename(path) + ".",
+            suffix=".tmp",
+            dir=directory,
+        )
+        try:
+            with open(fd, "w", encoding="utf-8") as f:
+                f.writelines(chunks)
+                f.flush()
+                os.fsync(f.fileno())
+            if os.name != "nt":
+                os.chmod(tmp, cls.MODE)
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+
+        cls._sync_dir(directory)
+
+    @staticmethod
+    def _sync_dir(directory: str) -> None:
+        # make the rename (or unlink) itself durable
+        if os.name != "nt":
+            dir_fd = os.open(directory, os.O_RDONLY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+
+
+class BackupStore:
+    """Content-addressed store for config snapshots.
+
+    Each distinct config text is stored once, zlib-compressed, as
+    ``objects/<sha256[:2]>/<sha256[2:]>``. ``index.json`` lists the
+    snapshots (name, time, host count, label, blob) and the retention
+    policy; it is rewritten through ConfigTransaction, so concurrent runs
+    serialize. Plain backup files from older versions are imported by
+    ``migrate()`` (and by any write).
+
+    Named backups are pinned. The last ``recent`` automatic snapshots
+    are always kept, so several edits in a row can each be undone; older
+    ones are thinned to the newest per hour/day/week for the last N of
+    each.
+    """
+
+    VERSION = 1
+    INDEX = "index.json"
+    OBJECTS = "objects"
+    RETENTION = {"recent": 10, "hourly": 24, "daily": 14, "weekly": 8}
+    # strftime bucket per retention period (ISO week for weekly)
+    BUCKETS = (("hourly", "%Y%m%d%H"), ("daily", "%Y%m%d"), ("weekly", "%G%V"))
+
+    def __init__(self, root: str) -> None:
+        self.root = root
+        self.index_path = os.path.join(root, self.INDEX)
+
+    @staticmethod
+    def count_hosts(text: str) -> int:
+        count = 0
+        for line in text.splitlines():
+            parts = line.split(None, 1)
+            if parts and parts[0].lower() == "host":
+                count += 1
+        return count
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.root, self.OBJECTS, digest[:2], digest[2:])
+
+    def _put(self, data: bytes) -> str:
+        import hashlib
+        import zlib
+
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._blob_path(digest)
+        if os.path.isfile(path):
+            return digest
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                f.write(zlib.compress(data, 9))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+        return digest
 
-        groups: dict[str, list[tuple[str, str, str, str]]] = {}
+    def read(self, entry: dict[str, Any]) -> str:
+        import zlib
 
-        cur_host: str | None = None
-        cur_ip: str | None = None
-        cur_port: str | None = None
-        cur_notes: str | None = None
-        cur_group: str = "Ungrouped"
+        with open(self._blob_path(entry["blob"]), "rb") as f:
+            data = zlib.decompress(f.read())
+        return data.decode("utf-8", errors="replace")
 
-        pending_group: str | None = None
-        re_group = re.compile(r"^\s*#\s*G\s*:\s*(.+?)\s*$", re.IGNORECASE)
+    def _empty(self) -> dict[str, Any]:
+        return {
+            "version": self.VERSION,
+            "retention": dict(self.RETENTION),
+            "backups": [],
+        }
 
-        def push() -> None:
-            nonlocal cur_host, cur_ip, cur_port, cur_notes, cur_group
-            if cur_host:
-                row = (
-                    cur_host,
-                    cur_ip or "-",
-                    cur_port or "22",
-                    cur_notes or "-",
-                )
-                groups.setdefault(cur_group, []).append(row)
-            cur_host = None
-            cur_ip = None
-            cur_port = None
-            cur_notes = None
-            cur_group = "Ungrouped"
+    def _parse(self, text: str) -> dict[str, Any]:
+        import json
 
-        with open(
-            self.path_ssh_config,
-            "r",
-            encoding="utf-8",
-            errors="replace",
-        ) as f:
-            for line in f:
-                raw = line.rstrip("\n")
-                s = raw.strip()
+        if not text.strip():
+            return self._empty()
+        data = json.loads(text)
+        # indexes written before a period existed get its default
+        data["retention"] = {**self.RETENTION, **data.get("retention", {})}
+        data.setdefault("backups", [])
+        return data
 
-                m = re_group.match(raw)
-                if m:
-                    name = m.group(1).strip()
-                    pending_group = name if name else None
-                    continue
+    def _legacy_files(self) -> list[str]:
+        try:
+            names = os.listdir(self.root)
+        except OSError:
+            return []
+        return sorted(
+            n
+            for n in names
+            if not n.startswith(".")
+            and n not in (self.INDEX, self.INDEX + ".lock")
+            and os.path.isfile(os.path.join(self.root, n))
+        )
 
-                if not s:
-                    continue
+    def _migrate(self, data: dict[str, Any]) -> list[str]:
+        """Add legacy backup files to ``data``; their paths, to delete
+        once the index listing them is on disk."""
+        known = {e["name"] for e in data["backups"]}
+        imported: list[str] = []
+        for name in self._legacy_files():
+            path = os.path.join(self.root, name)
+            imported.append(path)
+            if name in known:
+                # imported before, but not deleted yet
+                continue
+            with open(path, "rb") as f:
+                raw = f.read()
+            text = raw.decode("utf-8", errors="replace")
+            data["backups"].append(
+                {
+                    "name": name,
+                    "time": os.path.getmtime(path),
+                    "hosts": self.count_hosts(text),
+                    "label": "imported",
+                    "blob": self._put(raw),
+                    "size": len(raw),
+                    "pinned": True,
+                    "path": None,
+                }
+            )
+        data["backups"].sort(key=lambda e: e["time"])
+        return imported
+
+    def migrate(self) -> None:
+        """Import plain backup files from older versions, if any."""
+        if self._legacy_files():
+            self._update(lambda data: None)
+
+    def _update(self, func: Callable[[dict[str, Any]], Any]) -> Any:
+        import json
+
+        with ConfigTransaction(self.index_path) as tx:
+            data = self._parse(tx.text)
+            imported = self._migrate(data)
+            result = func(data)
+            self._gc(data)
+            tx.text = json.dumps(data, indent=1) + "\n"
+        # the index that lists them has been fsynced
+        for path in imported:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        return result
+
+    def _gc(self, data: dict[str, Any]) -> None:
+        live = {e["blob"] for e in data["backups"]}
+        objects = os.path.join(self.root, self.OBJECTS)
+        if not os.path.isdir(objects):
+            return
+        for prefix in os.listdir(objects):
+            folder = os.path.join(objects, prefix)
+            if not os.path.isdir(folder):
+                continue
+            left = 0
+            for rest in os.listdir(folder):
+                if prefix + rest not in live and not rest.endswith(".tmp"):
+                    os.remove(os.path.join(folder, rest))
+                else:
+                    left += 1
+            if not left:
+                try:
+                    os.rmdir(folder)
+                except OSError:
+                    pass
 
-                low = s.lower()
+    def load(self) -> dict[str, Any]:
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                return self._parse(f.read())
+        except FileNotFoundError:
+            return self._empty()
 
-                if low.startswith("host "):
-                    push()
-                    parts = s.split()
-                    cur_host = parts[1] if len(parts) > 1 else None
-                    cur_group = pending_group or "Ungrouped"
-                    pending_group = None
-                    continue
+    def entries(self) -> list[dict[str, Any]]:
+        return self.load()["backups"]
 
-                if cur_host and low.startswith("hostname "):
-                    cur_ip = s.split(None, 1)[1].strip()
-                    continue
+    def get(self, name: str) -> dict[str, Any] | None:
+        for entry in self.entries():
+            if entry["name"] == name:
+                return entry
+        return None
 
-                if cur_host and low.startswith("port "):
-                    cur_port = s.split(None, 1)[1].strip()
+    def snapshot(
+        self,
+        text: str,
+        label: str,
+        name: str | None = None,
+        path: str | None = None,
+    ) -> dict[str, Any] | None:
+        """Store ``text``; None if ``name`` is taken or, for unnamed
+        snapshots, the latest snapshot of ``path`` is identical."""
+        import time
+
+        raw = text.encode("utf-8")
+        now = time.time()
+
+        def add(data: dict[str, Any]) -> dict[str, Any] | None:
+            backups = data["backups"]
+            names = {e["name"] for e in backups}
+            if name is not None and name in names:
+                return None
+
+            digest = self._put(raw)
+            if name is None:
+                same = [e for e in backups if e.get("path") == path]
+                if same and same[-1]["blob"] == digest:
+                    return None
+
+            entry_name = name
+            if entry_name is None:
+                stamp = time.strftime("%Y%m%d-%H%M%S", time.localtime(now))
+                entry_name = f"{stamp}-{label}"
+                n = 2
+                while entry_name in names:
+                    entry_name = f"{stamp}-{label}-{n}"
+                    n += 1
+
+            entry = {
+                "name": entry_name,
+                "time": now,
+                "hosts": self.count_hosts(text),
+                "label": label,
+                "blob": digest,
+                "size": len(raw),
+                "pinned": name is not None,
+                "path": path,
+            }
+            backups.append(entry)
+            self._retain(data)
+            return entry
+
+        return self._update(add)
+
+    def _retain(self, data: dict[str, Any]) -> None:
+        import time
+
+        policy = data["retention"]
+        auto = sorted(
+            (e for e in data["backups"] if not e.get("pinned")),
+            key=lambda e: e["time"],
+            reverse=True,
+        )
+        recent = max(1, int(policy.get("recent", 0)))
+        keep = {e["name"] for e in auto[:recent]}
+
+        for period, fmt in self.BUCKETS:
+            limit = int(policy.get(period, 0))
+            seen: set[str] = set()
+            for entry in auto:
+                bucket = time.strftime(fmt, time.localtime(entry["time"]))
+                if bucket in seen:
                     continue
+                if len(seen) >= limit:
+                    break
+                seen.add(bucket)
+                keep.add(entry["name"])
 
-                if cur_host and s.startswith("#"):
-                    c = s[1:].strip()
-                    c_low = c.lower()
-                    if c_low.startswith("notes:"):
-                        cur_notes = c.split(":", 1)[1].strip()
-                    elif c_low.startswith("notes "):
-                        cur_notes = c.split(None, 1)[1].strip()
+        data["backups"] = [
+            e for e in data["backups"] if e.get("pinned") or e["name"] in keep
+        ]
 
-        push()
+    def delete(self, name: str) -> bool:
+        def remove(data: dict[str, Any]) -> bool:
+            before = len(data["backups"])
+            data["backups"] = [e for e in data["backups"] if e["name"] != name]
+            return len(data["backups"]) != before
+
+        return self._update(remove)
+
+    def set_retention(self, policy: dict[str, int]) -> dict[str, int]:
+        def apply(data: dict[str, Any]) -> dict[str, int]:
+            data["retention"].update(policy)
+            self._retain(data)
+            return data["retention"]
+
+        return self._update(apply)
+
+
+class InventoryExporter:
+    """Renders hosts, grouped by ``# G:``, as other tools' inventories.
+
+    Every format is a generator of output lines, written as they are
+    produced. Wildcard ``Host`` patterns are skipped; only the first
+    short name of a block is exported, except for ``hosts``, which lists
+    the aliases too.
+    """
+
+    TARGETS = ("ansible-ini", "ansible-yaml", "hosts", "pdsh", "clustershell")
+
+    def __init__(self, groups: list[tuple[str, list[SshHost]]]) -> None:
+        self.groups = groups
+
+    @staticmethod
+    def is_pattern(host: SshHost) -> bool:
+        return any(c in host.name for c in "*?!")
+
+    @staticmethod
+    def group_id(group: str) -> str:
+        # Ansible/ClusterShell group names: letters, digits, underscore
+        name = "".join(c if c.isalnum() or c == "_" else "_" for c in group)
+        if group == UNGROUPED:
+            return "ungrouped"
+        return name if name and not name[0].isdigit() else f"g_{name}"
+
+    def _hosts(self) -> Iterator[tuple[str, Iterator[SshHost]]]:
+        for group, hosts in self.groups:
+            yield group, (h for h in hosts if not self.is_pattern(h))
+
+    @staticmethod
+    def _ansible_vars(host: SshHost) -> list[tuple[str, Any]]:
+        pairs: list[tuple[str, Any]] = []
+        if host.hostname:
+            pairs.append(("ansible_host", host.hostname))
+        if host.port and host.port.isdigit():
+            pairs.append(("ansible_port", int(host.port)))
+        if host.user:
+            pairs.append(("ansible_user", host.user))
+        if host.identityfile:
+            pairs.append(("ansible_ssh_private_key_file", host.identityfile))
+        return pairs
+
+    def render(self, target: str) -> Iterator[str]:
+        return getattr(self, target.replace("-", "_"))()
+
+    def ansible_ini(self) -> Iterator[str]:
+        first = True
+        for group, hosts in self._hosts():
+            if not first:
+                yield ""
+            first = False
+            yield f"[{self.group_id(group)}]"
+            for host in hosts:
+                pairs = " ".join(
+                    f"{k}={self._ini_value(v)}"
+                    for k, v in self._ansible_vars(host)
+                )
+                yield f"{host.name} {pairs}".rstrip()
+
+    @staticmethod
+    def _ini_value(value: Any) -> str:
+        text = str(value)
+        if any(c in text for c in " #;'\""):
+            return '"' + text.replace("\\", "\\\\").replace('"', '\\"') + '"'
+        return text
+
+    def ansible_yaml(self) -> Iterator[str]:
+        import json
+
+        yield "all:"
+        yield "  children:"
+        for group, hosts in self._hosts():
+            yield f"    {self.group_id(group)}:"
+            yield "      hosts:"
+            empty = True
+            for host in hosts:
+                empty = False
+                pairs = self._ansible_vars(host)
+                # JSON strings and numbers are valid YAML scalars
+                yield f"        {json.dumps(host.name)}:" + (
+                    "" if pairs else " {}"
+                )
+                for key, value in pairs:
+                    yield f"          {key}: {json.dumps(value)}"
+            if empty:
+                yield "        {}"
+
+    def hosts(self) -> Iterator[str]:
+        for group, hosts in self._hosts():
+            yield f"# {group}"
+            for host in hosts:
+                ip = host.hostname or ""
+                # /etc/hosts maps addresses only, not DNS names
+                if ip.replace(".", "").isdigit() or ":" in ip:
+                    yield f"{ip}\t{' '.join(host.names)}"
+
+    def pdsh(self) -> Iterator[str]:
+        # genders(5) file: pdsh -F <file> -g <group>
+        for group, hosts in self._hosts():
+            attr = "" if group == UNGROUPED else f" {self.group_id(group)}"
+            for host in hosts:
+                yield f"{host.name}{attr}"
+
+    def clustershell(self) -> Iterator[str]:
+        # groups.d YAML: nodeset -s sssh -f @web
+        yield "sssh:"
+        for group, hosts in self._hosts():
+            names = ",".join(h.name for h in hosts)
+            if names:
+                yield f"  {self.group_id(group)}: '{names}'"
+
+
+class KnownHosts:
+    """Index of a known_hosts file.
+
+    Plain host patterns go into a dict keyed by the host token ssh looks
+    up (``host`` for port 22, ``[host]:port`` otherwise). Hashed ``|1|``
+    entries can only be tested by computing HMAC-SHA1(salt, token), so
+    ``lookup`` checks each of them against all queried tokens once and
+    remembers the answers in ``resolved`` (persisted by the caller), so
+    later runs only hash new lines and new tokens.
+    """
+
+    def __init__(self, path: str, lines: list[str]) -> None:
+        self.path = path
+        self.lines = lines
+        self.plain: dict[str, list[int]] = {}
+        self.wildcard: list[tuple[str, int]] = []
+        self.hashed: list[tuple[str, int]] = []
+        self.resolved: dict[str, str] = {}
+        self.checked: set[str] = set()
+
+        for idx, line in enumerate(lines):
+            fields = line.split()
+            if not fields or fields[0].startswith("#"):
+                continue
+            if fields[0].startswith("@"):
+                # @cert-authority / @revoked apply to patterns, not hosts
+                continue
+            if fields[0].startswith("|1|"):
+                self.hashed.append((fields[0], idx))
+                continue
+            for pattern in fields[0].split(","):
+                if pattern.startswith("!"):
+                    continue
+                if "*" in pattern or "?" in pattern:
+                    self.wildcard.append((pattern.lower(), idx))
+                else:
+                    self.plain.setdefault(pattern.lower(), []).append(idx)
 
-        hosts = groups.get(group_name)
+    @classmethod
+    def load(cls, path: str) -> "KnownHosts":
+        try:
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                return cls(path, f.readlines())
+        except FileNotFoundError:
+            return cls(path, [])
+
+    @staticmethod
+    def token(host: str, port: int | str = 22) -> str:
+        host = host.lower()
+        return host if str(port) == "22" else f"[{host}]:{port}"
+
+    def _resolve_hashed(self, tokens: set[str]) -> None:
+        import base64
+        import hashlib
+
+        fresh = tokens - self.checked
+        encoded = {t: t.encode() for t in tokens}
+        for field, _ in self.hashed:
+            known = self.resolved.get(field)
+            # "" = matched none of the tokens checked so far
+            candidates = fresh if known == "" else tokens
+            if known or not candidates:
+                continue
+            try:
+                _, _, salt, digest = field.split("|", 3)
+                key = base64.b64decode(salt).ljust(64, b"\0")
+                digest_raw = base64.b64decode(digest)
+            except ValueError:
+                continue
 
-        if not hosts:
-            if group_name in groups:
-                print(f"[!] Group '{group_name}' exists but has no hosts")
-            else:
-                print(f"[!] Group '{group_name}' not found")
-            return
+            # HMAC-SHA1 with the keyed pads hashed once per line; about
+            # twice as fast as hmac.digest() per candidate
+            inner = hashlib.sha1(bytes(b ^ 0x36 for b in key))
+            outer = hashlib.sha1(bytes(b ^ 0x5C for b in key))
+            match = ""
+            for token in candidates:
+                h = inner.copy()
+                h.update(encoded[token])
+                o = outer.copy()
+                o.update(h.digest())
+                if o.digest() == digest_raw:
+                    match = token
+                    break
+            self.resolved[field] = match
+        self.checked |= tokens
+
+    def lookup(self, tokens: set[str]) -> dict[str, list[int]]:
+        """Line numbers of the entries for each token (empty if unknown)."""
+        self._resolve_hashed(tokens)
+
+        found = {t: list(self.plain.get(t, [])) for t in tokens}
+        for field, idx in self.hashed:
+            token = self.resolved.get(field)
+            if token in found:
+                found[token].append(idx)
+        if self.wildcard:
+            import fnmatch
+
+            for pattern, idx in self.wildcard:
+                for token in tokens:
+                    if fnmatch.fnmatchcase(token, pattern):
+                        found[token].append(idx)
+        return found
+
+    def key_types(self, idxs: list[int]) -> list[str]:
+        out: list[str] = []
+        for idx in idxs:
+            fields = self.lines[idx].split()
+            if len(fields) > 1 and fields[1] not in out:
+                out.append(fields[1])
+        return out
+
+    def stale(self, tokens: set[str]) -> list[int]:
+        """Host entries (plain or hashed) that match none of ``tokens``;
+        wildcard, marker and comment lines are never stale."""
+        found = self.lookup(tokens)
+        live = {idx for idxs in found.values() for idx in idxs}
+        candidates = {idx for idxs in self.plain.values() for idx in idxs}
+        candidates.update(idx for _, idx in self.hashed)
+        candidates.difference_update(idx for _, idx in self.wildcard)
+        return sorted(candidates - live)
+
+
+def run_parallel(
+    func: Callable[[Any], Any],
+    items: list[Any],
+    jobs: int,
+) -> list[Any]:
+    """Map ``func`` over ``items`` on up to ``jobs`` threads, in order."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    jobs = max(1, min(jobs, len(items) or 1))
+    with span("parallel jobs"), ThreadPoolExecutor(jobs) as pool:
+        return list(pool.map(func, items))
+
+
+# Reads one public key on stdin and appends it to authorized_keys unless
+# the same key (type + blob, comment ignored) is already there.
+AUTHORIZED_KEYS_APPEND = (
+    "umask 077; mkdir -p ~/.ssh && touch ~/.ssh/authorized_keys && "
+    "chmod 700 ~/.ssh && chmod 600 ~/.ssh/authorized_keys && "
+    "read -r key && set -- $key && "
+    'if grep -qF "$1 $2" ~/.ssh/authorized_keys; then echo SSSH_PRESENT; '
+    "else printf '%s\\n' \"$key\" >> ~/.ssh/authorized_keys && "
+    "echo SSSH_ADDED; fi"
+)
+
+
+# --sort --by keys, see ShortSSH.host_sort_key
+SORT_KEYS = ("name", "ip", "port", "user", "last-used")
+
+
+# First line of the Match block that turns on multiplexing for the
+# pooled groups; the groups it names follow the colon.
+POOL_MARKER = "# ShortSSH pool:"
+CONTROL_PERSIST = "10m"
+
+
+# Stand-alone completer written to the per-user cache dir next to the
+# index. It runs on every Tab press, so it needs nothing but a bare
+# interpreter (-I -S), marshal and bisect; exit status 1 (no index, or
+# the config changed) hands over to ``sssh --complete``, which rebuilds
+# the index.
+COMPLETER = """\
+import marshal
+import os
+import sys
+from bisect import bisect_left
 
-        print(self.logo())
 
-        w_name = max(len("Name"), max(len(r[0]) for r in hosts))
-        w_ip = max(len("IP"), max(len(r[1]) for r in hosts))
-        w_port = max(len("Port"), max(len(r[2]) for r in hosts))
-        w_notes = max(len("Notes"), max(len(r[3]) for r in hosts))
+def main():
+    kind, prefix, index = sys.argv[1:4]
+    try:
+        with open(index, "rb") as f:
+            version, key, data = marshal.load(f)
+        if version != {version}:
+            return 1
+        for path, mtime, size in key:
+            st = os.stat(path)
+            if st.st_mtime_ns != mtime or st.st_size != size:
+                return 1
+    except (OSError, ValueError, EOFError, TypeError):
+        return 1
+    text = data[0 if kind == "host" else 1]
+    words = text.split("\\n") if text else []
+    lo = bisect_left(words, prefix)
+    hi = bisect_left(words, prefix + "\\U0010ffff")
+    if lo < hi:
+        sys.stdout.write("\\n".join(words[lo:hi]) + "\\n")
+    return 0
+
+
+sys.exit(main())
+"""
 
-        header = (
-            "| "
-            + f"{'Name'.ljust(w_name)} | {'IP'.ljust(w_ip)} | "
-            + f"{'Port'.ljust(w_port)} | {'Notes'.ljust(w_notes)} |"
+# @FAST@ / @SLOW@ become the completer and ``sssh --complete`` commands
+COMPLETION_SCRIPTS = {
+    "bash": """\
+_sssh_query() {
+    @FAST@ 2>/dev/null || @SLOW@ 2>/dev/null
+}
+
+_sssh() {
+    local cur=${COMP_WORDS[COMP_CWORD]} prev=${COMP_WORDS[COMP_CWORD-1]}
+    local kind IFS=$'\\n'
+    case $prev in
+        -c|--command) kind=host ;;
+        -lg|--list-group) kind=group ;;
+        *)
+            [[ $COMP_CWORD -eq 1 && $cur != -* ]] || return 0
+            kind=host
+            ;;
+    esac
+    COMPREPLY=($(_sssh_query "$kind" "$cur"))
+}
+
+complete -F _sssh sssh
+""",
+    "zsh": """\
+_sssh_query() {
+    @FAST@ 2>/dev/null || @SLOW@ 2>/dev/null
+}
+
+_sssh() {
+    local kind
+    case ${words[CURRENT-1]} in
+        -c|--command) kind=host ;;
+        -lg|--list-group) kind=group ;;
+        *)
+            [[ $CURRENT -eq 2 && $PREFIX != -* ]] || return 1
+            kind=host
+            ;;
+    esac
+    local -a matches
+    matches=(${(f)"$(_sssh_query $kind $PREFIX)"})
+    compadd -a matches
+}
+
+compdef _sssh sssh
+""",
+    "fish": """\
+function __sssh_query
+    @FAST@ 2>/dev/null; or @SLOW@ 2>/dev/null
+end
+
+function __sssh_kind
+    set -l words (commandline -opc)
+    switch $words[-1]
+        case -c --command
+            echo host
+        case -lg --list-group
+            echo group
+        case '*'
+            test (count $words) -eq 1; and echo host
+    end
+end
+
+complete -c sssh -f -n '__sssh_kind >/dev/null' \\
+    -a '(__sssh_query (__sssh_kind) (commandline -ct))'
+""",
+}
+
+
+def display_command(argv: list[str]) -> str:
+    """Command line for copy-paste; arguments with spaces are quoted."""
+    return " ".join(f'"{a}"' if " " in a else a for a in argv)
+
+
+# ssh(1) options that take a value, which may be the next argument
+SSH_VALUE_OPTIONS = "BbcDEeFIiJLlmOoPpQRSWw"
+
+
+def ssh_destination(args: list[str]) -> str | None:
+    """Host part of the destination in ssh arguments, if any."""
+    it = iter(args)
+    for arg in it:
+        if arg == "--":
+            arg = next(it, "")
+        elif arg.startswith("-") and len(arg) > 1:
+            for pos, opt in enumerate(arg[1:], 2):
+                if opt in SSH_VALUE_OPTIONS:
+                    if pos == len(arg):
+                        next(it, None)
+                    break
+            continue
+        if arg.startswith("ssh://"):
+            arg = arg[6:].split(":", 1)[0]
+        return arg.rsplit("@", 1)[-1] or None
+    return None
+
+
+def fmt_bytes(n: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if n < 1024:
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} TB"
+
+
+def tree_size(path: str) -> int:
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def fmt_ms(ms: float | None) -> str:
+    return "-" if ms is None else f"{ms:.1f} ms"
+
+
+def fmt_age(seconds: float) -> str:
+    seconds = int(seconds)
+    if seconds < 60:
+        return f"{seconds}s"
+    if seconds < 3600:
+        return f"{seconds // 60}m{seconds % 60:02d}s"
+    return f"{seconds // 3600}h{seconds // 60 % 60:02d}m"
+
+
+def get_user_cache_dir() -> str:
+    """Per-user cache directory (``$XDG_CACHE_HOME/shortssh``, on Windows
+    ``%LOCALAPPDATA%\\ShortSSH\\cache``) for files written outside the
+    menus, so they work when the install directory is read-only."""
+    if os.name == "nt":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+        return os.path.join(base, "ShortSSH", "cache")
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(base, "shortssh")
+
+
+def raise_nofile_limit(wanted: int) -> int:
+    """Concurrent sockets we can afford, raising RLIMIT_NOFILE if needed."""
+    try:
+        import resource
+    except ImportError:
+        return wanted
+
+    reserve = 32
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if soft != resource.RLIM_INFINITY and soft < wanted + reserve:
+        new_soft = wanted + reserve
+        if hard != resource.RLIM_INFINITY:
+            new_soft = min(new_soft, hard)
+        try:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (new_soft, hard))
+            soft = new_soft
+        except (ValueError, OSError):
+            pass
+    if soft == resource.RLIM_INFINITY:
+        return wanted
+    return max(1, min(wanted, soft - reserve))
+
+
+async def probe_ssh(
+    host: str,
+    port: int,
+    timeout: float,
+) -> tuple[str, float | None, float | None, str]:
+    """Connect to an SSH port and read its identification banner.
+
+    Returns ``(state, connect_ms, banner_ms, version)`` where state is
+    ``up``, ``down``, ``timeout`` or ``no banner``.
+    """
+    import asyncio
+    import time
+
+    start = time.perf_counter()
+    try:
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(host, port), timeout
         )
-        line = "=" * len(header)
+    except asyncio.TimeoutError:
+        return "timeout", None, None, ""
+    except OSError:
+        return "down", None, None, ""
+
+    connected = time.perf_counter()
+    connect_ms = (connected - start) * 1000
+    banner = ""
+
+    try:
+        left = max(0.0, timeout - (connected - start))
+        # RFC 4253 lets servers send other lines before "SSH-"
+        for _ in range(5):
+            line = await asyncio.wait_for(reader.readline(), left)
+            if not line:
+                break
+            text = line.decode("ascii", "replace").strip()
+            if text.startswith("SSH-"):
+                banner = text
+                break
+    except (asyncio.TimeoutError, OSError):
+        pass
+    finally:
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
 
-        def print_group_row(name: str) -> None:
-            inner_width = len(header) - 4
-            text = f"Group: {name}"
-            print("| " + text.ljust(inner_width) + " |")
+    if not banner:
+        return "no banner", connect_ms, None, ""
+
+    banner_ms = (time.perf_counter() - connected) * 1000
+    # SSH-2.0-OpenSSH_9.6p1 Ubuntu-3ubuntu13 -> OpenSSH_9.6p1
+    parts = banner.split("-", 2)
+    version = parts[2].split()[0] if len(parts) == 3 and parts[2] else ""
+    return "up", connect_ms, banner_ms, version
+
+
+async def probe_port(
+    host: str,
+    port: int,
+    timeout: float,
+) -> tuple[str, float | None, float | None, str]:
+    """TCP connect only, in the result shape of ``probe_ssh`` (no banner
+    or version): the cheap probe ``--watch`` repeats every interval."""
+    import asyncio
+    import socket
+    import time
+
+    loop = asyncio.get_running_loop()
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setblocking(False)
+    start = time.perf_counter()
+    try:
+        await asyncio.wait_for(loop.sock_connect(sock, (host, port)), timeout)
+    except asyncio.TimeoutError:
+        return "timeout", None, None, ""
+    except OSError:
+        return "down", None, None, ""
+    finally:
+        sock.close()
+    return "up", (time.perf_counter() - start) * 1000, None, ""
+
+
+async def probe_many(
+    targets: list[tuple[str, int] | None],
+    concurrency: int,
+    timeout: float,
+    probe: Callable[..., Any] = probe_ssh,
+    start: int = 0,
+    budget: float | None = None,
+) -> list[tuple[str, float | None, float | None, str] | None]:
+    """Probe every target, at most ``concurrency`` sockets open.
+
+    Each probe gets its own ``timeout``, so every target is checked.
+    With ``concurrency`` at the number of targets (the default of
+    ``--probe`` and ``--watch``) all of them run at once and the whole
+    run takes about one ``timeout``.
+    ``None`` targets (no usable address or port) come back ``invalid``.
+
+    With ``budget`` (seconds), targets are taken in order from ``start``
+    (wrapping around) and no probe is started that could not finish in
+    time; the ones left over come back as ``None``.
+    """
+    import asyncio
+
+    results: list[tuple[str, float | None, float | None, str] | None] = [
+        ("invalid", None, None, "")
+    ] * len(targets)
+    order = list(range(start, len(targets))) + list(range(start))
+    pending = iter(order)
+    loop = asyncio.get_running_loop()
+    last_start = None if budget is None else loop.time() + budget - timeout
+
+    # a fixed set of workers pulling targets; a Semaphore with thousands
+    # of waiters spends more CPU waking them than probing
+    async def worker() -> None:
+        first = True
+        for idx in pending:
+            target = targets[idx]
+            if target is None:
+                continue
+            if last_start is not None and not first:
+                if loop.time() > last_start:
+                    results[idx] = None
+                    continue
+            first = False
+            results[idx] = await probe(target[0], target[1], timeout)
 
-        print(line)
-        print(header)
-        print(line)
-        print_group_row(group_name)
-        print(line)
+    workers = min(concurrency, len(targets))
+    await asyncio.gather(*(worker() for _ in range(workers)))
+    return results
 
-        for name, ip, port, notes in hosts:
-            row = (
-                "| "
-                + f"{name.ljust(w_name)} | {ip.ljust(w_ip)} | "
-                + f"{port.ljust(w_port)} | {notes.ljust(w_notes)} |"
-            )
-            print(row)
 
-        print(line + "\n")
+class HostHealth:
+    """Rolling probe history of one host for ``--watch``."""
 
-    def list_hosts_short_ip(self) -> None:
-        if not os.path.isfile(self.path_ssh_config):
-            print(f"[!] SSH config not found: {self.path_ssh_config}")
-            return
+    __slots__ = ("state", "rtt", "samples", "changed")
 
-        groups: dict[str, list[tuple[str, str, str, str]]] = {}
+    WINDOW = 60
 
-        cur_host: str | None = None
-        cur_ip: str | None = None
-        cur_port: str | None = None
-        cur_notes: str | None = None
-        cur_group: str = "Ungrouped"
+    def __init__(self) -> None:
+        self.state = "-"
+        self.rtt: float | None = None
+        # last WINDOW connect times, oldest first
+        self.samples: list[float] = []
+        self.changed: float | None = None
 
-        pending_group: str | None = None
-        re_group = re.compile(r"^\s*#\s*G\s*:\s*(.+?)\s*$", re.IGNORECASE)
+    def update(self, state: str, rtt: float | None, now: float) -> None:
+        if state != self.state:
+            self.state = state
+            self.changed = now
+        self.rtt = rtt
+        if rtt is not None:
+            self.samples.append(rtt)
+            if len(self.samples) > self.WINDOW:
+                del self.samples[0]
 
-        def push() -> None:
-            nonlocal cur_host, cur_ip, cur_port, cur_notes, cur_group
-            if cur_host:
-                row = (
-                    cur_host,
-                    cur_ip or "-",
-                    cur_port or "22",
-                    cur_notes or "-",
-                )
-                groups.setdefault(cur_group, []).append(row)
-            cur_host = None
-            cur_ip = None
-            cur_port = None
-            cur_notes = None
-            cur_group = "Ungrouped"
+    def percentiles(self) -> tuple[float | None, float | None]:
+        """Nearest-rank p50 and p95 over the window."""
+        if not self.samples:
+            return None, None
+        ordered = sorted(self.samples)
+        last = len(ordered) - 1
+        return ordered[last // 2], ordered[(last * 95 + 99) // 100]
 
-        with open(
-            self.path_ssh_config,
-            "r",
-            encoding="utf-8",
-            errors="replace",
-        ) as f:
-            for line in f:
-                raw = line.rstrip("\n")
-                s = raw.strip()
 
-                m = re_group.match(raw)
-                if m:
-                    name = m.group(1).strip()
-                    pending_group = name if name else None
-                    continue
+def require_ssh_private_key(
+    func: Callable[..., Any],
+) -> Callable[..., Optional[Any]]:
+    @wraps(func)
+    def wrapper(self: "ShortSSH", *args: Any, **kwargs: Any) -> Optional[Any]:
+        ssh_dir = os.path.dirname(self.path_ssh_config)
 
-                if not s:
-                    continue
+        if not os.path.isdir(ssh_dir):
+            os.makedirs(ssh_dir, exist_ok=True)
+            if not self.is_windows():
+                os.chmod(ssh_dir, 0o700)
+
+        private_keys = self.get_ssh_private_key_list()
+        if not private_keys:
+            clear_console()
+            print(self.logo())
+            print("[!] No SSH private keys found")
+            print("\n[!] Create SSH key? (y/n)")
+            ch = input("\n[>]: ").strip().lower()
+            if ch == "y":
+                release_console()
+                os.system("ssh-keygen -t ed25519")
+            input("\nPress Enter...")
+            return None
 
-                low = s.lower()
+        return func(self, *args, **kwargs)
 
-                if low.startswith("host "):
-                    push()
-                    parts = s.split()
-                    cur_host = parts[1] if len(parts) > 1 else None
-                    cur_group = pending_group or "Ungrouped"
-                    pending_group = None
-                    continue
+    return wrapper
+
+
+def require_ssh_config(
+    func: Callable[..., Any],
+) -> Callable[..., Optional[Any]]:
+    @wraps(func)
+    def wrapper(self: "ShortSSH", *args: Any, **kwargs: Any) -> Optional[Any]:
+        if not os.path.exists(self.path_ssh_config):
+            clear_console()
+            print(self.logo())
+            print(f"[!] SSH config file not found: {self.path_ssh_config}")
+            print("\n[!] Create SSH config file? (y/n)")
+            ch = input("\n" "[>]: ").strip().lower()
+
+            if ch == "y":
+                ssh_dir = os.path.dirname(self.path_ssh_config)
+                os.makedirs(ssh_dir, exist_ok=True)
+                if not self.is_windows():
+                    os.chmod(ssh_dir, 0o700)
+                print("\n[+] Creating SSH config file...")
+                with ConfigTransaction(self.path_ssh_config) as tx:
+                    # another sssh may have created it meanwhile
+                    if tx.original is None:
+                        tx.text = (
+                            "#-----------------#\n"
+                            "# ShortSSH Config #\n"
+                            "#-----------------#\n"
+                        )
+            return None
+        return func(self, *args, **kwargs)
+
+    return wrapper
+
+
+class ShortSSH:
+    def __init__(self):
+        # General
+        self.name_app = "ShortSSH"
+        self.github_url = "github.com/CrudelisDeus"
+        self.version_app = ".dev"
+
+        # ShortSSH
+        self.port_host: int | None = None
+        self.user_host: str | None = None
+        self.ip_host: str | None = None
+        self.short_name_host: str | None = None
+        self.key_host: str | None = None
+        self.notes_host: str | None = None
+        self.client_port_forward: int | None = None
+        self.local_port_forward: int | None = None
+        self.host_group: str | None = None
+
+        # ---- FIX 1: robust HOME on Windows (prefer USERPROFILE) ----
+        if os.name == "nt":
+            home = os.environ.get("USERPROFILE") or os.path.expanduser("~")
+        else:
+            home = os.path.expanduser("~")
+        self.path_ssh_config = os.path.join(home, ".ssh", "config")
+        # -----------------------------------------------------------
+
+        self.program_dir = os.path.dirname(os.path.abspath(__file__))
+        if os.path.isfile(self.program_dir):
+            # running from the zipapp: keep data next to the archive
+            self.program_dir = os.path.dirname(self.program_dir)
+        self.backup_dir = os.path.join(self.program_dir, "backups")
+        self.backups = BackupStore(self.backup_dir)
+        self.cache_dir = os.path.join(self.program_dir, "cache")
+        self.config_cache = SshConfigCache(self.cache_dir)
+        self.user_cache_dir = get_user_cache_dir()
+
+        self.add_forward: bool = False
+
+        # parsed config files, reused while a file is unchanged
+        self._config_files: dict[
+            str, tuple[tuple[int, int, int], SshConfigFile]
+        ] = {}
+
+        # logo
+        self.colors = [
+            "\033[38;5;20m",
+            "\033[38;5;52m",
+            "\033[38;5;57m",
+            "\033[38;5;63m",
+            "\033[38;5;88m",
+            "\033[38;5;93m",
+        ]
+        self.end_color = "\033[0m"
+
+    def logo(self) -> str:
+        # piped output (scripts running -l / -lg / -c) gets no ANSI art
+        if not sys.stdout.isatty():
+            return ""
+
+        selected_color = self.colors[os.getpid() % len(self.colors)]
+
+        logo = rf"""{selected_color}
+  / _ \
+\_\(_)/_/ {self.name_app}{self.end_color} v{self.version_app}
+{selected_color} _//o\\_{self.end_color}  {self.github_url}
+{selected_color}  /   \{self.end_color}
+"""
+        return logo
+
+    # ------------------------------------------------------------------------
+    # check
+    # ------------------------------------------------------------------------
+    def check_updates(self) -> bool:
+        if self.version_app == ".dev":
+            return False
+
+        from urllib.request import Request, urlopen
+
+        req = Request(
+            "https://shortssh.deus-soft.org/actual_version",
+            headers={"User-Agent": "ShortSSH"},
+        )
+
+        try:
+            remote = urlopen(req, timeout=3).read().decode().strip()
+        except Exception:
+            return False
+
+        remote_internal = "." + remote.lstrip("v")
+        remote_display = "v." + remote.lstrip("v")
+
+        test_version = self.version_app
+
+        print(test_version)
+        print(remote_internal)
+
+        if tuple(map(int, remote_internal.lstrip(".").split("."))) > tuple(
+            map(int, test_version.lstrip(".").split("."))
+        ):
+            clear_console()
+            print(self.logo())
+            print(f"[!] New version available {remote_display}")
+            print("[*] Do you want to update? (y/n)")
+            ch = input("\n[>]: ").strip().lower()
+            if ch == "y":
+                return True
+            else:
+                return False
+        return False
+
+    def version(self) -> None:
+        version = self.version_app.strip()
+        if version.startswith("."):
+            version = version[1:]
+        print(f"{self.name_app} version: {version}")
+
+    def get_ssh_private_key_list(self) -> list[str]:
+        ssh_dir = os.path.dirname(self.path_ssh_config)
+
+        if not os.path.isdir(ssh_dir):
+            return []
 
-                if cur_host and low.startswith("hostname "):
-                    cur_ip = s.split(None, 1)[1].strip()
+        private_keys: list[str] = []
+        with span("key scan"):
+            for name in os.listdir(ssh_dir):
+                path = os.path.join(ssh_dir, name)
+                if not os.path.isfile(path):
                     continue
 
-                if cur_host and low.startswith("port "):
-                    cur_port = s.split(None, 1)[1].strip()
+                low = name.lower()
+
+                if low == "config":
+                    continue
+                if low.startswith("known_hosts"):
+                    continue
+                if low.endswith(".pub"):
+                    continue
+                # lock files of older versions, leftover temp files
+                if low.startswith(".") or low.endswith((".lock", ".tmp")):
                     continue
 
-                if cur_host and s.startswith("#"):
-                    c = s[1:].strip()
-                    c_low = c.lower()
-                    if c_low.startswith("notes:"):
-                        cur_notes = c.split(":", 1)[1].strip()
-                    elif c_low.startswith("notes "):
-                        cur_notes = c.split(None, 1)[1].strip()
+                private_keys.append(name)
 
-        push()
+        return sorted(private_keys)
 
-        print(self.logo())
+    def get_backup_list(self) -> list[str]:
+        if not os.path.isdir(self.backup_dir):
+            return []
 
-        if not groups:
-            print("[!] No hosts in config")
-            return
+        self.backups.migrate()
+        return [e["name"] for e in self.backups.entries()]
 
-        order: list[str] = []
-        if "Ungrouped" in groups:
-            order.append("Ungrouped")
-        order.extend(sorted(g for g in groups.keys() if g != "Ungrouped"))
+    def print_backup_list(self) -> bool:
+        import time
+
+        if not os.path.isdir(self.backup_dir):
+            entries = []
+        else:
+            self.backups.migrate()
+            entries = self.backups.entries()
+        if not entries:
+            print("[!] No backups")
+            return False
+
+        w = max(len(e["name"]) for e in entries)
+        print("[+] Backups:\n")
+        for e in entries:
+            stamp = time.strftime("%Y-%m-%d %H:%M", time.localtime(e["time"]))
+            print(
+                f" - {e['name'].ljust(w)}  {stamp}  "
+                f"{e['hosts']:>5} hosts  {e['label']}"
+            )
+        return True
+
+    def edit_config(
+        self,
+        label: str,
+        path: str | None = None,
+    ) -> ConfigTransaction:
+        """Transaction on a config file that snapshots the old text into
+        the backup store before it is replaced."""
+        path = path or self.path_ssh_config
+
+        def snapshot(text: str) -> None:
+            try:
+                self.backups.snapshot(text, f"pre-{label}", path=path)
+            except (OSError, ValueError) as e:
+                print(f"[!] Pre-change snapshot failed: {e}", file=sys.stderr)
+
+        return ConfigTransaction(path, snapshot)
+
+    def is_windows(self) -> bool:
+        return os.name == "nt"
+
+    def check_backup_exists(self, name: str) -> bool:
+        return name in self.get_backup_list()
+
+    def check_host_ip(self, ip: str) -> bool:
+        ip = ip.strip()
+        parts = ip.split(".")
+        if len(parts) != 4:
+            return False
+        for part in parts:
+            if not part.isdigit():
+                return False
+            num = int(part)
+            if num < 0 or num > 255:
+                return False
+        return True
+
+    def check_host_port(self, port: str) -> bool:
+        port = port.strip()
+        if not port.isdigit():
+            return False
+        num = int(port)
+        if num < 1 or num > 65535:
+            return False
+        return True
+
+    def check_host_short_name(self, short_name: str) -> bool:
+        short_name = short_name.strip()
+        if not short_name:
+            return False
+        if " " in short_name:
+            return False
+        return True
+
+    def check_host_exists(self, short_name: str) -> bool:
+        if not os.path.isfile(self.path_ssh_config):
+            return False
+
+        return self.get_ssh_config().get(short_name) is not None
+
+    def get_ssh_config(self) -> SshConfig:
+        root = self._load_config_file(self.path_ssh_config)
+        if root is None:
+            raise FileNotFoundError(self.path_ssh_config)
+
+        return SshConfig(root, self._load_config_file)
+
+    def _load_config_file(self, path: str) -> SshConfigFile | None:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+
+        key = (st.st_mtime_ns, st.st_size, st.st_ino)
+        known = self._config_files.get(path)
+        if known is not None and known[0] == key:
+            return known[1]
+
+        try:
+            with span("config load"):
+                cfg = self.config_cache.load(path, st)
+        except OSError:
+            return None
+
+        self._config_files[path] = (key, cfg)
+        return cfg
+
+    def get_host_search(self) -> HostSearch:
+        with span("search index"):
+            return self._get_host_search()
+
+    def _get_host_search(self) -> HostSearch:
+        cfg = self.get_ssh_config()
+        hosts = cfg.hosts
+
+        # one key for the whole Include tree: any changed file rebuilds
+        key = tuple(
+            (path, self._config_files[path][0])
+            for path in sorted(cfg.files)
+            if path in self._config_files
+        )
+        name = os.path.basename(
+            self.config_cache.entry_path(self.path_ssh_config)
+        ).replace("config-", "search-")
+
+        data = self.config_cache.load_entry(name, key)
+        if data is not None:
+            docs, postings = data
+            return HostSearch(hosts, docs.split("\n"), postings)
+
+        search = HostSearch(hosts)
+        self.config_cache.store_entry(
+            name, key, ("\n".join(search.docs), search.postings)
+        )
+        return search
+
+    # ------------------------------------------------------------------------
+    # functionality
+    # ------------------------------------------------------------------------
+    def run_update(self) -> None:
+        with span("check_updates"):
+            update = self.check_updates()
+        if update:
+            import subprocess
+
+            clear_console()
+            print(self.logo())
+
+            print("Updating ShortSSH...")
+            release_console()
+
+            if os.name == "nt":
+                ps_cmd = (
+                    "Invoke-WebRequest "
+                    '"https://raw.githubusercontent.com/CrudelisDeus/'
+                    'ShortSSH/main/install.bat" '
+                    "-OutFile "
+                    '"$env:USERPROFILE\\Downloads\\ShortSSH-install.bat"; '
+                    'cd "$env:USERPROFILE\\Downloads"; '
+                    ".\\ShortSSH-install.bat"
+                )
+
+                subprocess.run(
+                    [
+                        "powershell",
+                        "-ExecutionPolicy",
+                        "Bypass",
+                        "-Command",
+                        ps_cmd,
+                    ]
+                )
+            else:
+                unix_cmd = (
+                    "sudo curl -L https://shortssh.deus-soft.org/shortssh.py "
+                    "-o /usr/local/bin/sssh && "
+                    "sudo chmod +x /usr/local/bin/sssh && "
+                    "sudo sed -i 's/\\r$//' /usr/local/bin/sssh"
+                )
+
+                subprocess.run(["bash", "-c", unix_cmd])
+
+            sys.exit(0)
+
+    @require_ssh_config
+    def output_command_for_host(self, host_name: str) -> None:
+        print(self.logo())
+
+        host_name = host_name.strip()
+        if not host_name:
+            print("[!] Host name is empty. Example: sssh -c Test")
+            return
+
+        cfg = self._read_ssh_host_config(host_name)
+        if cfg is None:
+            print(f"[!] Host '{host_name}' not found in SSH config")
+            return
+
+        print("[>] Full command for host:\n")
+
+        ssh_parts: list[str] = ["ssh"]
+
+        identity = cfg.get("identityfile")
+        if identity:
+            ssh_parts += ["-i", identity]
+
+        port = cfg.get("port") or "22"
+        ssh_parts += ["-p", port]
+
+        forwards = cfg.get("localforward", [])
+        forward_args: list[str] = []
+        for fwd in forwards:
+            fwd = fwd.strip()
+            if not fwd:
+                continue
+            parts = fwd.split(None, 1)
+            if len(parts) == 2:
+                local, remote = parts
+                forward_args += ["-L", f"{local}:{remote}"]
+            else:
+                forward_args += ["-L", fwd]
+
+        target = self._ssh_target(cfg, host_name)
+
+        ssh_cmd = " ".join(ssh_parts + [target])
+        print(ssh_cmd)
+
+        if forward_args:
+            ssh_fwd_cmd = " ".join(ssh_parts + forward_args + [target])
+            print(ssh_fwd_cmd)
+
+        sources = ["./*"]
+        print(display_command(self._rsync_argv(cfg, host_name, sources, "~/")))
+        print(display_command(self._scp_argv(cfg, host_name, sources, "~/")))
+
+        print("\n[>] Short command for host:\n")
+
+        short_cmd = f"ssh -p {port} {target}"
+        print(short_cmd)
+        short_rsync = self._rsync_argv(
+            cfg, host_name, sources, "~/", identity=False
+        )
+        print(display_command(short_rsync))
+        short_scp = self._scp_argv(
+            cfg, host_name, sources, "~/", identity=False
+        )
+        print(display_command(short_scp))
+
+    def _rsync_argv(
+        self,
+        cfg: HostCfg,
+        host_name: str,
+        sources: list[str],
+        dest: str,
+        identity: bool = True,
+        batch: bool = False,
+        options: list[str] | None = None,
+    ) -> list[str]:
+        ssh_e = ["ssh"]
+        if identity and cfg.get("identityfile"):
+            ssh_e += ["-i", cfg["identityfile"]]
+        ssh_e += ["-p", cfg.get("port") or "22"]
+        if batch:
+            ssh_e += ["-o", "BatchMode=yes"]
+
+        target = self._ssh_target(cfg, host_name)
+        return (
+            ["rsync", "-rvu", "--progress"]
+            + (options or [])
+            + sources
+            + ["-e", " ".join(ssh_e), f"{target}:{dest}"]
+        )
+
+    def _scp_argv(
+        self,
+        cfg: HostCfg,
+        host_name: str,
+        sources: list[str],
+        dest: str,
+        identity: bool = True,
+        batch: bool = False,
+        options: list[str] | None = None,
+    ) -> list[str]:
+        argv = ["scp", "-r"]
+        if identity and cfg.get("identityfile"):
+            argv += ["-i", cfg["identityfile"]]
+        argv += ["-P", cfg.get("port") or "22"]
+        if batch:
+            argv += ["-o", "BatchMode=yes"]
+        argv += options or []
+
+        target = self._ssh_target(cfg, host_name)
+        return argv + sources + [f"{target}:{dest}"]
+
+    def _read_ssh_host_config(self, host_name: str) -> HostCfg | None:
+        host = self.get_ssh_config().get(host_name)
+        if host is None:
+            return None
+
+        return self._host_cfg(host)
+
+    def _host_cfg(self, host: SshHost) -> HostCfg:
+        return host.to_cfg(expand_identity=not self.is_windows())
+
+    def _ssh_target(self, cfg: HostCfg, host_name: str) -> str:
+        user = cfg.get("user")
+        hostname = cfg.get("hostname")
+
+        if hostname:
+            return f"{user}@{hostname}" if user else hostname
+        if user:
+            return f"{user}@{host_name}"
+        return host_name
+
+    def _ssh_argv(self, host: SshHost, batch: bool = True) -> list[str]:
+        """Full ``ssh`` argv for a host, as printed by ``sssh -c``.
+
+        ``batch`` disables password/host-key prompts, which would hang
+        when many hosts run at once.
+        """
+        cfg = self._host_cfg(host)
+        argv = ["ssh"]
+
+        identity = cfg.get("identityfile")
+        if identity:
+            argv += ["-i", identity]
+        argv += ["-p", cfg.get("port") or "22"]
+        if batch:
+            argv += ["-o", "BatchMode=yes"]
+
+        argv.append(self._ssh_target(cfg, host.name))
+        return argv
+
+    @property
+    def path_last_used(self) -> str:
+        return os.path.join(self.user_cache_dir, "last-used")
+
+    def record_last_used(self, args: list[str]) -> None:
+        """Note the destination of ``sssh <ssh args>`` for
+        ``--sort --by last-used``; one appended line, newest last."""
+        dest = ssh_destination(args)
+        if not dest:
+            return
+        try:
+            os.makedirs(self.user_cache_dir, exist_ok=True)
+            with open(self.path_last_used, "a", encoding="utf-8") as f:
+                f.write(dest + "\n")
+        except OSError:
+            pass
+
+    def last_used_ranks(self) -> dict[str, int]:
+        """Lower-cased destination -> recency (higher is more recent)."""
+        try:
+            with open(self.path_last_used, "r", encoding="utf-8") as f:
+                names = f.read().split()
+        except OSError:
+            return {}
+
+        ranks = {name.lower(): idx for idx, name in enumerate(names)}
+        if len(names) > 4 * len(ranks) + 1000:
+            # keep only the latest use of each host
+            latest = sorted(ranks, key=ranks.__getitem__)
+            try:
+                with ConfigTransaction(self.path_last_used) as tx:
+                    tx.text = "".join(name + "\n" for name in latest)
+            except OSError:
+                pass
+        return ranks
+
+    def host_sort_key(self, key: str) -> Callable[[SshHost], Any]:
+        """Sort key for hosts inside one group; ties go by name."""
+        if key == "ip":
+            import ipaddress
+
+            def ip_key(host: SshHost) -> tuple[Any, ...]:
+                addr = host.hostname or ""
+                parts = addr.split(".")
+                if len(parts) == 4 and all(p.isdigit() for p in parts):
+                    return (0, 4, tuple(map(int, parts)), host.name.lower())
+                try:
+                    ip = ipaddress.ip_address(addr)
+                except ValueError:
+                    # DNS names after addresses, hosts without one last
+                    rest = 1 if addr else 2
+                    return (rest, 0, addr.lower(), host.name.lower())
+                return (0, ip.version, (int(ip),), host.name.lower())
+
+            return ip_key
+        if key == "port":
+
+            def port_key(host: SshHost) -> tuple[Any, ...]:
+                port = host.port or "22"
+                num = int(port) if port.isdigit() else 65536
+                return (num, host.name.lower())
+
+            return port_key
+        if key == "user":
+            return lambda host: (
+                host.user is None,
+                (host.user or "").lower(),
+                host.name.lower(),
+            )
+        if key == "last-used":
+            ranks = self.last_used_ranks()
+            if not ranks:
+                print(
+                    "[*] No connects recorded; "
+                    "set SSSH_LAST_USED=1 to record them"
+                )
+
+            def used_key(host: SshHost) -> tuple[Any, ...]:
+                rank = max(ranks.get(n.lower(), -1) for n in host.names)
+                return (-rank if rank >= 0 else 1, host.name.lower())
+
+            return used_key
+        return lambda host: host.name.lower()
+
+    @require_ssh_config
+    def sort_ssh_config(self, key: str = "name", check: bool = False) -> bool:
+        """Order blocks by group (Ungrouped last), then by ``key``.
+
+        Blocks move as they are, with their markers, notes and the
+        comments above them. One pass buckets the hosts by group; the new
+        file is streamed from slices of the old lines. Returns whether
+        the file was already sorted; ``check`` only reports it.
+        """
+        root = self.get_ssh_config().root
+        sort_key = self.host_sort_key(key)
+
+        with self.edit_config("sort") as tx:
+            if tx.original is None:
+                return True
+            lines = root.lines
+            if "".join(lines) != tx.original:
+                # changed since it was parsed: sort what is on disk now
+                root = SshConfigFile.from_text(root.path, tx.original)
+                lines = root.lines
+
+            prelude_end, spans = root.block_spans()
+            buckets: dict[str, list[tuple[Any, int]]] = {}
+            for idx, host in enumerate(root.hosts):
+                group = host.group.lower() if host.group else UNGROUPED
+                buckets.setdefault(group, []).append((sort_key(host), idx))
+
+            groups = sorted(g for g in buckets if g != UNGROUPED)
+            if UNGROUPED in buckets:
+                groups.append(UNGROUPED)
+            order = [idx for g in groups for _, idx in sorted(buckets[g])]
+
+            pos = next((p for p, i in enumerate(order) if p != i), None)
+            if pos is None:
+                print(f"[+] Config is sorted by group and {key}")
+                return True
+            if check:
+                print(
+                    f"[!] Config is not sorted by group and {key}: "
+                    f"'{root.hosts[order[pos]].name}' belongs before "
+                    f"'{root.hosts[pos].name}'"
+                )
+                return False
+
+            def chunks() -> Iterator[str]:
+                yield from lines[:prelude_end]
+                if prelude_end and lines[prelude_end - 1].strip():
+                    yield "\n"
+                for idx in order:
+                    start, end = spans[idx]
+                    yield "".join(lines[start:end])
+                    last = lines[end - 1]
+                    if not last.endswith("\n"):
+                        yield "\n"
+                    if last.strip():
+                        yield "\n"
+
+            tx.stream(chunks())
+
+        print(f"[+] Sorted {len(order)} hosts by group and {key}")
+        return False
+
+    def reset_add_host_data(self) -> None:
+        self.add_forward = False
+
+    def not_valid_argument(self) -> None:
+        print(self.logo())
+        print("[!] Invalid argument. Use --help or -h.\n")
+
+    def doc_help(self) -> None:
+        print(self.logo())
+        print("Usage:\n")
+
+        rows = [
+            ("sssh", "Run interactive menu"),
+            ("sssh --version OR sssh -v", "Show version"),
+            ("sssh --list OR sssh -l", "Print hosts as: shortname, ip, port"),
+            ("sssh --help OR sssh -h", "Show this help"),
+            (
+                "sssh --list-group OR -lg <group>",
+                "List hosts in group with IP and Port",
+            ),
+            ("sssh --command OR -c <host>", "List command for host"),
+            (
+                "sssh -l / -lg <group> --format json|ndjson|csv|tsv",
+                "Stream all host fields for scripts instead of the table",
+            ),
+            (
+                "sssh --exec OR -x <group> [-j N] [--timeout SEC] -- <cmd>",
+                "Run command on all hosts of a group in parallel",
+            ),
+            (
+                "sssh --copy-key <key> --group <group> [-j N]",
+                "Copy public key to all hosts of a group in parallel",
+            ),
+            (
+                "sssh --push <group> <src>... <dst> [-j N] [--bwlimit KBPS]",
+                "Copy files to all hosts of a group (rsync/scp)",
+            ),
+            (
+                "sssh --probe [group] [-j N] [--timeout SEC]",
+                "Check SSH port, latency and version of hosts",
+            ),
+            (
+                "sssh --watch [group] [--interval SEC] [-j N] [--count N]",
+                "Live up/down and RTT table, refreshed in place",
+            ),
+            (
+                "sssh --find OR -f <query> [-n N]",
+                "Fuzzy search hosts by name, IP, user, port, notes, group",
+            ),
+            (
+                "sssh import <file> [--skip-existing] [--dry-run]",
+                "Add hosts from CSV/TSV/JSON/NDJSON in one write",
+            ),
+            (
+                "sssh batch [--dry-run] < ops",
+                "Apply add/update/delete lines from stdin in one write",
+            ),
+            (
+                "sssh --known-hosts [group]",
+                "Show which hosts have a known_hosts entry",
+            ),
+            (
+                "sssh --known-hosts-prune [--apply]",
+                "List (--apply: remove) known_hosts entries not in config",
+            ),
+            (
+                "sssh --known-hosts-fetch <group> [-j N] [--timeout SEC]",
+                "Fetch missing host keys of a group in parallel",
+            ),
+            (
+                "sssh export --to <format> [-g <group>]",
+                "Export hosts: ansible-ini, ansible-yaml, hosts, pdsh, "
+                "clustershell",
+            ),
+            (
+                "sssh --backup [name]",
+                "Snapshot SSH config (unnamed ones follow retention)",
+            ),
+            ("sssh --backups", "List backups with time, host count and label"),
+            (
+                "sssh --backup-diff <backup> [<backup>]",
+                "Per-host diff of two backups or a backup and the config",
+            ),
+            (
+                "sssh --restore-host <backup> <host>...",
+                "Restore single host blocks from a backup",
+            ),
+            (
+                "sssh --warm <group> [-j N] [--timeout SEC] [--persist T]",
+                "Enable ControlMaster for a group and open its masters",
+            ),
+            ("sssh --pool-status", "List open master connections and age"),
+            ("sssh --pool-close [group]", "Close master connections"),
+            (
+                "sssh --completion bash|zsh|fish",
+                "Print a shell completion script for hosts and groups",
+            ),
+            (
+                "sssh --lint [--format json]",
+                "Check the config; exits 1 when problems are found",
+            ),
+            (
+                "sssh --sort [--by name|ip|port|user|last-used] [--check]",
+                "Sort host blocks by group, then key; --check only reports",
+            ),
+            (
+                "sssh --backup-retention [recent=N] [hourly=N] ...",
+                "Show or set how many automatic snapshots are kept",
+            ),
+            ("sssh <ssh args>", "Run ssh with provided arguments"),
+            ("sssh --no-cache <command>", "Parse SSH config without cache"),
+            (
+                "sssh --cache-stats <command>",
+                "Print config cache hits/misses to stderr",
+            ),
+            (
+                "sssh --timings <command>",
+                "Print time spent per phase to stderr",
+            ),
+            (
+                "SSSH_PROFILE=<file> sssh ...",
+                "Write a cProfile/pstats dump of the run",
+            ),
+            (
+                "SSSH_LAST_USED=1 sssh <host>",
+                "Record connects for --sort --by last-used",
+            ),
+        ]
+
+        w = max(len(cmd) for cmd, _ in rows)
+
+        for cmd, desc in rows:
+            print(f"  {cmd.ljust(w)}   {desc}")
+
+        print()
+
+    def list_hosts_short_ip_group(self, group_name: str) -> None:
+        group_name = group_name.strip()
+        if not group_name:
+            print("[!] Group name is empty. Example: sssh -lg Test")
+            return
+
+        if not os.path.isfile(self.path_ssh_config):
+            print(f"[!] SSH config not found: {self.path_ssh_config}")
+            return
+
+        groups = self.get_ssh_config().by_group
+
+        hosts = [self._host_row(h) for h in groups.get(group_name, [])]
+
+        if not hosts:
+            if group_name in groups:
+                print(f"[!] Group '{group_name}' exists but has no hosts")
+            else:
+                print(f"[!] Group '{group_name}' not found")
+            return
+
+        print(self.logo())
+
+        w_name = max(len("Name"), max(len(r[0]) for r in hosts))
+        w_ip = max(len("IP"), max(len(r[1]) for r in hosts))
+        w_port = max(len("Port"), max(len(r[2]) for r in hosts))
+        w_notes = max(len("Notes"), max(len(r[3]) for r in hosts))
+
+        header = (
+            "| "
+            + f"{'Name'.ljust(w_name)} | {'IP'.ljust(w_ip)} | "
+            + f"{'Port'.ljust(w_port)} | {'Notes'.ljust(w_notes)} |"
+        )
+        line = "=" * len(header)
+
+        def print_group_row(name: str) -> None:
+            inner_width = len(header) - 4
+            text = f"Group: {name}"
+            print("| " + text.ljust(inner_width) + " |")
+
+        print(line)
+        print(header)
+        print(line)
+        print_group_row(group_name)
+        print(line)
+
+        for name, ip, port, notes in hosts:
+            row = (
+                "| "
+                + f"{name.ljust(w_name)} | {ip.ljust(w_ip)} | "
+                + f"{port.ljust(w_port)} | {notes.ljust(w_notes)} |"
+            )
+            print(row)
+
+        print(line + "\n")
+
+    def write_hosts(self, fmt: str, group_name: str | None = None) -> int:
+        """Stream hosts as json/ndjson/csv/tsv, one record per host in
+        config order, without collecting them first."""
+        if not os.path.isfile(self.path_ssh_config):
+            print(
+                f"[!] SSH config not found: {self.path_ssh_config}",
+                file=sys.stderr,
+            )
+            return 1
+
+        import json
+
+        out = sys.stdout
+        fields = SshHost.RECORD_FIELDS
+        hosts = self.get_ssh_config().iter_hosts()
+        if group_name is not None:
+            hosts = (h for h in hosts if (h.group or UNGROUPED) == group_name)
+
+        def flat(record: dict[str, Any]) -> list[str]:
+            cells = []
+            for field in fields:
+                value = record[field]
+                if value is None:
+                    value = ""
+                elif field == "aliases":
+                    value = " ".join(value)
+                elif field == "localforward":
+                    value = ";".join(value)
+                cells.append(value)
+            return cells
+
+        count = 0
+        if fmt == "csv":
+            import csv
+
+            writer = csv.writer(out, lineterminator="\n")
+            writer.writerow(fields)
+            for host in hosts:
+                writer.writerow(flat(host.to_record()))
+                count += 1
+        elif fmt == "tsv":
+            out.write("\t".join(fields) + "\n")
+            for host in hosts:
+                cells = flat(host.to_record())
+                out.write("\t".join(c.replace("\t", " ") for c in cells))
+                out.write("\n")
+                count += 1
+        elif fmt == "ndjson":
+            for host in hosts:
+                out.write(json.dumps(host.to_record()) + "\n")
+                count += 1
+        else:
+            out.write("[")
+            for host in hosts:
+                out.write(",\n" if count else "\n")
+                out.write(json.dumps(host.to_record()))
+                count += 1
+            out.write("\n]\n" if count else "]\n")
+
+        if group_name is not None and not count:
+            print(f"[!] Group '{group_name}' not found", file=sys.stderr)
+            return 1
+        return 0
+
+    def _host_row(self, host: SshHost) -> tuple[str, str, str, str]:
+        return (
+            host.name,
+            host.hostname or "-",
+            host.port or "22",
+            host.notes or "-",
+        )
+
+    def list_hosts_short_ip(self) -> None:
+        if not os.path.isfile(self.path_ssh_config):
+            print(f"[!] SSH config not found: {self.path_ssh_config}")
+            return
+
+        cfg = self.get_ssh_config()
+        groups = {
+            g: [self._host_row(h) for h in hosts]
+            for g, hosts in cfg.by_group.items()
+        }
+
+        print(self.logo())
+
+        if not groups:
+            print("[!] No hosts in config")
+            return
+
+        order = cfg.group_order()
+
+        all_rows: list[tuple[str, str, str, str]] = []
+        for g in order:
+            all_rows.extend(groups.get(g, []))
+
+        if not all_rows:
+            print("[!] No hosts in config")
+            return
+
+        w_name = max(len("Name"), max(len(r[0]) for r in all_rows))
+        w_ip = max(len("IP"), max(len(r[1]) for r in all_rows))
+        w_port = max(len("Port"), max(len(r[2]) for r in all_rows))
+        w_notes = max(len("Notes"), max(len(r[3]) for r in all_rows))
+
+        header = (
+            "| "
+            + f"{'Name'.ljust(w_name)} | { 'IP'.ljust(w_ip) } | "
+            + f"{'Port'.ljust(w_port)} | { 'Notes'.ljust(w_notes) } |"
+        )
+        line = "=" * len(header)
+
+        def print_group_row(group_name: str) -> None:
+            inner_width = len(header) - 4
+            text = f"Group: {group_name}"
+            print("| " + text.ljust(inner_width) + " |")
+
+        print(line)
+        print(header)
+        print(line)
+
+        for g in order:
+            print_group_row(g)
+            print(line)
+            for name, ip, port, notes in groups.get(g, []):
+                row = (
+                    "| "
+                    + f"{name.ljust(w_name)} | {ip.ljust(w_ip)} | "
+                    + f"{port.ljust(w_port)} | {notes.ljust(w_notes)} |"
+                )
+                print(row)
+            print(line)
+
+        print()
+
+    def delete_ssh_config(self) -> None:
+        if not os.path.isfile(self.path_ssh_config):
+            print("\n[!] SSH config file does not exist")
+            return
+
+        with self.edit_config("remove") as tx:
+            tx.remove()
+        print("\n[+] SSH config file deleted")
+
+    def change_host(self, selected: str, path: str | None = None) -> None:
+        clear_console()
+        print(selected)
+        print(self.logo())
+
+        while not self.set_host("port"):
+            pass
+        while not self.set_host("user"):
+            pass
+        while not self.set_host("ip"):
+            pass
+
+        host_name = selected.splitlines()[0].split(None, 1)[1]
+        path = path or self.path_ssh_config
+
+        new_block = (
+            f"Host {host_name}\n"
+            f"        HostName {self.ip_host}\n"
+            f"        User {self.user_host}\n"
+            f"        Port {self.port_host}\n"
+        )
+
+        with self.edit_config("edit", path) as tx:
+            updated = tx.replace(selected, new_block)
+
+        if not updated:
+            print("\n[!] Host was changed by someone else, not updated")
+        else:
+            print("\n[+] Host updated")
+        input("\nPress Enter...")
+
+    def copy_pubkey_to_host(
+        self,
+        private_key_name: str,
+        port: Optional[int] = None,
+        user: Optional[str] = None,
+        ip: Optional[str] = None,
+    ) -> None:
+        clear_console()
+        print(self.logo())
+
+        if not port and not user and not ip:
+            while not self.set_host("port"):
+                pass
+            while not self.set_host("user"):
+                pass
+            while not self.set_host("ip"):
+                pass
+
+        print()
+
+        ssh_dir = os.path.dirname(self.path_ssh_config)
+        pubkey_path = os.path.join(ssh_dir, private_key_name + ".pub")
+
+        if not os.path.isfile(pubkey_path):
+            print(f"\n[!] Public key not found: {pubkey_path}")
+            input("\nPress Enter...")
+            return
+
+        release_console()
+        if self.is_windows():
+            os.system(
+                f"ssh -p {self.port_host} "
+                f"{self.user_host}@{self.ip_host} "
+                f'"mkdir -p ~/.ssh && chmod 700 ~/.ssh && '
+                f'cat >> ~/.ssh/authorized_keys" '
+                f'< "{pubkey_path}"'
+            )
+        else:
+            os.system(
+                f'ssh-copy-id -i "{pubkey_path}" '
+                f"-p {self.port_host} "
+                f"{self.user_host}@{self.ip_host}"
+            )
+
+        input("\nPress Enter...")
+
+    def delete_ssh_backup(self, name: str) -> None:
+        name = name.strip()
+        if not name:
+            print("\n[!] Empty backup name")
+            return
+
+        if not self.backups.delete(name):
+            print("\n[!] Backup not found")
+            return
+
+        print(f"\n[+] Deleted: {name}")
+
+    @require_ssh_config
+    def restore_ssh_config(self, name: str) -> None:
+        name = name.strip()
+        if not name:
+            print("\n[!] Empty backup name")
+            return
+        self.backups.migrate()
+        entry = self.backups.get(name)
+        if entry is None:
+            print("\n[!] Backup not found")
+            return
+
+        text = self.backups.read(entry)
+        with self.edit_config("restore", entry.get("path")) as tx:
+            tx.text = text
+
+        print(f"\n[+] Restored: {name}")
+
+    @require_ssh_config
+    def backup_ssh_config(self, name: str) -> bool:
+        name = name.strip()
+        if not name:
+            print("\n[!] Empty backup name")
+            return False
+
+        with open(
+            self.path_ssh_config, "r", encoding="utf-8", errors="replace"
+        ) as src:
+            text = src.read()
+
+        if self.backups.snapshot(text, "manual", name=name) is None:
+            print("\n[!] Backup with this name already exists")
+            return False
+
+        print(f"\n[+] Backup created: {name}")
+        return True
+
+    def _backup_file(self, name: str) -> SshConfigFile | None:
+        self.backups.migrate()
+        entry = self.backups.get(name)
+        if entry is None:
+            print(f"[!] Backup not found: {name}")
+            return None
+        path = entry.get("path") or self.path_ssh_config
+        return SshConfigFile.from_text(path, self.backups.read(entry))
+
+    def diff_backups(self, old_name: str, new_name: str | None = None) -> int:
+        old = self._backup_file(old_name)
+        if old is None:
+            return 2
+
+        if new_name is not None:
+            new = self._backup_file(new_name)
+            if new is None:
+                return 2
+        else:
+            if not os.path.isfile(old.path):
+                print(f"[!] SSH config not found: {old.path}")
+                return 2
+            new = SshConfigFile.load(old.path)
+            new_name = old.path
+
+        diff = diff_config_files(old, new)
+        print(f"[*] {old_name} -> {new_name}")
+
+        def fmt(value: Any) -> str:
+            if value is None or value == []:
+                return "(none)"
+            if isinstance(value, list):
+                return ", ".join(value)
+            return str(value)
+
+        counts = {"+": 0, "-": 0, "~": 0}
+        for op, name, changes in diff:
+            counts[op] += 1
+            print(f"{op} {name}")
+            for field, before, after in changes:
+                if field == "other":
+                    for line in before:
+                        if line not in after:
+                            print(f"    - {line}")
+                    for line in after:
+                        if line not in before:
+                            print(f"    + {line}")
+                else:
+                    print(f"    {field}: {fmt(before)} -> {fmt(after)}")
+
+        print(
+            f"[*] {counts['+']} added, {counts['-']} removed, "
+            f"{counts['~']} changed"
+        )
+        return 1 if diff else 0
+
+    def restore_hosts(self, backup_name: str, names: list[str]) -> int:
+        snap = self._backup_file(backup_name)
+        if snap is None:
+            return 1
+
+        wanted: list[SshHost] = []
+        for name in names:
+            host = snap.by_name.get(name.strip().lower())
+            if host is None:
+                print(f"[!] Host not in backup {backup_name}: {name}")
+                return 1
+            if host not in wanted:
+                wanted.append(host)
+
+        with self.edit_config("restore-host", snap.path) as tx:
+            live = SshConfigFile.from_text(snap.path, tx.text)
+            lines = list(live.lines)
+            replaced: list[tuple[int, int, list[str]]] = []
+            appended: list[str] = []
+
+            for host in wanted:
+                start, end = snap.span(host)
+                block = snap.lines[start:end]
+                if block and not block[-1].endswith("\n"):
+                    block[-1] += "\n"
+
+                current = live.by_name.get(host.name.lower())
+                if current is None:
+                    appended.extend(block)
+                    print(f"[+] Added: {host.name}")
+                    continue
+
+                # keep the blank lines that separate it from the next block
+                start, end = live.span(current)
+                while end > start and not lines[end - 1].strip():
+                    end -= 1
+                while block and not block[-1].strip():
+                    block.pop()
+                replaced.append((start, end, block))
+                print(f"[+] Restored: {host.name}")
+
+            # bottom-up, so earlier spans keep their line numbers
+            for start, end, block in sorted(replaced, reverse=True):
+                lines[start:end] = block
+
+            if appended:
+                if lines and not lines[-1].endswith("\n"):
+                    lines[-1] += "\n"
+                if lines and lines[-1].strip():
+                    lines.append("\n")
+                lines.extend(appended)
+
+            tx.text = "".join(lines)
+
+        return 0
+
+    @require_ssh_config
+    def find_host(self, kind: str) -> None:
+        kind = kind.strip().lower()
+        if kind not in ("all", "ip", "hostname", "port", "user"):
+            return
+
+        clear_console()
+        print(self.logo())
+
+        if kind == "all":
+            prompt = "Search (name, IP, user, port, notes, group): "
+        elif kind == "ip":
+            prompt = "Enter IP (or part): "
+        elif kind == "hostname":
+            prompt = "Enter HostName (or part): "
+        elif kind == "port":
+            prompt = "Enter Port (or part): "
+        else:
+            prompt = "Enter Username (or part): "
+
+        query = input(prompt).strip()
+        if not query:
+            return
+
+        query_l = query.lower()
+        cfg = self.get_ssh_config()
+        blocks: list[str] = []
+        sources: list[str] = []
+        found: list[SshHost] = []
+
+        if kind == "all":
+            for _, host in self.get_host_search().search(query):
+                blocks.append(cfg.block(host))
+                sources.append(host.source)
+                found.append(host)
+        else:
+            for host in cfg.hosts:
+                if kind == "hostname":
+                    field = cfg.file_of(host).lines[host.start]
+                elif kind == "ip":
+                    field = host.hostname or ""
+                elif kind == "port":
+                    field = host.port or ""
+                else:
+                    field = host.user or ""
+
+                if query_l in field.lower():
+                    blocks.append(cfg.block(host))
+                    sources.append(host.source)
+                    found.append(host)
+
+        clear_console()
+        print(self.logo())
+
+        if not blocks:
+            print("[!] Not found")
+            input("\nPress Enter...")
+            return
+
+        while True:
+            clear_console()
+            print(self.logo())
+
+            print(f"[+] Found: {len(blocks)}\n")
+            lines = (
+                f"{idx}. {b.rstrip()}"
+                for idx, b in enumerate(
+                    blocks,
+                    start=1,
+                )
+            )
+            print("\n".join(lines))
+
+            print("\nSelect host number (or 'q' to Back): ")
+            ch = input("\n[>]: ").strip().lower()
+            if ch == "q":
+                return
+            if not ch.isdigit():
+                continue
+
+            num = int(ch)
+            if num < 1 or num > len(blocks):
+                continue
+
+            break
+
+        selected = blocks[num - 1]
+        source = sources[num - 1]
+
+        while True:
+            clear_console()
+            print(self.logo())
+
+            print("What do you want to do?")
+            print("  e - Edit host")
+            print("  d - Delete host")
+            print("  q - Cancel")
+
+            action = input("\n[>]: ").strip().lower()
+
+            if action == "q":
+                return
+
+            if action == "e":
+                self.change_host(selected, source)
+                return
+
+            if action == "d":
+                clear_console()
+                print(self.logo())
+
+                # the whole span, so the # G: marker goes with the block
+                # instead of grouping the host below it
+                file = cfg.file_of(found[num - 1])
+                start, end = file.span(found[num - 1])
+                with self.edit_config("delete", source) as tx:
+                    deleted = tx.replace("".join(file.lines[start:end]), "")
+
+                if not deleted:
+                    print("[!] Host was changed by someone else, not deleted")
+                else:
+                    print("[+] Host deleted")
+                input("\nPress Enter...")
+                return
+
+    @require_ssh_config
+    def open_editor(self) -> None:
+        import os
+        import shlex
+        import shutil
+        import subprocess
+
+        path = self.path_ssh_config
+        is_windows = os.name == "nt"
+
+        editor = os.environ.get("VISUAL") or os.environ.get("EDITOR")
+
+        if not editor:
+            if is_windows:
+                editor = "notepad"
+            else:
+                for candidate in ("nvim", "vim", "vi", "nano"):
+                    if shutil.which(candidate):
+                        editor = candidate
+                        break
+
+        if not editor:
+            print("\n[!] No editor available (set $EDITOR or $VISUAL)")
+            input("\nPress Enter...")
+            return
+
+        if is_windows and editor.lower() == "notepad":
+            cmd = [editor, path]
+        else:
+            cmd = shlex.split(editor) + [path]
+
+        release_console()
+        subprocess.call(cmd)
+
+    def set_host(self, item: str) -> bool:
+        if item == "ip":
+            ip = input("Enter IP Address: ").strip()
+            if ip.lower() == "q":
+                raise Cancelled()
+            if self.check_host_ip(ip):
+                self.ip_host = ip
+            else:
+                print("\n[!] Invalid IP address format\n")
+                return False
+
+        elif item == "port":
+            port = input("Enter Port: ").strip()
+            if port.lower() == "q":
+                raise Cancelled()
+            if not port:
+                port = "22"
+            if self.check_host_port(port):
+                self.port_host = int(port)
+            else:
+                print("\n[!] Invalid Port format\n")
+                return False
+
+        elif item == "user":
+            user = input("Enter Username: ").strip()
+            if user.lower() == "q":
+                raise Cancelled()
+            if not user:
+                import getpass
+
+                user = getpass.getuser()
+            self.user_host = user
+
+        elif item == "forward_client_port":
+            client_port = input("Enter Client Port: ").strip()
+            if client_port.lower() == "q":
+                raise Cancelled()
+            if self.check_host_port(client_port):
+                self.client_port_forward = int(client_port)
+            else:
+                print("\n[!] Invalid Port format\n")
+                return False
+
+        elif item == "forward_local_port":
+            local_port = input("Enter Local Port: ").strip()
+            if local_port.lower() == "q":
+                raise Cancelled()
+            if self.check_host_port(local_port):
+                self.local_port_forward = int(local_port)
+            else:
+                print("\n[!] Invalid Port format\n")
+                return False
+
+        elif item == "short_name":
+            short_name = input("Enter Short Name: ").strip()
+            if short_name.lower() == "q":
+                raise Cancelled()
+
+            if not self.check_host_short_name(short_name):
+                print("\n[!] Invalid Short Name format\n")
+                return False
+
+            if self.check_host_exists(short_name):
+                print("\n[!] Short Name already exists in SSH config\n")
+                return False
+            self.short_name_host = short_name
+
+        elif item == "key":
+            key = input("Enter Path to Key File (or leave empty): ").strip()
+            if key.lower() == "q":
+                raise Cancelled()
+            if key:
+                key = os.path.expanduser(key)
+                if not os.path.isfile(key):
+                    print("\n[!] Key file does not exist\n")
+                    return False
+                self.key_host = key
+            else:
+                self.key_host = None
+
+        elif item == "notes":
+            notes = input("Enter Notes (optional, Enter to skip): ").strip()
+            if notes.lower() == "q":
+                raise Cancelled()
+            self.notes_host = notes if notes else "-"
+
+        elif item == "host_group":
+            host_group = input(
+                "Enter Host Group (optional, Enter to skip): ",
+            ).strip()
+            if host_group.lower() == "q":
+                raise Cancelled()
+            self.host_group = host_group.lower() if host_group else None
+
+        return True
+
+    # ------------------------------------------------------------------------
+    # bulk edits
+    # ------------------------------------------------------------------------
+    def _clean_record(
+        self,
+        raw: dict[str, Any],
+        errors: list[str],
+        where: str,
+    ) -> dict[str, Any]:
+        """Validate and normalize one host record; problems are appended
+        to ``errors``. Empty values become None (clears on update)."""
+        record: dict[str, Any] = {}
+
+        def fail(msg: str) -> None:
+            errors.append(f"[!] {where}: {msg}")
+
+        for field, value in raw.items():
+            if field in ("op", "source"):
+                continue
+            if field not in SshHost.RECORD_FIELDS:
+                fail(f"unknown field '{field}'")
+                continue
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                value = str(value)
+            if field in ("aliases", "localforward"):
+                if isinstance(value, str):
+                    sep = ";" if field == "localforward" else None
+                    value = [v.strip() for v in value.split(sep)]
+                if not isinstance(value, list):
+                    fail(f"{field} must be a list")
+                    continue
+                value = [str(v).strip() for v in value if str(v).strip()]
+            elif value is not None:
+                value = str(value).strip() or None
+            record[field] = value
+
+        name = record.get("name")
+        if not name or not self.check_host_short_name(name):
+            fail(f"invalid short name '{name or ''}'")
+        for alias in record.get("aliases") or []:
+            if not self.check_host_short_name(alias):
+                fail(f"invalid alias '{alias}'")
+        if record.get("hostname") and not self.check_host_ip(
+            record["hostname"]
+        ):
+            fail(f"invalid IP address '{record['hostname']}'")
+        if record.get("port") and not self.check_host_port(record["port"]):
+            fail(f"invalid port '{record['port']}'")
+        if record.get("user") and len(record["user"].split()) != 1:
+            fail(f"invalid user '{record['user']}'")
+        for forward in record.get("localforward") or []:
+            parts = forward.split()
+            ports = [parts[0], parts[-1].rsplit(":", 1)[-1]] if parts else []
+            if len(parts) != 2 or not all(map(self.check_host_port, ports)):
+                fail(f"invalid LocalForward '{forward}'")
+        for field in ("notes", "identityfile", "group"):
+            if record.get(field) and "\n" in record[field]:
+                fail(f"{field} must be a single line")
+        if record.get("group"):
+            record["group"] = record["group"].lower()
+        return record
+
+    def read_import_file(
+        self,
+        path: str,
+        fmt: str | None = None,
+    ) -> Iterator[tuple[str, dict[str, Any]]]:
+        """``(where, record)`` pairs from a CSV/TSV/JSON/NDJSON file."""
+        import json
+
+        if fmt is None:
+            ext = os.path.splitext(path)[1].lower().lstrip(".")
+            fmt = {"jsonl": "ndjson"}.get(ext, ext)
+
+        with open(path, "r", encoding="utf-8-sig", newline="") as f:
+            if fmt not in ("csv", "tsv", "json", "ndjson"):
+                head = f.read(4096).lstrip()
+                f.seek(0)
+                fmt = {"[": "json", "{": "ndjson"}.get(head[:1], "csv")
+
+            if fmt == "json":
+                data = json.load(f)
+                if isinstance(data, dict):
+                    data = data.get("hosts", [])
+                for idx, record in enumerate(data, start=1):
+                    yield f"record {idx}", record
+            elif fmt == "ndjson":
+                for idx, line in enumerate(f, start=1):
+                    if line.strip():
+                        yield f"line {idx}", json.loads(line)
+            else:
+                import csv
+
+                delimiter = "\t" if fmt == "tsv" else ","
+                reader = csv.DictReader(f, delimiter=delimiter)
+                for record in reader:
+                    where = f"line {reader.line_num}"
+                    yield where, {k: v for k, v in record.items() if k}
+
+    def read_batch(
+        self,
+        stream: Any,
+    ) -> Iterator[tuple[str, str, dict[str, Any]]]:
+        """``(where, op, record)`` from ``add|update|delete <name>
+        [field=value ...]`` lines or JSON objects with an ``op`` key."""
+        import json
+        import shlex
+
+        for idx, line in enumerate(stream, start=1):
+            text = line.strip()
+            if not text or text.startswith("#"):
+                continue
+            where = f"line {idx}"
+            if text.startswith("{"):
+                record = json.loads(text)
+                yield where, str(record.get("op", "")).lower(), record
+                continue
+
+            words = shlex.split(text)
+            record = {"name": words[1] if len(words) > 1 else ""}
+            for word in words[2:]:
+                field, sep, value = word.partition("=")
+                record[field.lower() if sep else word] = value
+            yield where, words[0].lower(), record
+
+    def apply_host_ops(
+        self,
+        ops: Iterator[tuple[str, str, dict[str, Any]]],
+        dry_run: bool = False,
+        skip_existing: bool = False,
+        label: str = "batch",
+    ) -> int:
+        """Validate every operation, then commit them in one transaction;
+        nothing is written if any operation fails."""
+        path = self.path_ssh_config
+        if not os.path.isfile(path):
+            print(f"[!] SSH config not found: {path}")
+            return 1
+
+        # names defined in Include files also block duplicates
+        foreign = {
+            name
+            for name, host in self.get_ssh_config().by_name.items()
+            if host.source != path
+        }
+
+        errors: list[str] = []
+        counts = {"add": 0, "update": 0, "delete": 0, "skip": 0}
+
+        with self.edit_config(label) as tx:
+            editor = ConfigEditor(SshConfigFile.from_text(path, tx.text))
+
+            try:
+                for where, op, raw in ops:
+                    if op not in ("add", "update", "delete"):
+                        errors.append(f"[!] {where}: unknown operation '{op}'")
+                        continue
+
+                    if not isinstance(raw, dict):
+                        errors.append(f"[!] {where}: expected an object")
+                        continue
+
+                    before = len(errors)
+                    record = self._clean_record(raw, errors, where)
+                    name = record.get("name") or ""
+                    if len(errors) > before:
+                        continue
+
+                    if op == "add":
+                        names = [name, *(record.get("aliases") or [])]
+                        taken = [
+                            n
+                            for n in names
+                            if editor.has(n) or n.lower() in foreign
+                        ]
+                        if taken and skip_existing:
+                            counts["skip"] += 1
+                        elif taken:
+                            errors.append(
+                                f"[!] {where}: host '{taken[0]}' "
+                                "already exists"
+                            )
+                        elif not record.get("hostname"):
+                            errors.append(f"[!] {where}: IP address required")
+                        else:
+                            editor.add(record)
+                            counts["add"] += 1
+                    elif not editor.has(name):
+                        hint = (
+                            " (defined in an Include file)"
+                            if name.lower() in foreign
+                            else ""
+                        )
+                        errors.append(
+                            f"[!] {where}: host '{name}' not found{hint}"
+                        )
+                    elif op == "delete":
+                        editor.delete(name)
+                        counts["delete"] += 1
+                    else:
+                        del record["name"]
+                        editor.update(name, record)
+                        counts["update"] += 1
+            except (OSError, ValueError) as e:
+                errors.append(f"[!] {e}")
+
+            if not errors and not dry_run:
+                tx.text = editor.text()
+
+        for line in errors[:50]:
+            print(line)
+        if len(errors) > 50:
+            print(f"[!] ... and {len(errors) - 50} more errors")
+
+        summary = (
+            f"{counts['add']} added, {counts['update']} updated, "
+            f"{counts['delete']} deleted"
+        )
+        if counts["skip"]:
+            summary += f", {counts['skip']} skipped"
+        if errors:
+            print(f"[!] Nothing written ({len(errors)} errors)")
+            return 1
+        if dry_run:
+            print(f"[*] Dry run, nothing written: {summary}")
+        else:
+            print(f"[+] {summary}")
+        return 0
+
+    def import_hosts(
+        self,
+        path: str,
+        fmt: str | None = None,
+        dry_run: bool = False,
+        skip_existing: bool = False,
+    ) -> int:
+        if not os.path.isfile(path):
+            print(f"[!] File not found: {path}")
+            return 1
+
+        ops = (
+            (where, "add", record)
+            for where, record in self.read_import_file(path, fmt)
+        )
+        return self.apply_host_ops(ops, dry_run, skip_existing, "import")
+
+    def export_hosts(self, target: str, group_name: str | None = None) -> int:
+        if not os.path.isfile(self.path_ssh_config):
+            print(
+                f"[!] SSH config not found: {self.path_ssh_config}",
+                file=sys.stderr,
+            )
+            return 1
+
+        cfg = self.get_ssh_config()
+        if group_name is not None:
+            hosts = cfg.by_group.get(group_name)
+            if not hosts:
+                print(f"[!] Group '{group_name}' not found", file=sys.stderr)
+                return 1
+            groups = [(group_name, hosts)]
+        else:
+            groups = [(g, cfg.by_group[g]) for g in cfg.group_order()]
+
+        write = sys.stdout.write
+        for line in InventoryExporter(groups).render(target):
+            write(line + "\n")
+        return 0
+
+    # ------------------------------------------------------------------------
+    # group operations
+    # ------------------------------------------------------------------------
+    def get_group_hosts(self, group_name: str) -> list[SshHost] | None:
+        group_name = group_name.strip()
+        if not os.path.isfile(self.path_ssh_config):
+            print(f"[!] SSH config not found: {self.path_ssh_config}")
+            return None
+
+        hosts = self.get_ssh_config().by_group.get(group_name)
+        if not hosts:
+            print(f"[!] Group '{group_name}' not found")
+            return None
+        return hosts
 
-        all_rows: list[tuple[str, str, str, str]] = []
-        for g in order:
-            all_rows.extend(groups.get(g, []))
+    def search_hosts(self, query: str, limit: int = 50) -> int:
+        if not os.path.isfile(self.path_ssh_config):
+            print(f"[!] SSH config not found: {self.path_ssh_config}")
+            return 1
 
-        if not all_rows:
-            print("[!] No hosts in config")
-            return
+        results = self.get_host_search().search(query, limit or None)
+        if not results:
+            print(f"[!] No hosts match: {query}")
+            return 1
 
-        w_name = max(len("Name"), max(len(r[0]) for r in all_rows))
-        w_ip = max(len("IP"), max(len(r[1]) for r in all_rows))
-        w_port = max(len("Port"), max(len(r[2]) for r in all_rows))
-        w_notes = max(len("Notes"), max(len(r[3]) for r in all_rows))
+        headers = ("Name", "IP", "Port", "User", "Group", "Notes")
+        rows = [
+            (
+                host.name,
+                host.hostname or "",
+                host.port or "22",
+                host.user or "",
+                host.group or UNGROUPED,
+                host.notes or "",
+            )
+            for _, host in results
+        ]
+        self.print_table(headers, [(None, rows)])
+        return 0
 
-        header = (
-            "| "
-            + f"{'Name'.ljust(w_name)} | { 'IP'.ljust(w_ip) } | "
-            + f"{'Port'.ljust(w_port)} | { 'Notes'.ljust(w_notes) } |"
-        )
+    def print_table(
+        self,
+        headers: tuple[str, ...],
+        sections: list[tuple[str | None, list[tuple[str, ...]]]],
+    ) -> None:
+        """ASCII table in the ``--list`` layout, one ``Group:`` row per
+        named section."""
+        widths = [len(h) for h in headers]
+        for _, rows in sections:
+            for row in rows:
+                for idx, cell in enumerate(row):
+                    widths[idx] = max(widths[idx], len(cell))
+
+        def fmt(cells: tuple[str, ...]) -> str:
+            inner = " | ".join(c.ljust(w) for c, w in zip(cells, widths))
+            return f"| {inner} |"
+
+        header = fmt(headers)
         line = "=" * len(header)
 
-        def print_group_row(group_name: str) -> None:
-            inner_width = len(header) - 4
-            text = f"Group: {group_name}"
-            print("| " + text.ljust(inner_width) + " |")
-
         print(line)
         print(header)
         print(line)
-
-        for g in order:
-            print_group_row(g)
+        for title, rows in sections:
+            if title is not None:
+                text = f"Group: {title}"
+                print("| " + text.ljust(len(header) - 4) + " |")
+                print(line)
+            for row in rows:
+                print(fmt(row))
             print(line)
-            for name, ip, port, notes in groups.get(g, []):
-                row = (
-                    "| "
-                    + f"{name.ljust(w_name)} | {ip.ljust(w_ip)} | "
-                    + f"{port.ljust(w_port)} | {notes.ljust(w_notes)} |"
+
+    def run_group_command(
+        self,
+        group_name: str,
+        command: list[str],
+        jobs: int = 8,
+        timeout: float | None = None,
+    ) -> int:
+        hosts = self.get_group_hosts(group_name)
+        if hosts is None:
+            return 1
+
+        import subprocess
+        import threading
+        import time
+
+        width = max(len(h.name) for h in hosts)
+        out_lock = threading.Lock()
+
+        def emit(name: str, text: str) -> None:
+            with out_lock:
+                sys.stdout.write(f"[{name.ljust(width)}] {text}")
+                if not text.endswith("\n"):
+                    sys.stdout.write("\n")
+                sys.stdout.flush()
+
+        def run_host(host: SshHost) -> tuple[str, str, str]:
+            start = time.monotonic()
+            timed_out = threading.Event()
+
+            try:
+                proc = subprocess.Popen(
+                    self._ssh_argv(host) + command,
+                    stdin=subprocess.DEVNULL,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.STDOUT,
+                    text=True,
+                    errors="replace",
                 )
-                print(row)
-            print(line)
+            except OSError as e:
+                emit(host.name, f"[!] {e}")
+                return host.name, "error", "0.0s"
 
-        print()
+            def kill() -> None:
+                timed_out.set()
+                proc.kill()
 
-    def delete_ssh_config(self) -> None:
-        if not os.path.isfile(self.path_ssh_config):
-            print("\n[!] SSH config file does not exist")
-            return
+            timer = None
+            if timeout:
+                timer = threading.Timer(timeout, kill)
+                timer.start()
 
-        os.remove(self.path_ssh_config)
-        print("\n[+] SSH config file deleted")
+            assert proc.stdout is not None
+            for line in proc.stdout:
+                emit(host.name, line)
+            rc = proc.wait()
 
-    def change_host(self, selected: str) -> None:
-        clear_console()
-        print(selected)
-        print(self.logo())
+            if timer is not None:
+                timer.cancel()
 
-        while not self.set_host("port"):
-            pass
-        while not self.set_host("user"):
-            pass
-        while not self.set_host("ip"):
-            pass
+            duration = f"{time.monotonic() - start:.1f}s"
+            status = "timeout" if timed_out.is_set() else str(rc)
+            return host.name, status, duration
 
-        host_name = selected.splitlines()[0].split(None, 1)[1]
+        results = run_parallel(run_host, hosts, jobs)
 
-        new_block = (
-            f"Host {host_name}\n"
-            f"        HostName {self.ip_host}\n"
-            f"        User {self.user_host}\n"
-            f"        Port {self.port_host}\n"
-        )
+        print()
+        self.print_table(("Name", "Exit", "Time"), [(None, results)])
 
-        with open(
-            self.path_ssh_config,
-            "r",
-            encoding="utf-8",
-            errors="replace",
-        ) as f:
-            text = f.read()
+        failed = sum(1 for _, status, _ in results if status != "0")
+        print(f"\n[+] OK: {len(results) - failed}  [!] Failed: {failed}\n")
+        return 1 if failed else 0
 
-        text = text.replace(selected, new_block, 1)
+    def copy_pubkey_to_group(
+        self,
+        key: str,
+        group_name: str,
+        jobs: int = 8,
+        timeout: float = 30.0,
+    ) -> int:
+        pubkey_path = self._find_pubkey(key)
+        if pubkey_path is None:
+            print(f"[!] Public key not found: {key}")
+            return 1
+
+        with open(pubkey_path, "r", encoding="utf-8", errors="replace") as f:
+            pubkey = f.read().strip()
+        if len(pubkey.split()) < 2 or "\n" in pubkey:
+            print(f"[!] Not a single public key: {pubkey_path}")
+            return 1
+
+        hosts = self.get_group_hosts(group_name)
+        if hosts is None:
+            return 1
 
-        with open(self.path_ssh_config, "w", encoding="utf-8") as f:
-            f.write(text)
+        import subprocess
 
-        if not self.is_windows():
-            os.chmod(self.path_ssh_config, 0o600)
+        def push(host: SshHost) -> tuple[str, str, str]:
+            argv = self._ssh_argv(host) + [AUTHORIZED_KEYS_APPEND]
+            target = argv[-2]
+            try:
+                proc = subprocess.run(
+                    argv,
+                    input=pubkey + "\n",
+                    capture_output=True,
+                    text=True,
+                    errors="replace",
+                    timeout=timeout,
+                )
+            except subprocess.TimeoutExpired:
+                return host.name, target, "failed: timeout"
+            except OSError as e:
+                return host.name, target, f"failed: {e}"
 
-        print("\n[+] Host updated")
-        input("\nPress Enter...")
+            out = proc.stdout.strip().splitlines()
+            if proc.returncode == 0 and out and out[-1] == "SSSH_ADDED":
+                return host.name, target, "added"
+            if proc.returncode == 0 and out and out[-1] == "SSSH_PRESENT":
+                return host.name, target, "already present"
 
-    def copy_pubkey_to_host(
-        self,
-        private_key_name: str,
-        port: Optional[int] = None,
-        user: Optional[str] = None,
-        ip: Optional[str] = None,
-    ) -> None:
-        clear_console()
-        print(self.logo())
+            err = proc.stderr.strip().splitlines()
+            reason = err[-1] if err else f"exit {proc.returncode}"
+            return host.name, target, f"failed: {reason}"
 
-        if not port and not user and not ip:
-            while not self.set_host("port"):
-                pass
-            while not self.set_host("user"):
-                pass
-            while not self.set_host("ip"):
-                pass
+        print(f"[*] Copying {pubkey_path} to {len(hosts)} host(s)...")
+        results = run_parallel(push, hosts, jobs)
 
         print()
+        self.print_table(("Name", "Target", "Result"), [(None, results)])
+
+        failed = sum(1 for r in results if r[2].startswith("failed"))
+        added = sum(1 for r in results if r[2] == "added")
+        print(
+            f"\n[+] Added: {added}  [*] Already present: "
+            f"{len(results) - added - failed}  [!] Failed: {failed}\n"
+        )
+        return 1 if failed else 0
 
+    def _find_pubkey(self, key: str) -> str | None:
         ssh_dir = os.path.dirname(self.path_ssh_config)
-        pubkey_path = os.path.join(ssh_dir, private_key_name + ".pub")
+        key = os.path.expanduser(key.strip())
+        for path in (key, os.path.join(ssh_dir, key)):
+            if not path.endswith(".pub"):
+                path += ".pub"
+            if os.path.isfile(path):
+                return path
+        return None
+
+    def push_to_group(
+        self,
+        group_name: str,
+        sources: list[str],
+        dest: str,
+        jobs: int = 8,
+        bwlimit: int | None = None,
+        tool: str | None = None,
+    ) -> int:
+        """Copy ``sources`` to ``dest`` on every host of a group.
+
+        ``bwlimit`` is the total in KiB/s, split evenly between the
+        transfers running at the same time.
+        """
+        import shutil
 
-        if not os.path.isfile(pubkey_path):
-            print(f"\n[!] Public key not found: {pubkey_path}")
-            input("\nPress Enter...")
-            return
+        missing = [src for src in sources if not os.path.exists(src)]
+        if missing:
+            print(f"[!] Not found: {', '.join(missing)}")
+            return 1
 
-        if self.is_windows():
-            os.system(
-                f"ssh -p {self.port_host} "
-                f"{self.user_host}@{self.ip_host} "
-                f'"mkdir -p ~/.ssh && chmod 700 ~/.ssh && '
-                f'cat >> ~/.ssh/authorized_keys" '
-                f'< "{pubkey_path}"'
-            )
-        else:
-            os.system(
-                f'ssh-copy-id -i "{pubkey_path}" '
-                f"-p {self.port_host} "
-                f"{self.user_host}@{self.ip_host}"
-            )
+        if tool is None:
+            tool = "rsync" if shutil.which("rsync") else "scp"
 
-        input("\nPress Enter...")
+        hosts = self.get_group_hosts(group_name)
+        if hosts is None:
+            return 1
 
-    def delete_ssh_backup(self, name: str) -> None:
-        name = name.strip()
-        if not name:
-            print("\n[!] Empty backup name")
-            return
-        src = os.path.join(self.backup_dir, name)
-        if not os.path.isfile(src):
-            print("\n[!] Backup not found")
-            return
+        import subprocess
+        import threading
+        import time
+
+        jobs = max(1, min(jobs, len(hosts)))
+        options: list[str] = []
+        if bwlimit:
+            share = max(1, bwlimit // jobs)
+            if tool == "rsync":
+                options.append(f"--bwlimit={share}")
+            else:
+                options += ["-l", str(share * 8)]
+
+        local_bytes = sum(tree_size(src) for src in sources)
+        width = max(len(h.name) for h in hosts)
+        live = sys.stdout.isatty()
+        out_lock = threading.Lock()
+
+        def emit(name: str, text: str) -> None:
+            with out_lock:
+                print(f"[{name.ljust(width)}] {text}", flush=True)
+
+        def push(host: SshHost) -> tuple[str, str, int, float]:
+            cfg = self._host_cfg(host)
+            build = self._rsync_argv if tool == "rsync" else self._scp_argv
+            argv = build(
+                cfg,
+                host.name,
+                sources,
+                dest,
+                batch=True,
+                options=options,
+            )
 
-        os.remove(src)
-        print(f"\n[+] Deleted: {name}")
+            start = time.monotonic()
+            try:
+                proc = subprocess.Popen(
+                    argv,
+                    stdin=subprocess.DEVNULL,
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.STDOUT,
+                    text=True,
+                    errors="replace",
+                )
+            except OSError as e:
+                emit(host.name, f"[!] {e}")
+                return host.name, "failed", 0, 0.0
+
+            sent: int | None = None
+            last_error = ""
+            last_report = start
+            assert proc.stdout is not None
+            # text mode turns rsync's \r progress updates into lines
+            for line in proc.stdout:
+                line = line.strip()
+                if not line:
+                    continue
+                parts = line.split()
+                if len(parts) >= 3 and parts[1].endswith("%"):
+                    now = time.monotonic()
+                    if live and now - last_report >= 2:
+                        last_report = now
+                        emit(host.name, f"{parts[1]:>4} {parts[2]}")
+                elif line.startswith("sent ") and "bytes" in line:
+                    digits = "".join(c for c in parts[1] if c.isdigit())
+                    sent = int(digits) if digits else None
+                elif "error" in line.lower() or "denied" in line.lower():
+                    last_error = line
+            rc = proc.wait()
+            elapsed = time.monotonic() - start
+
+            if rc != 0:
+                emit(host.name, f"[!] failed ({last_error or f'exit {rc}'})")
+                return host.name, "failed", 0, elapsed
+
+            nbytes = local_bytes if sent is None else sent
+            emit(
+                host.name,
+                f"done: {fmt_bytes(nbytes)} in {elapsed:.1f}s "
+                f"({fmt_bytes(nbytes / elapsed if elapsed else 0)}/s)",
+            )
+            return host.name, "ok", nbytes, elapsed
 
-    @require_ssh_config
-    def restore_ssh_config(self, name: str) -> None:
-        name = name.strip()
-        if not name:
-            print("\n[!] Empty backup name")
-            return
-        src = os.path.join(self.backup_dir, name)
-        if not os.path.isfile(src):
-            print("\n[!] Backup not found")
-            return
+        print(
+            f"[*] Pushing {fmt_bytes(local_bytes)} to {len(hosts)} host(s) "
+            f"with {tool}, {jobs} at a time..."
+        )
+        start = time.monotonic()
+        results = run_parallel(push, hosts, jobs)
+        wall = time.monotonic() - start
 
-        with open(src, "r", encoding="utf-8", errors="replace") as fsrc, open(
-            self.path_ssh_config, "w", encoding="utf-8"
-        ) as fdst:
-            fdst.write(fsrc.read())
+        rows = [
+            (
+                name,
+                status,
+                fmt_bytes(nbytes),
+                f"{elapsed:.1f}s",
+                f"{fmt_bytes(nbytes / elapsed if elapsed else 0)}/s",
+            )
+            for name, status, nbytes, elapsed in results
+        ]
+        print()
+        self.print_table(
+            ("Name", "Result", "Sent", "Time", "Rate"),
+            [(None, rows)],
+        )
 
-        if not self.is_windows():
-            os.chmod(self.path_ssh_config, 0o600)
+        total = sum(r[2] for r in results)
+        failed = sum(1 for r in results if r[1] != "ok")
+        rate = fmt_bytes(total / wall if wall else 0)
+        print(
+            f"\n[+] Sent {fmt_bytes(total)} in {wall:.1f}s "
+            f"({rate}/s aggregate)  [!] Failed: {failed}\n"
+        )
+        return 1 if failed else 0
 
-        print(f"\n[+] Restored: {name}")
+    def probe_hosts(
+        self,
+        group_name: str | None = None,
+        concurrency: int | None = None,
+        timeout: float = 3.0,
+    ) -> int:
+        if group_name:
+            hosts = self.get_group_hosts(group_name)
+            if hosts is None:
+                return 1
+        else:
+            if not os.path.isfile(self.path_ssh_config):
+                print(f"[!] SSH config not found: {self.path_ssh_config}")
+                return 1
+            hosts = self.get_ssh_config().hosts
 
-    @require_ssh_config
-    def backup_ssh_config(self, name: str) -> None:
-        os.makedirs(self.backup_dir, exist_ok=True)
+        import asyncio
 
-        dst = os.path.join(self.backup_dir, name)
+        targets = [self._probe_target(h) for h in hosts]
+        # all at once by default, so the run takes about one timeout
+        concurrency = raise_nofile_limit(concurrency or len(targets) or 1)
+        results = asyncio.run(probe_many(targets, concurrency, timeout))
 
-        if self.check_backup_exists(name):
-            print("\n[!] Backup with this name already exists")
-            return
+        print(self.logo())
 
-        with open(
-            self.path_ssh_config, "r", encoding="utf-8", errors="replace"
-        ) as src, open(dst, "w", encoding="utf-8") as out:
-            out.write(src.read())
+        sections: dict[str, list[tuple[str, ...]]] = {}
+        for host, target, res in zip(hosts, targets, results):
+            state, connect_ms, banner_ms, version = res
+            ip, port = target if target else (host.hostname or "-", "-")
+            sections.setdefault(host.group or UNGROUPED, []).append(
+                (
+                    host.name,
+                    ip,
+                    str(port),
+                    state,
+                    fmt_ms(connect_ms),
+                    fmt_ms(banner_ms),
+                    version or "-",
+                )
+            )
 
-        print(f"\n[+] Backup created: {name}")
+        order = [UNGROUPED] if UNGROUPED in sections else []
+        order.extend(sorted(g for g in sections if g != UNGROUPED))
+        self.print_table(
+            ("Name", "IP", "Port", "State", "Connect", "Banner", "Version"),
+            [(g, sections[g]) for g in order],
+        )
 
-    @require_ssh_config
-    def find_host(self, kind: str) -> None:
-        kind = kind.strip().lower()
-        if kind not in ("ip", "hostname", "port", "user"):
-            return
+        up = sum(1 for r in results if r[0] == "up")
+        print(f"\n[+] Up: {up}  [!] Not up: {len(results) - up}\n")
+        return 0 if up == len(results) else 1
 
-        clear_console()
-        print(self.logo())
+    def _probe_target(self, host: SshHost) -> tuple[str, int] | None:
+        address = host.hostname or host.name
+        if "*" in address or "?" in address:
+            return None
+        port = host.port or "22"
+        if not self.check_host_port(port):
+            return None
+        return address, int(port)
 
-        if kind == "ip":
-            prompt = "Enter IP (or part): "
-        elif kind == "hostname":
-            prompt = "Enter HostName (or part): "
-        elif kind == "port":
-            prompt = "Enter Port (or part): "
+    def watch_hosts(
+        self,
+        group_name: str | None = None,
+        interval: float = 5.0,
+        concurrency: int | None = None,
+        timeout: float = 3.0,
+        count: int = 0,
+    ) -> int:
+        """Probe the hosts every ``interval`` seconds and redraw one
+        table in place until Ctrl+C (or ``count`` rounds)."""
+        if group_name:
+            hosts = self.get_group_hosts(group_name)
+            if hosts is None:
+                return 1
         else:
-            prompt = "Enter Username (or part): "
-
-        query = input(prompt).strip()
-        if not query:
-            return
+            if not os.path.isfile(self.path_ssh_config):
+                print(f"[!] SSH config not found: {self.path_ssh_config}")
+                return 1
+            hosts = self.get_ssh_config().hosts
+
+        import asyncio
+        import time
+
+        pairs = [
+            (host, target)
+            for host in hosts
+            if (target := self._probe_target(host)) is not None
+        ]
+        if not pairs:
+            print("[!] No hosts with an address to probe")
+            return 1
+
+        concurrency = raise_nofile_limit(concurrency or len(pairs))
+        timeout = min(timeout, interval)
+        health = [HostHealth() for _ in pairs]
+        title = f"Group: {group_name}" if group_name else "All hosts"
+
+        async def watch() -> None:
+            loop = asyncio.get_running_loop()
+            targets: list[tuple[str, int] | None] = [t for _, t in pairs]
+            rounds = 0
+            offset = 0
+            while True:
+                start = loop.time()
+                results = await probe_many(
+                    targets,
+                    concurrency,
+                    timeout,
+                    probe_port,
+                    offset,
+                    interval,
+                )
+                now = time.time()
+                # hosts not reached this round keep their last state
+                for item, res in zip(health, results):
+                    if res is not None:
+                        item.update(res[0], res[1], now)
+                # the next round starts with the first one left over
+                order = list(range(offset, len(targets)))
+                order += range(offset)
+                offset = next(
+                    (idx for idx in order if results[idx] is None), offset
+                )
+                rounds += 1
+                self._render_watch(title, interval, rounds, pairs, health)
+                if count and rounds >= count:
+                    return
+                await asyncio.sleep(max(0.0, interval - (loop.time() - start)))
 
-        query_l = query.lower()
-        blocks: list[str] = []
-        buf: list[str] = []
+        try:
+            asyncio.run(watch())
+        except KeyboardInterrupt:
+            pass
+        release_console()
+        return 0
 
-        def push() -> None:
-            if not buf:
-                return
+    def _render_watch(
+        self,
+        title: str,
+        interval: float,
+        rounds: int,
+        pairs: list[tuple[SshHost, tuple[str, int]]],
+        health: list[HostHealth],
+    ) -> None:
+        import time
 
-            block = "".join(buf)
-            block_l = block.lower()
+        now = time.time()
+        # hosts that are not up come first; the rest keep config order
+        order = sorted(
+            range(len(pairs)), key=lambda i: health[i].state == "up"
+        )
+        up = sum(1 for item in health if item.state == "up")
+
+        screen_rows, _ = get_screen().size()
+        # header (2 lines), table frame (4), footer (2), the cursor row
+        # and one spare, so the frame fits and is redrawn row by row
+        limit = max(1, screen_rows - 10) if screen_rows else len(order)
+
+        rows = []
+        for idx in order[:limit]:
+            host, (ip, port) = pairs[idx]
+            item = health[idx]
+            p50, p95 = item.percentiles()
+            since = "-"
+            if item.changed is not None:
+                since = fmt_age(now - item.changed)
+            rows.append(
+                (
+                    host.name,
+                    ip,
+                    str(port),
+                    item.state,
+                    fmt_ms(item.rtt),
+                    fmt_ms(p50),
+                    fmt_ms(p95),
+                    since,
+                )
+            )
 
-            if kind == "hostname":
-                first = block_l.splitlines()[0].strip()
-                if first.startswith("host ") and query_l in first:
-                    blocks.append(block)
-                return
+        clear_console()
+        print(
+            f"[*] {title}  every {interval:g}s  round {rounds}  "
+            f"{time.strftime('%H:%M:%S')}"
+        )
+        print(f"[+] Up: {up}  [!] Not up: {len(pairs) - up}")
+        self.print_table(
+            ("Name", "IP", "Port", "State", "RTT", "p50", "p95", "Changed"),
+            [(None, rows)],
+        )
+        hidden = len(order) - len(rows)
+        if hidden:
+            print(f"[*] {hidden} more host(s) up, not shown")
+        print("[*] Ctrl+C to stop")
+        # the whole frame goes out as one write
+        sys.stdout.flush()
 
-            for raw in block_l.splitlines():
-                s = raw.strip()
-                if kind == "ip" and s.startswith("hostname ") and query_l in s:
-                    blocks.append(block)
-                    return
-                if kind == "port" and s.startswith("port ") and query_l in s:
-                    blocks.append(block)
-                    return
-                if kind == "user" and s.startswith("user ") and query_l in s:
-                    blocks.append(block)
-                    return
+    @property
+    def path_known_hosts(self) -> str:
+        return os.path.join(
+            os.path.dirname(self.path_ssh_config), "known_hosts"
+        )
 
-        with open(
-            self.path_ssh_config,
-            "r",
-            encoding="utf-8",
-            errors="replace",
-        ) as f:
-            for line in f:
-                if line.strip().lower().startswith("host "):
-                    push()
-                    buf = [line]
-                elif buf:
-                    buf.append(line)
-        push()
+    def _known_hosts_entry(self) -> tuple[str, tuple[str]]:
+        path = os.path.abspath(self.path_known_hosts)
+        name = os.path.basename(self.config_cache.entry_path(path))
+        return name.replace("config-", "known-hosts-"), (path,)
+
+    def _known_hosts(self) -> KnownHosts:
+        known = KnownHosts.load(self.path_known_hosts)
+        data = self.config_cache.load_entry(*self._known_hosts_entry())
+        if data is not None:
+            known.resolved, checked = data
+            known.checked = set(checked)
+        return known
+
+    def _save_known_hosts_index(self, known: KnownHosts) -> None:
+        # forget lines that are gone so the cache does not grow forever
+        fields = {field for field, _ in known.hashed}
+        resolved = {k: v for k, v in known.resolved.items() if k in fields}
+        self.config_cache.store_entry(
+            *self._known_hosts_entry(),
+            (resolved, sorted(known.checked)),
+        )
 
-        clear_console()
-        print(self.logo())
+    def _host_token(self, host: SshHost) -> str | None:
+        target = self._probe_target(host)
+        if target is None:
+            return None
+        return KnownHosts.token(*target)
 
-        if not blocks:
-            print("[!] Not found")
-            input("\nPress Enter...")
-            return
+    def _config_hosts(self, group_name: str | None) -> list[SshHost] | None:
+        if group_name:
+            return self.get_group_hosts(group_name)
+        if not os.path.isfile(self.path_ssh_config):
+            print(f"[!] SSH config not found: {self.path_ssh_config}")
+            return None
+        return self.get_ssh_config().hosts
+
+    def known_hosts_status(self, group_name: str | None = None) -> int:
+        hosts = self._config_hosts(group_name)
+        if hosts is None:
+            return 1
+
+        known = self._known_hosts()
+        tokens = {t for t in map(self._host_token, hosts) if t}
+        found = known.lookup(tokens)
+        self._save_known_hosts_index(known)
+
+        sections: dict[str, list[tuple[str, ...]]] = {}
+        missing = 0
+        for host in hosts:
+            token = self._host_token(host)
+            if token is None:
+                continue
+            types = known.key_types(found[token])
+            missing += not types
+            sections.setdefault(host.group or UNGROUPED, []).append(
+                (
+                    host.name,
+                    token,
+                    "yes" if types else "no",
+                    ", ".join(types) or "-",
+                )
+            )
 
-        while True:
-            clear_console()
-            print(self.logo())
+        self.print_table(
+            ("Name", "Known hosts entry", "Known", "Key types"),
+            list(sections.items()),
+        )
+        print(f"\n[*] Known: {len(tokens) - missing}  [!] Missing: {missing}")
+        return 1 if missing else 0
+
+    def prune_known_hosts(self, apply: bool = False) -> int:
+        """List known_hosts entries for hosts not in the config; remove
+        them only with ``apply`` (entries for hosts such as github.com
+        are rarely in the config)."""
+        hosts = self._config_hosts(None)
+        if hosts is None:
+            return 1
+
+        tokens = {t for t in map(self._host_token, hosts) if t}
+
+        def keep_old(text: str) -> None:
+            # same convention as ssh-keygen -R; atomic and 0600, under
+            # the known_hosts lock already held
+            ConfigTransaction.write_file(
+                os.path.realpath(self.path_known_hosts) + ".old", [text]
+            )
 
-            print(f"[+] Found: {len(blocks)}\n")
-            lines = (
-                f"{idx}. {b.rstrip()}"
-                for idx, b in enumerate(
-                    blocks,
-                    start=1,
+        cached = self._known_hosts()
+        with ConfigTransaction(self.path_known_hosts, keep_old) as tx:
+            known = KnownHosts(self.path_known_hosts, tx.text.splitlines(True))
+            known.resolved, known.checked = cached.resolved, cached.checked
+            stale = known.stale(tokens)
+            for idx in stale:
+                host = known.lines[idx].split()[0]
+                print(f"[-] {idx + 1}: {host[:60]}")
+            if stale and apply:
+                drop = set(stale)
+                tx.text = "".join(
+                    line
+                    for idx, line in enumerate(known.lines)
+                    if idx not in drop
                 )
+        self._save_known_hosts_index(known)
+
+        if not apply:
+            print(
+                f"[*] {len(stale)} entries not in the SSH config; "
+                "run with --apply to remove them"
             )
-            print("\n".join(lines))
+        else:
+            print(f"[+] Removed {len(stale)} stale entries")
+        return 0
 
-            print("\nSelect host number (or 'q' to Back): ")
-            ch = input("\n[>]: ").strip().lower()
-            if ch == "q":
-                return
-            if not ch.isdigit():
-                continue
+    def fetch_host_keys(
+        self,
+        group_name: str,
+        jobs: int = 32,
+        timeout: float = 5.0,
+    ) -> int:
+        hosts = self.get_group_hosts(group_name)
+        if hosts is None:
+            return 1
 
-            num = int(ch)
-            if num < 1 or num > len(blocks):
-                continue
+        import shutil
+        import subprocess
 
-            break
+        if shutil.which("ssh-keyscan") is None:
+            print("[!] ssh-keyscan not found")
+            return 1
+
+        known = self._known_hosts()
+        targets = {}
+        for host in hosts:
+            target = self._probe_target(host)
+            if target is not None:
+                targets.setdefault(KnownHosts.token(*target), target)
+        found = known.lookup(set(targets))
+        missing = [t for t in targets if not found[t]]
+        hashed = bool(known.hashed)
+
+        def scan(token: str) -> tuple[str, str, list[str]]:
+            address, port = targets[token]
+            argv = ["ssh-keyscan", "-T", str(max(1, int(timeout)))]
+            if hashed:
+                argv.append("-H")
+            argv += ["-p", str(port), address]
+            try:
+                proc = subprocess.run(
+                    argv,
+                    capture_output=True,
+                    text=True,
+                    errors="replace",
+                    timeout=timeout + 5,
+                )
+            except (subprocess.TimeoutExpired, OSError) as e:
+                return token, f"failed: {e}", []
+            lines = [
+                line
+                for line in proc.stdout.splitlines()
+                if line.strip() and not line.startswith("#")
+            ]
+            if not lines:
+                return token, "failed: no keys", []
+            return token, f"{len(lines)} key(s)", lines
+
+        print(
+            f"[*] {len(targets) - len(missing)} of {len(targets)} "
+            f"hosts already known, scanning {len(missing)}..."
+        )
+        results = run_parallel(scan, missing, jobs) if missing else []
+
+        new_lines = [line for _, _, lines in results for line in lines]
+        if new_lines:
+            with ConfigTransaction(self.path_known_hosts) as tx:
+                tx.append("\n".join(new_lines) + "\n")
+        self._save_known_hosts_index(known)
+
+        if results:
+            print()
+            self.print_table(
+                ("Known hosts entry", "Result"),
+                [(None, [(t, r) for t, r, _ in results])],
+            )
+        failed = sum(1 for _, r, _ in results if r.startswith("failed"))
+        print(f"\n[+] Added keys for {len(results) - failed} host(s)")
+        return 1 if failed else 0
 
-        selected = blocks[num - 1]
+    # ------------------------------------------------------------------------
+    # lint
+    # ------------------------------------------------------------------------
+    def lint_config(self) -> list[dict[str, Any]]:
+        """Problems in the config and its includes, in file order.
+
+        Every check looks up one dict built during a single walk over
+        the hosts (names, forwarded ports, key files), plus one pass
+        over the raw lines per file for the ``# G:`` markers, so the
+        cost grows linearly with the number of hosts.
+        """
+        cfg = self.get_ssh_config()
+        issues: list[dict[str, Any]] = []
+
+        def issue(
+            check: str,
+            path: str,
+            line: int,
+            host: str | None,
+            message: str,
+        ) -> None:
+            issues.append(
+                {
+                    "check": check,
+                    "file": path,
+                    "line": line + 1,
+                    "host": host,
+                    "message": message,
+                }
+            )
 
-        while True:
-            clear_console()
-            print(self.logo())
+        def where(host: SshHost) -> str:
+            return f"{os.path.basename(host.source)}:{host.start + 1}"
+
+        home = os.path.expanduser("~")
+        names: dict[str, SshHost] = {}
+        forwards: dict[tuple[str, str], SshHost] = {}
+        keys: dict[str, bool] = {}
+
+        for host in cfg.hosts:
+            for name in host.names:
+                first = names.setdefault(name.lower(), host)
+                if first is not host:
+                    issue(
+                        "duplicate-name",
+                        host.source,
+                        host.start,
+                        host.name,
+                        f"'{name}' is already defined at {where(first)};"
+                        " ssh uses the first one",
+                    )
 
-            print("What do you want to do?")
-            print("  e - Edit host")
-            print("  d - Delete host")
-            print("  q - Cancel")
+            if host.port is not None and not self.check_host_port(host.port):
+                issue(
+                    "invalid-port",
+                    host.source,
+                    host.start,
+                    host.name,
+                    f"Port '{host.port}' is not a number from 1 to 65535",
+                )
 
-            action = input("\n[>]: ").strip().lower()
+            for fwd in host.localforward:
+                local = fwd.split()[0]
+                bind, _, port = local.rpartition(":")
+                if not self.check_host_port(port):
+                    issue(
+                        "invalid-port",
+                        host.source,
+                        host.start,
+                        host.name,
+                        f"LocalForward '{fwd}' has no valid local port",
+                    )
+                    continue
+                bind = bind.strip("[]")
+                if bind in ("localhost", "127.0.0.1", "::1"):
+                    bind = ""
+                first = forwards.setdefault((bind, port), host)
+                if first is not host:
+                    issue(
+                        "duplicate-local-forward",
+                        host.source,
+                        host.start,
+                        host.name,
+                        f"local port {local} is also forwarded by"
+                        f" {first.name} ({where(first)})",
+                    )
 
-            if action == "q":
-                return
+            identity = host.identityfile
+            # %d, %u, ... are expanded by ssh itself
+            if identity and "%" not in identity:
+                path = os.path.join(home, os.path.expanduser(identity))
+                if path not in keys:
+                    keys[path] = os.path.isfile(path)
+                if not keys[path]:
+                    issue(
+                        "missing-identity-file",
+                        host.source,
+                        host.start,
+                        host.name,
+                        f"IdentityFile {identity} does not exist",
+                    )
 
-            if action == "e":
-                self.change_host(selected)
-                return
+            if host.notes == "":
+                issue(
+                    "empty-notes",
+                    host.source,
+                    host.start,
+                    host.name,
+                    "'# Notes:' comment without text",
+                )
 
-            if action == "d":
-                clear_console()
-                print(self.logo())
+        for path in cfg.files:
+            known = self._config_files.get(path)
+            if known is None:
+                continue
+            marker = -1
+            for idx, raw in enumerate(known[1].lines):
+                s = raw.strip()
+                if not s:
+                    continue
+                if s[0] == "#":
+                    if parse_group_marker(s) is None:
+                        continue
+                    if marker >= 0:
+                        issue(
+                            "orphan-group-marker",
+                            path,
+                            marker,
+                            None,
+                            "'# G:' comment is followed by another one",
+                        )
+                    marker = idx
+                    continue
+                if marker >= 0 and s.split(None, 1)[0].lower() != "host":
+                    issue(
+                        "orphan-group-marker",
+                        path,
+                        marker,
+                        None,
+                        "'# G:' comment is not followed by a Host line",
+                    )
+                marker = -1
+            if marker >= 0:
+                issue(
+                    "orphan-group-marker",
+                    path,
+                    marker,
+                    None,
+                    "'# G:' comment at the end of the file",
+                )
 
-                with open(
-                    self.path_ssh_config,
-                    "r",
-                    encoding="utf-8",
-                    errors="replace",
-                ) as f:
-                    text = f.read()
+        order = {path: idx for idx, path in enumerate(cfg.files)}
+        issues.sort(key=lambda i: (order.get(i["file"], 0), i["line"]))
+        return issues
 
-                text = text.replace(selected, "", 1)
+    def print_lint(self, fmt: str = "table") -> int:
+        if not os.path.isfile(self.path_ssh_config):
+            print(f"[!] SSH config not found: {self.path_ssh_config}")
+            return 2
+
+        issues = self.lint_config()
+
+        if fmt == "json":
+            import json
+
+            counts: dict[str, int] = {}
+            for item in issues:
+                counts[item["check"]] = counts.get(item["check"], 0) + 1
+            report = {
+                "config": self.path_ssh_config,
+                "hosts": len(self.get_ssh_config().hosts),
+                "issues": issues,
+                "counts": counts,
+            }
+            print(json.dumps(report, indent=2))
+        elif issues:
+            rows = [
+                (
+                    f"{os.path.basename(i['file'])}:{i['line']}",
+                    i["host"] or "-",
+                    i["check"],
+                    i["message"],
+                )
+                for i in issues
+            ]
+            self.print_table(
+                ("Line", "Host", "Check", "Message"), [(None, rows)]
+            )
+            print(f"\n[!] {len(issues)} problem(s) found")
+        else:
+            print("[+] No problems found")
 
-                with open(self.path_ssh_config, "w", encoding="utf-8") as f:
-                    f.write(text)
+        return 1 if issues else 0
 
-                if not self.is_windows():
-                    os.chmod(self.path_ssh_config, 0o600)
+    # ------------------------------------------------------------------------
+    # connection pool
+    # ------------------------------------------------------------------------
+    @property
+    def path_control_dir(self) -> str:
+        return os.path.join(os.path.dirname(self.path_ssh_config), "sssh-cm")
+
+    @property
+    def control_path(self) -> str:
+        # readable socket names, so --pool-status can tell whose they are
+        path = os.path.join(self.path_control_dir, "%r@%h:%p")
+        home = os.path.expanduser("~")
+        if path.startswith(home + os.sep):
+            path = "~" + path[len(home) :]
+        return path
+
+    @staticmethod
+    def _find_pool_block(lines: list[str]) -> tuple[int, int] | None:
+        for idx, line in enumerate(lines):
+            if line.startswith(POOL_MARKER):
+                end = idx + 1
+                while end < len(lines) and lines[end].strip():
+                    end += 1
+                return idx, min(end + 1, len(lines))
+        return None
+
+    def pool_settings(self) -> tuple[list[str], str]:
+        """Pooled groups and their ControlPersist, from the config."""
+        try:
+            lines = self.get_ssh_config().root.lines
+        except FileNotFoundError:
+            return [], CONTROL_PERSIST
+        found = self._find_pool_block(lines)
+        if found is None:
+            return [], CONTROL_PERSIST
+
+        start, end = found
+        names = lines[start][len(POOL_MARKER) :].split(",")
+        groups = [g.strip() for g in names if g.strip()]
+        persist = CONTROL_PERSIST
+        for line in lines[start:end]:
+            words = line.split()
+            if len(words) == 2 and words[0].lower() == "controlpersist":
+                persist = words[1]
+        return groups, persist
+
+    def configure_pool(self, groups: list[str], persist: str) -> bool:
+        """Write the Match block that enables ControlMaster for every
+        name and HostName of the pooled groups; True if it changed.
+
+        The block goes at the end of the prelude, so no global option
+        ends up inside it and sorting never moves it.
+        """
+        by_group = self.get_ssh_config().by_group
+        targets: dict[str, None] = {}
+        for group in groups:
+            for host in by_group.get(group, []):
+                for name in host.names + [host.hostname or ""]:
+                    if name and not any(c in name for c in "*?!"):
+                        targets[name] = None
+
+        block = (
+            f"{POOL_MARKER} {', '.join(groups)}\n"
+            f"Match originalhost {','.join(targets)}\n"
+            "        ControlMaster auto\n"
+            f"        ControlPath {self.control_path}\n"
+            f"        ControlPersist {persist}\n"
+            "\n"
+        )
 
-                print("[+] Host deleted")
-                input("\nPress Enter...")
-                return
+        with self.edit_config("pool") as tx:
+            root = SshConfigFile.from_text(self.path_ssh_config, tx.text)
+            lines = root.lines
+            found = self._find_pool_block(lines)
+            if found is not None:
+                start, end = found
+            else:
+                start = end = root.block_spans()[0]
+                if start and lines[start - 1].strip():
+                    block = "\n" + block
+            if groups:
+                lines[start:end] = [block]
+            else:
+                del lines[start:end]
+            tx.text = "".join(lines)
+            return tx.changed
 
-    @require_ssh_config
-    def open_editor(self) -> None:
-        import os
-        import shlex
-        import shutil
+    def _master_check(self, argv: list[str]) -> str | None:
+        """``Master running (pid=N)`` for a live master, else None."""
         import subprocess
 
-        path = self.path_ssh_config
-        is_windows = os.name == "nt"
+        proc = subprocess.run(
+            argv[:-1] + ["-O", "check", argv[-1]],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            text=True,
+            errors="replace",
+        )
+        if proc.returncode != 0:
+            return None
+        return proc.stderr.strip() or "Master running"
 
-        editor = os.environ.get("VISUAL") or os.environ.get("EDITOR")
+    def warm_group(
+        self,
+        group_name: str,
+        jobs: int = 16,
+        timeout: float = 10.0,
+        persist: str | None = None,
+    ) -> int:
+        if self.is_windows():
+            print("[!] OpenSSH on Windows has no connection multiplexing")
+            return 1
 
-        if not editor:
-            if is_windows:
-                editor = "notepad"
-            else:
-                for candidate in ("nvim", "vim", "vi", "nano"):
-                    if shutil.which(candidate):
-                        editor = candidate
-                        break
+        hosts = self.get_group_hosts(group_name)
+        if hosts is None:
+            return 1
 
-        if not editor:
-            print("\n[!] No editor available (set $EDITOR or $VISUAL)")
-            input("\nPress Enter...")
-            return
+        import subprocess
+        import tempfile
+        import time
+
+        groups, current = self.pool_settings()
+        if group_name not in groups:
+            groups.append(group_name)
+        if self.configure_pool(groups, persist or current):
+            print(f"[+] Multiplexing enabled for: {', '.join(groups)}")
+        os.makedirs(self.path_control_dir, mode=0o700, exist_ok=True)
+
+        control = [
+            "-o",
+            "ControlMaster=auto",
+            "-o",
+            f"ControlPath={self.control_path}",
+            "-o",
+            f"ControlPersist={persist or current}",
+        ]
 
-        if is_windows and editor.lower() == "notepad":
-            cmd = [editor, path]
-        else:
-            cmd = shlex.split(editor) + [path]
+        def warm(host: SshHost) -> tuple[str, str, str]:
+            argv = self._ssh_argv(host)
+            argv[-1:-1] = control
+            if self._master_check(argv):
+                return host.name, "already open", "-"
+
+            start = time.monotonic()
+            # -f leaves a background master holding stderr: use a file,
+            # a pipe would only see EOF when the master exits
+            with tempfile.TemporaryFile("w+") as err:
+                try:
+                    rc = subprocess.run(
+                        argv[:-1]
+                        + ["-o", f"ConnectTimeout={int(timeout)}"]
+                        + ["-N", "-f", argv[-1]],
+                        stdin=subprocess.DEVNULL,
+                        stdout=subprocess.DEVNULL,
+                        stderr=err,
+                        timeout=timeout + 5,
+                    ).returncode
+                except subprocess.TimeoutExpired:
+                    return host.name, "timeout", "-"
+                except OSError as e:
+                    return host.name, f"failed: {e}", "-"
+                err.seek(0)
+                message = err.read().strip().splitlines()
+
+            duration = f"{time.monotonic() - start:.1f}s"
+            if rc != 0:
+                reason = message[-1] if message else f"exit {rc}"
+                return host.name, f"failed: {reason}", duration
+            return host.name, "open", duration
+
+        results = run_parallel(warm, hosts, jobs)
 
-        sys.stdout.flush()
-        subprocess.call(cmd)
+        print()
+        self.print_table(("Name", "Master", "Time"), [(None, results)])
+        ok = ("open", "already open")
+        failed = sum(1 for _, r, _ in results if r not in ok)
+        print(f"\n[+] Open: {len(results) - failed}  [!] Failed: {failed}\n")
+        return 1 if failed else 0
+
+    def _pool_sockets(self) -> list[tuple[str, str, str, str]]:
+        """``(path, user, host, port)`` of every control socket."""
+        try:
+            names = sorted(os.listdir(self.path_control_dir))
+        except OSError:
+            return []
 
-    def set_host(self, item: str) -> bool:
-        if item == "ip":
-            ip = input("Enter IP Address: ").strip()
-            if ip.lower() == "q":
-                raise Cancelled()
-            if self.check_host_ip(ip):
-                self.ip_host = ip
-            else:
-                print("\n[!] Invalid IP address format\n")
-                return False
+        sockets = []
+        for name in names:
+            user, _, rest = name.rpartition("@")
+            host, _, port = rest.rpartition(":")
+            # ssh creates "<path>.<random>" first and renames it
+            if not host or not port.isdigit():
+                continue
+            path = os.path.join(self.path_control_dir, name)
+            sockets.append((path, user, host, port))
+        return sockets
 
-        elif item == "port":
-            port = input("Enter Port: ").strip()
-            if port.lower() == "q":
-                raise Cancelled()
-            if not port:
-                port = "22"
-            if self.check_host_port(port):
-                self.port_host = int(port)
-            else:
-                print("\n[!] Invalid Port format\n")
-                return False
+    def _socket_argv(self, socket: tuple[str, str, str, str]) -> list[str]:
+        path, user, host, port = socket
+        target = f"{user}@{host}" if user else host
+        return ["ssh", "-o", f"ControlPath={path}", "-p", port, target]
 
-        elif item == "user":
-            user = input("Enter Username: ").strip()
-            if user.lower() == "q":
-                raise Cancelled()
-            if not user:
-                import getpass
+    def _socket_names(
+        self,
+        hosts: list[SshHost],
+    ) -> dict[tuple[str, str], str]:
+        """(HostName, port) -> config name, to label sockets."""
+        names: dict[tuple[str, str], str] = {}
+        for host in hosts:
+            key = (host.hostname or host.name, host.port or "22")
+            names.setdefault(key, host.name)
+        return names
+
+    def pool_status(self) -> int:
+        import time
+
+        sockets = self._pool_sockets()
+        if not sockets:
+            print("[*] No pooled connections")
+            return 0
 
-                user = getpass.getuser()
-            self.user_host = user
+        try:
+            labels = self._socket_names(self.get_ssh_config().hosts)
+        except FileNotFoundError:
+            labels = {}
+
+        def status(socket: tuple[str, str, str, str]) -> tuple[str, ...]:
+            path, user, host, port = socket
+            try:
+                age = fmt_age(time.time() - os.stat(path).st_mtime)
+            except OSError:
+                age = "-"
+            state = self._master_check(self._socket_argv(socket)) or "stale"
+            target = f"{user}@{host}:{port}" if user else f"{host}:{port}"
+            return labels.get((host, port), "-"), target, age, state
+
+        rows = run_parallel(status, sockets, 32)
+        self.print_table(("Name", "Target", "Age", "Master"), [(None, rows)])
+        live = sum(1 for row in rows if row[3] != "stale")
+        print(f"\n[+] Live masters: {live}")
+        return 0
+
+    def pool_close(self, group_name: str | None = None) -> int:
+        import subprocess
 
-        elif item == "forward_client_port":
-            client_port = input("Enter Client Port: ").strip()
-            if client_port.lower() == "q":
-                raise Cancelled()
-            if self.check_host_port(client_port):
-                self.client_port_forward = int(client_port)
-            else:
-                print("\n[!] Invalid Port format\n")
-                return False
+        sockets = self._pool_sockets()
+        if group_name:
+            hosts = self.get_group_hosts(group_name)
+            if hosts is None:
+                return 1
+            wanted = self._socket_names(hosts)
+            sockets = [s for s in sockets if (s[2], s[3]) in wanted]
+        if not sockets:
+            print("[*] No pooled connections")
+            return 0
+
+        def close(socket: tuple[str, str, str, str]) -> bool:
+            argv = self._socket_argv(socket)
+            proc = subprocess.run(
+                argv[:-1] + ["-O", "exit", argv[-1]],
+                stdin=subprocess.DEVNULL,
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+            if proc.returncode == 0:
+                return True
+            # no master behind it: a stale socket left by a crash
+            try:
+                os.remove(socket[0])
+            except OSError:
+                pass
+            return False
 
-        elif item == "forward_local_port":
-            local_port = input("Enter Local Port: ").strip()
-            if local_port.lower() == "q":
-                raise Cancelled()
-            if self.check_host_port(local_port):
-                self.local_port_forward = int(local_port)
-            else:
-                print("\n[!] Invalid Port format\n")
-                return False
+        closed = sum(run_parallel(close, sockets, 32))
+        print(f"[+] Closed {closed} master(s)")
+        if closed < len(sockets):
+            print(f"[*] Removed {len(sockets) - closed} stale socket(s)")
+        return 0
 
-        elif item == "short_name":
-            short_name = input("Enter Short Name: ").strip()
-            if short_name.lower() == "q":
-                raise Cancelled()
+    # ------------------------------------------------------------------------
+    # shell completion
+    # ------------------------------------------------------------------------
+    @property
+    def path_completer(self) -> str:
+        return os.path.join(self.user_cache_dir, "complete.py")
+
+    @property
+    def completion_cache(self) -> SshConfigCache:
+        # per user, so Tab stays fast when the install dir is read-only
+        return SshConfigCache(self.user_cache_dir)
+
+    @property
+    def path_completion_index(self) -> str:
+        entry = self.completion_cache.entry_path(self.path_ssh_config)
+        return entry.replace("config-", "complete-")
+
+    def write_completion_index(self) -> tuple[list[str], list[str]]:
+        """Sorted host names and groups, saved for the completer together
+        with the size and mtime of every file (and Include directory) the
+        config was read from."""
+        try:
+            cfg = self.get_ssh_config()
+            hosts = cfg.hosts
+        except FileNotFoundError:
+            return [], []
+
+        names = sorted(
+            {
+                name
+                for host in hosts
+                for name in host.names
+                if not any(c in name for c in "*?!")
+            }
+        )
+        groups = sorted(g for g in cfg.by_group if g != UNGROUPED)
 
-            if not self.check_host_short_name(short_name):
-                print("\n[!] Invalid Short Name format\n")
-                return False
+        # a new file in an Include directory changes the directory mtime
+        paths = set(cfg.files)
+        paths.update(
+            os.path.dirname(p) for p in cfg.files if p != cfg.root.path
+        )
+        key = []
+        for path in sorted(paths):
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            key.append((path, st.st_mtime_ns, st.st_size))
 
-            if self.check_host_exists(short_name):
-                print("\n[!] Short Name already exists in SSH config\n")
-                return False
-            self.short_name_host = short_name
+        self.completion_cache.store(
+            self.path_completion_index,
+            (
+                SshConfigCache.VERSION,
+                tuple(key),
+                ("\n".join(names), "\n".join(groups)),
+            ),
+        )
+        try:
+            with open(self.path_completer, "w", encoding="utf-8") as f:
+                f.write(COMPLETER.format(version=SshConfigCache.VERSION))
+        except OSError:
+            pass
+        return names, groups
 
-        elif item == "key":
-            key = input("Enter Path to Key File (or leave empty): ").strip()
-            if key.lower() == "q":
-                raise Cancelled()
-            if key:
-                key = os.path.expanduser(key)
-                if not os.path.isfile(key):
-                    print("\n[!] Key file does not exist\n")
-                    return False
-                self.key_host = key
-            else:
-                self.key_host = None
+    def complete(self, kind: str, prefix: str) -> int:
+        """Slow path of the completer: rebuild the index, then answer."""
+        from bisect import bisect_left
 
-        elif item == "notes":
-            notes = input("Enter Notes (optional, Enter to skip): ").strip()
-            if notes.lower() == "q":
-                raise Cancelled()
-            self.notes_host = notes if notes else "-"
+        names, groups = self.write_completion_index()
+        words = names if kind == "host" else groups
+        lo = bisect_left(words, prefix)
+        hi = bisect_left(words, prefix + "\U0010ffff")
+        for word in words[lo:hi]:
+            print(word)
+        return 0
 
-        elif item == "host_group":
-            host_group = input(
-                "Enter Host Group (optional, Enter to skip): ",
-            ).strip()
-            if host_group.lower() == "q":
-                raise Cancelled()
-            self.host_group = host_group.lower() if host_group else None
+    def completion_script(self, shell: str) -> str:
+        import shlex
+        import shutil
 
-        return True
+        self.write_completion_index()
+        if getattr(sys, "frozen", False):
+            # a PyInstaller build is its own entry point and has no
+            # interpreter to run the completer with; use one from PATH
+            sssh = [sys.executable]
+            python = shutil.which("python3") or shutil.which("python")
+        else:
+            sssh = [sys.executable, os.path.abspath(sys.argv[0])]
+            python = sys.executable
+
+        fast = "false"
+        if python:
+            fast = " ".join(
+                (
+                    shlex.quote(python),
+                    "-I",
+                    "-S",
+                    shlex.quote(self.path_completer),
+                    '"$1"',
+                    '"$2"',
+                    shlex.quote(self.path_completion_index),
+                )
+            )
+        slow = " ".join(
+            [shlex.quote(arg) for arg in sssh] + ["--complete", '"$1"', '"$2"']
+        )
+        template = COMPLETION_SCRIPTS[shell]
+        if shell == "fish":
+            fast = fast.replace('"$1"', "$argv[1]").replace('"$2"', "$argv[2]")
+            slow = slow.replace('"$1"', "$argv[1]").replace('"$2"', "$argv[2]")
+        return template.replace("@FAST@", fast).replace("@SLOW@", slow)
 
     # ------------------------------------------------------------------------
     # Menu
@@ -1307,10 +5599,11 @@ class ShortSSH:
     @require_ssh_config
     def find_menu(self) -> None:
         menu = [
-            "1. Find by IP",
-            "2. Find by host name",
-            "3. Find by port name",
-            "4. Find by user name",
+            "1. Search all fields",
+            "2. Find by IP",
+            "3. Find by host name",
+            "4. Find by port name",
+            "5. Find by user name",
             "q. Back",
         ]
         while True:
@@ -1322,12 +5615,14 @@ class ShortSSH:
             if ch == "q":
                 break
             elif ch == "1":
-                self.find_host("ip")
+                self.find_host("all")
             elif ch == "2":
-                self.find_host("hostname")
+                self.find_host("ip")
             elif ch == "3":
-                self.find_host("port")
+                self.find_host("hostname")
             elif ch == "4":
+                self.find_host("port")
+            elif ch == "5":
                 self.find_host("user")
 
     @require_ssh_config
@@ -1421,25 +5716,30 @@ class ShortSSH:
 
             ch = input("\n[>]: ").strip().lower()
             if ch == "y":
-                with open(self.path_ssh_config, "a") as f:
-                    if self.host_group:
-                        f.write(f"# G: {self.host_group}\n")
-                    f.write(
-                        f"""Host {self.short_name_host}
-        HostName {self.ip_host}
-        User {self.user_host}
-        Port {self.port_host}
-"""
+                block = ""
+                if self.host_group:
+                    block += f"# G: {self.host_group}\n"
+                block += (
+                    f"Host {self.short_name_host}\n"
+                    f"        HostName {self.ip_host}\n"
+                    f"        User {self.user_host}\n"
+                    f"        Port {self.port_host}\n"
+                )
+                if self.key_host:
+                    block += f"        IdentityFile {self.key_host}\n"
+                if self.notes_host:
+                    block += f"        # Notes: {self.notes_host}\n"
+                if self.add_forward:
+                    block += (
+                        f"        LocalForward {self.local_port_forward} "
+                        f"localhost:{self.client_port_forward}\n"
                     )
-                    if self.key_host:
-                        f.write(f"        IdentityFile {self.key_host}\n")
-                    if self.notes_host:
-                        f.write(f"        # Notes: {self.notes_host}\n")
-                    if self.add_forward:
-                        f.write(
-                            f"        LocalForward {self.local_port_forward} "
-                            f"localhost:{self.client_port_forward}\n"
-                        )
+
+                with self.edit_config("add") as tx:
+                    # one blank line before the block, as ConfigEditor.add
+                    if tx.text.strip() and not tx.text.endswith("\n\n"):
+                        block = "\n" + block
+                    tx.append(block)
                 break
             elif ch == "n":
                 return
@@ -1479,13 +5779,7 @@ class ShortSSH:
             clear_console()
             print(self.logo())
 
-            backups = self.get_backup_list()
-            if not backups:
-                print("[!] No backups")
-            else:
-                print("[+] Backups:\n")
-                for b in backups:
-                    print(f" - {b}")
+            self.print_backup_list()
 
             print("\nEnter backup name to delete (or 'q' to Back): ")
             ch = input("\n[>]: ").strip()
@@ -1509,7 +5803,6 @@ class ShortSSH:
             if ch.lower() == "q":
                 break
             else:
-                os.makedirs(self.backup_dir, exist_ok=True)
                 self.backup_ssh_config(ch)
                 input("\nPress Enter...")
                 break
@@ -1520,13 +5813,7 @@ class ShortSSH:
             clear_console()
             print(self.logo())
 
-            backups = self.get_backup_list()
-            if not backups:
-                print("[!] No backups")
-            else:
-                print("[+] Backups:\n")
-                for b in backups:
-                    print(f" - {b}")
+            self.print_backup_list()
 
             print("\nEnter backup name to restore (or 'q' to Back): ")
             ch = input("\n[>]: ").strip()
@@ -1567,6 +5854,7 @@ class ShortSSH:
                 self.delete_config_menu()
             elif ch == "5":
                 self.sort_ssh_config()
+                input("\nPress Enter...")
 
     @require_ssh_config
     @require_ssh_private_key
@@ -1629,13 +5917,13 @@ class ShortSSH:
 
         menu: dict[str, tuple[str, Optional[Callable[[], None]]]] = {
             "1": ("Add new host", self.select_add_menu),
-            # "2": ("Find host", self.find_menu),
-            "2": ("Open config in editor", self.open_editor),
-            "3": (
+            "2": ("Find host", self.find_menu),
+            "3": ("Open config in editor", self.open_editor),
+            "4": (
                 "Backup/Restore/Delete/Sort SSH config",
                 self.backup_restore_menu,
             ),
-            "4": ("Manual copy SSH key to host", self.copy_ssh_key_menu),
+            "5": ("Manual copy SSH key to host", self.copy_ssh_key_menu),
             "q": ("Quit", None),
         }
 
@@ -1665,15 +5953,94 @@ class ShortSSH:
 
 
 def main():
-    app = ShortSSH()
-
-    if len(sys.argv) == 1:
-        app.main()
-        return
+    global _timings, _profiling
 
     args = sys.argv[1:]
 
-    if args[0] in ("--list", "-l"):
+    no_cache = cache_stats = False
+    while args and args[0] in ("--no-cache", "--cache-stats", "--timings"):
+        opt = args.pop(0)
+        if opt == "--no-cache":
+            no_cache = True
+        elif opt == "--cache-stats":
+            cache_stats = True
+        else:
+            _timings = Timings()
+
+    profile_path = os.environ.get("SSSH_PROFILE")
+    if profile_path:
+        import cProfile
+
+        profiler = cProfile.Profile()
+        _profiling = True
+        profiler.enable()
+
+    app = None
+    try:
+        with span("init"):
+            app = ShortSSH()
+        if no_cache:
+            app.config_cache.enabled = False
+
+        if not args:
+            app.main()
+            return
+
+        with span("command"):
+            run_command(app, args)
+    finally:
+        if profile_path:
+            profiler.disable()
+            try:
+                profiler.dump_stats(profile_path)
+            except OSError as e:
+                print(f"[!] Cannot write profile: {e}", file=sys.stderr)
+        if cache_stats and app is not None:
+            print(app.config_cache.stats(), file=sys.stderr)
+        if _timings is not None:
+            print(_timings.report(), file=sys.stderr)
+
+
+OUTPUT_FORMATS = ("table", "json", "ndjson", "csv", "tsv")
+
+
+def pop_format(args: list[str]) -> str | None:
+    """Remove ``--format F`` / ``--format=F`` from ``args``; None when
+    absent, ValueError when the value is missing or unknown."""
+    for idx, arg in enumerate(args):
+        if arg == "--format":
+            if idx + 1 >= len(args):
+                raise ValueError(arg)
+            fmt = args[idx + 1]
+            del args[idx : idx + 2]
+        elif arg.startswith("--format="):
+            fmt = arg.split("=", 1)[1]
+            del args[idx]
+        else:
+            continue
+        if fmt not in OUTPUT_FORMATS:
+            raise ValueError(fmt)
+        return fmt
+    return None
+
+
+def run_command(app: ShortSSH, args: list[str]) -> None:
+    if args and args[0] in ("--list", "-l", "--list-group", "-lg"):
+        try:
+            fmt = pop_format(args)
+        except ValueError:
+            print(f"[!] --format must be one of: {', '.join(OUTPUT_FORMATS)}")
+            sys.exit(2)
+        if fmt not in (None, "table"):
+            group_name = " ".join(args[1:]).strip()
+            if args[0] in ("--list-group", "-lg") and not group_name:
+                print("[!] Usage: sssh -lg <group> [--format FORMAT]")
+                sys.exit(2)
+            sys.exit(app.write_hosts(fmt, group_name or None))
+
+    if not args:
+        app.main()
+    elif args[0] in ("--list", "-l"):
         app.list_hosts_short_ip()
     elif args[0] in ("--help", "-h"):
         app.doc_help()
@@ -1697,9 +6064,554 @@ def main():
             print("[!] Usage: sssh -c <host>")
             return
         app.output_command_for_host(group_name)
+    elif args[0] in ("--exec", "-x"):
+        sys.exit(run_exec_command(app, args[1:]))
+    elif args[0] == "--probe":
+        sys.exit(run_probe_command(app, args[1:]))
+    elif args[0] == "--watch":
+        sys.exit(run_watch_command(app, args[1:]))
+    elif args[0] == "--copy-key":
+        sys.exit(run_copy_key_command(app, args[1:]))
+    elif args[0] == "--push":
+        sys.exit(run_push_command(app, args[1:]))
+    elif args[0] in ("--find", "-f"):
+        sys.exit(run_find_command(app, args[1:]))
+    elif args[0] in ("import", "--import"):
+        sys.exit(run_import_command(app, args[1:]))
+    elif args[0] in ("batch", "--batch"):
+        sys.exit(run_batch_command(app, args[1:]))
+    elif args[0] == "--known-hosts":
+        sys.exit(app.known_hosts_status(" ".join(args[1:]).strip() or None))
+    elif args[0] == "--known-hosts-prune":
+        # --dry-run is the default now; still accepted
+        if args[1:] not in ([], ["--apply"], ["--dry-run"]):
+            print("[!] Usage: sssh --known-hosts-prune [--apply]")
+            sys.exit(2)
+        sys.exit(app.prune_known_hosts(args[1:] == ["--apply"]))
+    elif args[0] == "--known-hosts-fetch":
+        sys.exit(run_known_hosts_fetch_command(app, args[1:]))
+    elif args[0] in ("export", "--export"):
+        sys.exit(run_export_command(app, args[1:]))
+    elif args[0] == "--backup":
+        sys.exit(run_backup_command(app, args[1:]))
+    elif args[0] == "--backups":
+        sys.exit(0 if app.print_backup_list() else 1)
+    elif args[0] == "--backup-diff":
+        if len(args) not in (2, 3):
+            print("[!] Usage: sssh --backup-diff <backup> [<backup>]")
+            sys.exit(2)
+        sys.exit(app.diff_backups(*args[1:]))
+    elif args[0] == "--restore-host":
+        if len(args) < 3:
+            print("[!] Usage: sssh --restore-host <backup> <host>...")
+            sys.exit(2)
+        sys.exit(app.restore_hosts(args[1], args[2:]))
+    elif args[0] == "--backup-retention":
+        sys.exit(run_backup_retention_command(app, args[1:]))
+    elif args[0] == "--warm":
+        sys.exit(run_warm_command(app, args[1:]))
+    elif args[0] == "--pool-status":
+        sys.exit(app.pool_status())
+    elif args[0] == "--pool-close":
+        sys.exit(app.pool_close(" ".join(args[1:]).strip() or None))
+    elif args[0] == "--completion":
+        if len(args) != 2 or args[1] not in COMPLETION_SCRIPTS:
+            print("[!] Usage: sssh --completion bash|zsh|fish")
+            sys.exit(2)
+        print(app.completion_script(args[1]), end="")
+    elif args[0] == "--complete":
+        if len(args) not in (2, 3) or args[1] not in ("host", "group"):
+            print("[!] Usage: sssh --complete host|group [prefix]")
+            sys.exit(2)
+        sys.exit(app.complete(args[1], args[2] if len(args) == 3 else ""))
+    elif args[0] == "--lint":
+        try:
+            lint_fmt = pop_format(args)
+        except ValueError:
+            lint_fmt = ""
+        if len(args) != 1 or lint_fmt not in (None, "table", "json"):
+            print("[!] Usage: sssh --lint [--format json]")
+            sys.exit(2)
+        sys.exit(app.print_lint(lint_fmt or "table"))
+    elif args[0] == "--sort":
+        sys.exit(run_sort_command(app, args[1:]))
+    elif os.environ.get("SSSH_LAST_USED"):
+        # opt-in: ssh runs as a child so only sessions that connected
+        # (ssh exits 255 on connection errors) are recorded
+        code = run_ssh(args)
+        if code != 255:
+            app.record_last_used(args)
+        sys.exit(code)
+    else:
+        exec_ssh(args)
+
+
+def run_exec_command(app: ShortSSH, args: list[str]) -> int:
+    usage = "[!] Usage: sssh -x <group> [-j N] [--timeout SEC] -- <command>"
+
+    if "--" not in args:
+        print(usage)
+        return 2
+
+    split = args.index("--")
+    opts, command = args[:split], args[split + 1 :]
+
+    group_name: str | None = None
+    jobs = 8
+    timeout: float | None = None
+
+    try:
+        while opts:
+            opt = opts.pop(0)
+            if opt in ("-j", "--jobs"):
+                jobs = int(opts.pop(0))
+            elif opt == "--timeout":
+                timeout = float(opts.pop(0))
+            elif group_name is None:
+                group_name = opt
+            else:
+                group_name += " " + opt
+    except (IndexError, ValueError):
+        print(usage)
+        return 2
+
+    if not group_name or not command or jobs < 1:
+        print(usage)
+        return 2
+
+    return app.run_group_command(group_name, command, jobs, timeout)
+
+
+def run_probe_command(app: ShortSSH, args: list[str]) -> int:
+    usage = "[!] Usage: sssh --probe [group] [-j N] [--timeout SEC]"
+
+    group_name: str | None = None
+    concurrency: int | None = None
+    timeout = 3.0
+
+    try:
+        while args:
+            opt = args.pop(0)
+            if opt in ("-j", "--jobs"):
+                concurrency = int(args.pop(0))
+            elif opt == "--timeout":
+                timeout = float(args.pop(0))
+            elif group_name is None:
+                group_name = opt
+            else:
+                group_name += " " + opt
+    except (IndexError, ValueError):
+        print(usage)
+        return 2
+
+    if (concurrency is not None and concurrency < 1) or timeout <= 0:
+        print(usage)
+        return 2
+
+    return app.probe_hosts(group_name, concurrency, timeout)
+
+
+def run_watch_command(app: ShortSSH, args: list[str]) -> int:
+    usage = (
+        "[!] Usage: sssh --watch [group] [--interval SEC] [-j N] "
+        "[--timeout SEC] [--count N]"
+    )
+
+    group_name: str | None = None
+    interval = 5.0
+    concurrency: int | None = None
+    timeout = 3.0
+    count = 0
+
+    try:
+        while args:
+            opt = args.pop(0)
+            if opt in ("-i", "--interval"):
+                interval = float(args.pop(0))
+            elif opt in ("-j", "--jobs"):
+                concurrency = int(args.pop(0))
+            elif opt == "--timeout":
+                timeout = float(args.pop(0))
+            elif opt == "--count":
+                count = int(args.pop(0))
+            elif group_name is None:
+                group_name = opt
+            else:
+                group_name += " " + opt
+    except (IndexError, ValueError):
+        print(usage)
+        return 2
+
+    if concurrency is not None and concurrency < 1:
+        print(usage)
+        return 2
+    if interval <= 0 or timeout <= 0 or count < 0:
+        print(usage)
+        return 2
+
+    return app.watch_hosts(group_name, interval, concurrency, timeout, count)
+
+
+def run_find_command(app: ShortSSH, args: list[str]) -> int:
+    usage = "[!] Usage: sssh -f <query> [-n N]"
+
+    terms: list[str] = []
+    limit = 50
+
+    try:
+        while args:
+            opt = args.pop(0)
+            if opt in ("-n", "--limit"):
+                limit = int(args.pop(0))
+            else:
+                terms.append(opt)
+    except (IndexError, ValueError):
+        print(usage)
+        return 2
+
+    query = " ".join(terms).strip()
+    if not query or limit < 0:
+        print(usage)
+        return 2
+
+    return app.search_hosts(query, limit)
+
+
+def run_import_command(app: ShortSSH, args: list[str]) -> int:
+    usage = (
+        "[!] Usage: sssh import <file> [--format csv|tsv|json|ndjson] "
+        "[--skip-existing] [--dry-run]"
+    )
+
+    path: str | None = None
+    fmt: str | None = None
+    dry_run = False
+    skip_existing = False
+
+    try:
+        while args:
+            opt = args.pop(0)
+            if opt == "--format":
+                fmt = args.pop(0)
+                if fmt not in ("csv", "tsv", "json", "ndjson"):
+                    raise ValueError(fmt)
+            elif opt == "--dry-run":
+                dry_run = True
+            elif opt == "--skip-existing":
+                skip_existing = True
+            elif path is None:
+                path = opt
+            else:
+                raise ValueError(opt)
+    except (IndexError, ValueError):
+        print(usage)
+        return 2
+
+    if not path:
+        print(usage)
+        return 2
+
+    return app.import_hosts(path, fmt, dry_run, skip_existing)
+
+
+def run_batch_command(app: ShortSSH, args: list[str]) -> int:
+    if args not in ([], ["--dry-run"]):
+        print("[!] Usage: sssh batch [--dry-run] < operations")
+        return 2
+
+    return app.apply_host_ops(app.read_batch(sys.stdin), bool(args))
+
+
+def run_known_hosts_fetch_command(app: ShortSSH, args: list[str]) -> int:
+    usage = (
+        "[!] Usage: sssh --known-hosts-fetch <group> [-j N] [--timeout SEC]"
+    )
 
+    group_name: str | None = None
+    jobs = 32
+    timeout = 5.0
+
+    try:
+        while args:
+            opt = args.pop(0)
+            if opt in ("-j", "--jobs"):
+                jobs = int(args.pop(0))
+            elif opt == "--timeout":
+                timeout = float(args.pop(0))
+            elif group_name is None:
+                group_name = opt
+            else:
+                group_name += " " + opt
+    except (IndexError, ValueError):
+        print(usage)
+        return 2
+
+    if not group_name or jobs < 1 or timeout <= 0:
+        print(usage)
+        return 2
+
+    return app.fetch_host_keys(group_name, jobs, timeout)
+
+
+def run_export_command(app: ShortSSH, args: list[str]) -> int:
+    usage = (
+        "[!] Usage: sssh export --to "
+        + "|".join(InventoryExporter.TARGETS)
+        + " [-g <group>]"
+    )
+
+    target: str | None = None
+    group_name: str | None = None
+
+    try:
+        while args:
+            opt = args.pop(0)
+            if opt == "--to":
+                target = args.pop(0)
+            elif opt in ("-g", "--group"):
+                group_name = args.pop(0)
+            else:
+                raise ValueError(opt)
+    except (IndexError, ValueError):
+        print(usage)
+        return 2
+
+    if target not in InventoryExporter.TARGETS:
+        print(usage)
+        return 2
+
+    return app.export_hosts(target, group_name)
+
+
+def run_backup_command(app: ShortSSH, args: list[str]) -> int:
+    if len(args) > 1:
+        print("[!] Usage: sssh --backup [name]")
+        return 2
+
+    if not os.path.isfile(app.path_ssh_config):
+        print(f"[!] SSH config not found: {app.path_ssh_config}")
+        return 1
+
+    if args:
+        return 0 if app.backup_ssh_config(args[0]) else 1
+
+    with open(
+        app.path_ssh_config, "r", encoding="utf-8", errors="replace"
+    ) as f:
+        text = f.read()
+
+    entry = app.backups.snapshot(text, "snapshot", path=app.path_ssh_config)
+    if entry is None:
+        print("[*] SSH config unchanged since the last snapshot")
+    else:
+        print(f"[+] Snapshot created: {entry['name']}")
+    return 0
+
+
+def run_backup_retention_command(app: ShortSSH, args: list[str]) -> int:
+    usage = (
+        "[!] Usage: sssh --backup-retention "
+        "[recent=N] [hourly=N] [daily=N] [weekly=N]"
+    )
+
+    policy: dict[str, int] = {}
+    try:
+        for arg in args:
+            period, value = arg.split("=", 1)
+            if period not in BackupStore.RETENTION or int(value) < 0:
+                raise ValueError(arg)
+            policy[period] = int(value)
+    except ValueError:
+        print(usage)
+        return 2
+
+    if policy:
+        retention = app.backups.set_retention(policy)
     else:
-        os.system("ssh " + " ".join(args))
+        retention = app.backups.load()["retention"]
+
+    print(
+        "[*] Keeping automatic snapshots: "
+        + ", ".join(f"{k}={retention[k]}" for k in BackupStore.RETENTION)
+    )
+    return 0
+
+
+def run_copy_key_command(app: ShortSSH, args: list[str]) -> int:
+    usage = (
+        "[!] Usage: sssh --copy-key <key> --group <group> "
+        "[-j N] [--timeout SEC]"
+    )
+
+    key: str | None = None
+    group_name: str | None = None
+    jobs = 8
+    timeout = 30.0
+
+    try:
+        while args:
+            opt = args.pop(0)
+            if opt in ("-g", "--group"):
+                group_name = args.pop(0)
+            elif opt in ("-j", "--jobs"):
+                jobs = int(args.pop(0))
+            elif opt == "--timeout":
+                timeout = float(args.pop(0))
+            elif key is None:
+                key = opt
+            else:
+                raise ValueError(opt)
+    except (IndexError, ValueError):
+        print(usage)
+        return 2
+
+    if not key or not group_name or jobs < 1 or timeout <= 0:
+        print(usage)
+        return 2
+
+    return app.copy_pubkey_to_group(key, group_name, jobs, timeout)
+
+
+def run_push_command(app: ShortSSH, args: list[str]) -> int:
+    usage = (
+        "[!] Usage: sssh --push <group> <src>... <dst> [-j N] "
+        "[--bwlimit KBPS] [--scp]"
+    )
+
+    positional: list[str] = []
+    jobs = 8
+    bwlimit: int | None = None
+    tool: str | None = None
+
+    try:
+        while args:
+            opt = args.pop(0)
+            if opt in ("-j", "--jobs"):
+                jobs = int(args.pop(0))
+            elif opt == "--bwlimit":
+                bwlimit = int(args.pop(0))
+            elif opt == "--scp":
+                tool = "scp"
+            elif opt == "--rsync":
+                tool = "rsync"
+            else:
+                positional.append(opt)
+    except (IndexError, ValueError):
+        print(usage)
+        return 2
+
+    if len(positional) < 3 or jobs < 1:
+        print(usage)
+        return 2
+    if bwlimit is not None and bwlimit < 1:
+        print(usage)
+        return 2
+
+    group_name, sources, dest = positional[0], positional[1:-1], positional[-1]
+    return app.push_to_group(group_name, sources, dest, jobs, bwlimit, tool)
+
+
+def run_warm_command(app: ShortSSH, args: list[str]) -> int:
+    usage = (
+        "[!] Usage: sssh --warm <group> [-j N] [--timeout SEC] "
+        "[--persist TIME]"
+    )
+
+    group_name: str | None = None
+    jobs = 16
+    timeout = 10.0
+    persist: str | None = None
+
+    try:
+        while args:
+            opt = args.pop(0)
+            if opt in ("-j", "--jobs"):
+                jobs = int(args.pop(0))
+            elif opt == "--timeout":
+                timeout = float(args.pop(0))
+            elif opt == "--persist":
+                persist = args.pop(0)
+            elif group_name is None:
+                group_name = opt
+            else:
+                group_name += " " + opt
+    except (IndexError, ValueError):
+        print(usage)
+        return 2
+
+    if not group_name or jobs < 1 or timeout <= 0:
+        print(usage)
+        return 2
+
+    return app.warm_group(group_name, jobs, timeout, persist)
+
+
+def run_sort_command(app: ShortSSH, args: list[str]) -> int:
+    usage = (
+        "[!] Usage: sssh --sort [--by name|ip|port|user|last-used] "
+        "[--check]"
+    )
+    key = "name"
+    check = False
+    try:
+        while args:
+            opt = args.pop(0)
+            if opt == "--by":
+                key = args.pop(0)
+            elif opt.startswith("--by="):
+                key = opt.split("=", 1)[1]
+            elif opt == "--check":
+                check = True
+            else:
+                raise ValueError(opt)
+    except (IndexError, ValueError):
+        print(usage)
+        return 2
+    if key not in SORT_KEYS:
+        print(usage)
+        return 2
+
+    result = app.sort_ssh_config(key, check)
+    if result is None:
+        return 1
+    return 0 if result or not check else 1
+
+
+def run_ssh(args: list[str]) -> int:
+    """Run ssh with the arguments as a child process; its exit code."""
+    import subprocess
+
+    sys.stdout.flush()
+    sys.stderr.flush()
+    try:
+        with span("ssh"):
+            return subprocess.call(["ssh"] + args)
+    except KeyboardInterrupt:
+        return 130
+    except OSError as e:
+        print(f"[!] Cannot run ssh: {e}", file=sys.stderr)
+        return 127
+
+
+def exec_ssh(args: list[str]) -> None:
+    """Hand the arguments to ssh unchanged.
+
+    ssh resolves ShortSSH short names from the same ~/.ssh/config, so the
+    config is not read here at all. On POSIX the process is replaced by
+    ssh (no shell, no interpreter left behind); Windows has no real exec,
+    so ssh runs as a child and its exit code is passed through. The same
+    happens under --timings or SSSH_PROFILE, which report on exit.
+    """
+    if os.name == "nt" or instrumented():
+        sys.exit(run_ssh(args))
+
+    sys.stdout.flush()
+    sys.stderr.flush()
+    try:
+        os.execvp("ssh", ["ssh"] + args)
+    except OSError as e:
+        print(f"[!] Cannot run ssh: {e}", file=sys.stderr)
+        sys.exit(127)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""Benchmarks for ShortSSH on synthetic configs.
+
+Generates configs of 100 to 100k hosts in the layout ``add_menu`` writes
+(``# G:`` groups, notes, IdentityFile and LocalForward lines), then times
+the config operations in-process and ``sssh -l`` as a fresh process.
+Every timing is the best of ``--repeat`` runs, in milliseconds; results
+are printed as JSON so runs can be compared across commits.
+
+In-process timings use a fresh ShortSSH per run with the parse cache
+warm, as a repeated CLI call would see it; ``parse_cold_ms`` is the same
+load with the cache disabled.
+
+Usage: python tools/bench.py [--sizes 100,1000,10000,100000]
+                             [--repeat 3] [-o results.json]
+"""
+
+import argparse
+import builtins
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import main as shortssh  # noqa: E402
+
+GROUPS = ("web", "db", "cache", "queue", "bastion", "monitoring", "ci")
+USERS = ("root", "deploy", "ubuntu", "admin", "ops")
+
+
+def generate_config(hosts: int, seed: int = 1) -> str:
+    """A config with ``hosts`` blocks as the add menu writes them."""
+    rnd = random.Random(seed)
+    out = ["#-----------------#\n# ShortSSH Config #\n#-----------------#\n"]
+    for i in range(hosts):
+        if rnd.random() < 0.8:
+            out.append(f"# G: {rnd.choice(GROUPS)}\n")
+        out.append(
+            f"Host srv{i:06d}\n"
+            f"        HostName 10.{i >> 16 & 255}.{i >> 8 & 255}.{i & 255}\n"
+            f"        User {rnd.choice(USERS)}\n"
+            f"        Port {rnd.choice((22, 22, 22, 2222, 2200))}\n"
+        )
+        if rnd.random() < 0.3:
+            out.append("        IdentityFile ~/.ssh/id_ed25519\n")
+        if rnd.random() < 0.5:
+            out.append(f"        # Notes: rack {rnd.randrange(40)} dc1\n")
+        if rnd.random() < 0.05:
+            local = 10000 + rnd.randrange(50000)
+            out.append(f"        LocalForward {local} localhost:5432\n")
+    return "".join(out)
+
+
+def best_ms(func, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return round(best * 1000, 3)
+
+
+class Quiet:
+    """Send stdout to a throwaway buffer while a benchmark runs."""
+
+    def __enter__(self) -> None:
+        self.saved = sys.stdout
+        sys.stdout = io.StringIO()
+
+    def __exit__(self, *exc: object) -> None:
+        # find_host opens a menu frame; close it so stdout is ours again
+        if shortssh._screen is not None:
+            shortssh._screen.close()
+            shortssh._screen = None
+        sys.stdout = self.saved
+
+
+def make_app(home: str, cache: bool = True) -> shortssh.ShortSSH:
+    app = shortssh.ShortSSH()
+    app.path_ssh_config = os.path.join(home, ".ssh", "config")
+    # keep caches and backups out of the checkout
+    app.cache_dir = os.path.join(home, "cache")
+    app.config_cache = shortssh.SshConfigCache(app.cache_dir, cache)
+    app.backup_dir = os.path.join(home, "backups")
+    app.backups = shortssh.BackupStore(app.backup_dir)
+    return app
+
+
+def run_find_host(app: shortssh.ShortSSH, kind: str, query: str) -> None:
+    answers = iter([query, "q"])
+    saved = builtins.input
+    builtins.input = lambda prompt="": next(answers)
+    try:
+        app.find_host(kind)
+    finally:
+        builtins.input = saved
+
+
+def bench_size(hosts: int, repeat: int, tmp: str) -> dict:
+    home = os.path.join(tmp, f"home-{hosts}")
+    ssh_dir = os.path.join(home, ".ssh")
+    os.makedirs(ssh_dir)
+    config = os.path.join(ssh_dir, "config")
+    text = generate_config(hosts)
+    with open(config, "w", encoding="utf-8") as f:
+        f.write(text)
+
+    last = f"srv{hosts - 1:06d}"
+    probe = f"srv{hosts // 2:06d}"
+    timings: dict[str, float] = {}
+
+    make_app(home).get_ssh_config().hosts  # fills the parse cache
+
+    def timed(name: str, func) -> None:
+        with Quiet():
+            timings[name] = best_ms(func, repeat)
+
+    timed(
+        "parse_cold_ms",
+        lambda: make_app(home, cache=False).get_ssh_config().hosts,
+    )
+    timed("parse_warm_ms", lambda: make_app(home).get_ssh_config().hosts)
+    timed(
+        "list_hosts_short_ip_ms",
+        lambda: make_app(home).list_hosts_short_ip(),
+    )
+    timed(
+        "list_hosts_short_ip_group_ms",
+        lambda: make_app(home).list_hosts_short_ip_group("web"),
+    )
+    timed(
+        "read_ssh_host_config_ms",
+        lambda: make_app(home)._read_ssh_host_config(last),
+    )
+    timed(
+        "check_host_exists_ms",
+        lambda: make_app(home).check_host_exists(last),
+    )
+    timed(
+        "find_host_ip_ms",
+        lambda: run_find_host(make_app(home), "ip", "10.0.1.2"),
+    )
+    timed(
+        "find_host_all_ms",
+        lambda: run_find_host(make_app(home), "all", probe),
+    )
+
+    # sort rewrites the file; start each run from the generated text
+    def sort() -> None:
+        with open(config, "w", encoding="utf-8") as f:
+            f.write(text)
+        make_app(home).sort_ssh_config()
+
+    timed("sort_ssh_config_ms", sort)
+    with open(config, "w", encoding="utf-8") as f:
+        f.write(text)
+
+    env = dict(os.environ, HOME=home, USERPROFILE=home)
+    script = os.path.join(tmp, "main.py")
+
+    def cli(*args: str) -> None:
+        subprocess.run(
+            [sys.executable, script, *args],
+            env=env,
+            stdout=subprocess.DEVNULL,
+            check=True,
+        )
+
+    cli("-l")  # warms the copy's parse cache
+    timings["cli_list_cold_ms"] = best_ms(
+        lambda: cli("--no-cache", "-l"), repeat
+    )
+    timings["cli_list_warm_ms"] = best_ms(lambda: cli("-l"), repeat)
+
+    return {
+        "hosts": hosts,
+        "config_bytes": len(text.encode("utf-8")),
+        "timings": timings,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="100,1000,10000,100000")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("-o", "--output")
+    opts = parser.parse_args()
+
+    try:
+        sizes = [int(s) for s in opts.sizes.split(",") if s]
+    except ValueError:
+        parser.error("--sizes must be comma-separated integers")
+    if not sizes or min(sizes) < 1 or opts.repeat < 1:
+        parser.error("sizes and --repeat must be positive")
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        # the CLI runs use a copy so its cache/ and backups/ stay in tmp
+        shutil.copyfile(
+            os.path.join(ROOT, "main.py"), os.path.join(tmp, "main.py")
+        )
+        for hosts in sizes:
+            print(f"[*] {hosts} hosts...", file=sys.stderr)
+            results.append(bench_size(hosts, opts.repeat, tmp))
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "version": shortssh.ShortSSH().version_app,
+        "repeat": opts.repeat,
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if opts.output:
+        with open(opts.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""Build ShortSSH as a single-file zipapp with precompiled bytecode.
+
+main.py is packed as ``shortssh`` next to a two-line ``__main__.py``.
+By default ``shortssh`` goes in as ``.pyc`` only, so the large module is
+not compiled at every launch; the archive then only runs on the Python
+version that built it. ``--source`` keeps ``shortssh.py`` instead.
+
+Usage: python tools/build_zipapp.py [-o dist/sssh.pyz] [--source]
+"""
+
+import argparse
+import os
+import py_compile
+import shutil
+import sys
+import tempfile
+import zipapp
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENTRY = "from shortssh import main\n\nmain()\n"
+
+
+def build(output: str, source: bool, interpreter: str) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        shutil.copyfile(
+            os.path.join(ROOT, "main.py"),
+            os.path.join(tmp, "shortssh.py"),
+        )
+        with open(os.path.join(tmp, "__main__.py"), "w") as f:
+            f.write(ENTRY)
+
+        if not source:
+            py = os.path.join(tmp, "shortssh.py")
+            py_compile.compile(
+                py,
+                cfile=os.path.join(tmp, "shortssh.pyc"),
+                dfile="shortssh.py",
+                doraise=True,
+            )
+            os.remove(py)
+
+        out_dir = os.path.dirname(os.path.abspath(output))
+        os.makedirs(out_dir, exist_ok=True)
+        zipapp.create_archive(tmp, output, interpreter=interpreter)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "-o",
+        "--output",
+        default=os.path.join(ROOT, "dist", "sssh.pyz"),
+    )
+    parser.add_argument("--source", action="store_true")
+    parser.add_argument("--python", default="/usr/bin/env python3")
+    opts = parser.parse_args()
+
+    build(opts.output, opts.source, opts.python)
+    print(f"[+] Built {opts.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
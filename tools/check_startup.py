@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""Startup budget check for the ``sssh <host>`` passthrough path.
+
+Imports a copy of main.py as a module (so its cached bytecode is used, as
+in the zipapp build) and runs ``main()`` for ``sssh example-host`` under
+``python -X importtime``, with a stub ``ssh`` first on PATH and an empty
+HOME. The copy lives in that HOME, so the program dir (cache/, backups/)
+is temporary too and the checkout is never written to. Fails when
+
+- a module that must stay lazy (subprocess, re, typing, ...) is imported, or
+- the imports ShortSSH adds on top of a bare interpreter take longer than
+  the budget.
+
+Usage: python tools/check_startup.py [--budget-ms 5] [--runs 5]
+"""
+
+import argparse
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def passthrough(program_dir: str) -> str:
+    return (
+        "import sys; "
+        f"sys.path.insert(0, {program_dir!r}); "
+        "sys.argv = ['sssh', 'example-host']; "
+        "import main; "
+        "main.main()"
+    )
+
+
+LAZY_MODULES = (
+    "subprocess",
+    "re",
+    "typing",
+    "functools",
+    "random",
+    "getpass",
+    "urllib",
+    "urllib.request",
+    "asyncio",
+    "concurrent.futures",
+    "shlex",
+    "glob",
+)
+
+
+def parse_importtime(stderr: str) -> list[tuple[int, int, str]]:
+    """(cumulative_us, depth, module) for every ``-X importtime`` line."""
+    rows: list[tuple[int, int, str]] = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:") :].split("|")
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        name = parts[2].rstrip()
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        rows.append((int(parts[1]), depth, name.strip()))
+    return rows
+
+
+def run(argv: list[str], env: dict[str, str]) -> tuple[float, str]:
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime"] + argv,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    elapsed = time.perf_counter() - start
+    if proc.returncode != 0:
+        sys.stderr.write(proc.stderr)
+        raise SystemExit(f"[!] {' '.join(argv)} exited {proc.returncode}")
+    return elapsed, proc.stderr
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget-ms", type=float, default=5.0)
+    parser.add_argument("--runs", type=int, default=5)
+    opts = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bin_dir = os.path.join(tmp, "bin")
+        home = os.path.join(tmp, "home")
+        os.makedirs(bin_dir)
+        os.makedirs(os.path.join(home, ".ssh"))
+        shutil.copyfile(
+            os.path.join(ROOT, "main.py"), os.path.join(home, "main.py")
+        )
+        code = passthrough(home)
+
+        stub = os.path.join(bin_dir, "ssh")
+        with open(stub, "w") as f:
+            f.write("#!/bin/sh\nexit 0\n")
+        os.chmod(stub, 0o755)
+
+        env = dict(os.environ)
+        env["PATH"] = bin_dir + os.pathsep + env.get("PATH", "")
+        env["HOME"] = home
+        env["USERPROFILE"] = home
+        env["XDG_CACHE_HOME"] = os.path.join(home, ".cache")
+        env.pop("SSSH_LAST_USED", None)
+        # measure the cached-bytecode path, as shipped in the zipapp
+        env.pop("PYTHONDONTWRITEBYTECODE", None)
+        env["PYTHONPYCACHEPREFIX"] = os.path.join(tmp, "pycache")
+
+        base_modules: set[str] = set()
+        for _, _, name in parse_importtime(run(["-c", "pass"], env)[1]):
+            base_modules.add(name)
+
+        run(["-c", code], env)  # warm-up: writes the bytecode
+
+        best_import_us: int | None = None
+        best_wall = 0.0
+        imported: set[str] = set()
+        for _ in range(opts.runs):
+            wall, stderr = run(["-c", code], env)
+            rows = parse_importtime(stderr)
+            imported |= {name for _, _, name in rows}
+            extra = sum(
+                us
+                for us, depth, name in rows
+                if depth == 0 and name not in base_modules
+            )
+            if best_import_us is None or extra < best_import_us:
+                best_import_us = extra
+                best_wall = wall
+
+    assert best_import_us is not None
+    import_ms = best_import_us / 1000
+
+    print(f"[*] passthrough imports: {import_ms:.2f} ms")
+    print(f"[*] passthrough wall time: {best_wall * 1000:.1f} ms")
+    print(f"[*] budget: {opts.budget_ms:.2f} ms")
+
+    failed = False
+
+    eager = sorted(m for m in LAZY_MODULES if m in imported)
+    if eager:
+        print(f"[!] imported on the passthrough path: {', '.join(eager)}")
+        failed = True
+
+    if import_ms > opts.budget_ms:
+        print("[!] startup budget exceeded")
+        failed = True
+
+    if not failed:
+        print("[+] startup budget OK")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())